@@ -0,0 +1,144 @@
+# app/artifact_cache.py
+
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+
+import boto3
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem trava entre processos
+    fcntl = None
+
+_cliente_s3 = None
+_cliente_lock = threading.Lock()
+
+
+def cliente_s3():
+    """
+    Cliente boto3 único por processo (clientes boto3 são thread-safe).
+    S3_ENDPOINT_URL permite apontar para um S3 local (ex.: moto_server, MinIO).
+    """
+    global _cliente_s3
+    with _cliente_lock:
+        if _cliente_s3 is None:
+            _cliente_s3 = boto3.client("s3", endpoint_url=os.getenv("S3_ENDPOINT_URL") or None)
+        return _cliente_s3
+
+
+def _descartar_no_filho():
+    """
+    Após um fork (app/servidor.py pré-carrega no pai), o filho não reaproveita o cliente do pai:
+    o pool keep-alive do urllib3 apontaria para as mesmas conexões TCP em todos os workers, e
+    HEADs simultâneos de workers diferentes misturariam as respostas. Cada worker cria o seu.
+    """
+    global _cliente_s3, _cache, _cliente_lock
+    _cliente_lock = threading.Lock()
+    _cliente_s3 = None
+    _cache = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_descartar_no_filho)
+
+
+def _hash(texto: str) -> str:
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()[:16]
+
+
+class CacheArtefatos:
+    """
+    Cache local de artefatos do S3 endereçado por conteúdo (ETag/VersionId).
+
+    Layout: <diretorio>/<hash(bucket/chave)>/<hash(versao)>/<nome_do_arquivo>
+
+    1) HEAD no objeto para descobrir a versão atual
+    2) Se a versão já está no disco, devolve o caminho sem GET
+    3) Senão, trava o diretório (flock) para que só um worker baixe; os demais esperam e reaproveitam
+    4) Download para arquivo temporário no mesmo diretório + os.replace (atômico)
+    5) Mantém apenas as `manter_versoes` versões mais recentes de cada chave
+    """
+
+    def __init__(self, diretorio=None, cliente=None, manter_versoes=2):
+        self.diretorio = diretorio or os.getenv(
+            "ARTIFACT_CACHE_DIR", os.path.join(os.getenv("MODEL_DIR", "/app/model"), ".cache"))
+        self._cliente = cliente
+        self.manter_versoes = max(1, int(manter_versoes))
+        self.hits = 0
+        self.downloads = 0
+
+    @property
+    def cliente(self):
+        return self._cliente or cliente_s3()
+
+    def obter(self, bucket: str, chave: str) -> str:
+        """Devolve o caminho local da versão atual de s3://bucket/chave."""
+        cabecalho = self.cliente.head_object(Bucket=bucket, Key=chave)
+        version_id = cabecalho.get("VersionId")
+        etag = cabecalho["ETag"].strip('"')
+        versao = version_id if version_id and version_id != "null" else etag
+
+        dir_chave = os.path.join(self.diretorio, _hash(f"{bucket}/{chave}"))
+        dir_versao = os.path.join(dir_chave, _hash(versao))
+        destino = os.path.join(dir_versao, os.path.basename(chave))
+
+        if os.path.isfile(destino):
+            self.hits += 1
+            return destino
+
+        os.makedirs(dir_versao, exist_ok=True)
+        with open(os.path.join(dir_chave, ".lock"), "w") as trava:
+            if fcntl is not None:
+                fcntl.flock(trava, fcntl.LOCK_EX)
+            try:
+                # Outro worker pode ter concluído o download enquanto esperávamos a trava
+                if os.path.isfile(destino):
+                    self.hits += 1
+                    return destino
+
+                # VersionId/IfMatch garantem que o GET traz a mesma versão do HEAD
+                fd, temporario = tempfile.mkstemp(dir=dir_versao, prefix=".tmp-")
+                try:
+                    with os.fdopen(fd, "wb") as saida:
+                        if versao == version_id:
+                            self.cliente.download_fileobj(bucket, chave, saida, ExtraArgs={"VersionId": version_id})
+                        else:
+                            # download_fileobj não aceita IfMatch: GET único com a pré-condição
+                            corpo = self.cliente.get_object(Bucket=bucket, Key=chave, IfMatch=cabecalho["ETag"])["Body"]
+                            shutil.copyfileobj(corpo, saida, 1024 * 1024)
+                    os.replace(temporario, destino)
+                except BaseException:
+                    if os.path.exists(temporario):
+                        os.remove(temporario)
+                    raise
+                self.downloads += 1
+                self._remover_versoes_antigas(dir_chave, manter=dir_versao)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(trava, fcntl.LOCK_UN)
+        return destino
+
+    def _remover_versoes_antigas(self, dir_chave: str, manter: str):
+        versoes = [
+            os.path.join(dir_chave, nome) for nome in os.listdir(dir_chave)
+            if os.path.isdir(os.path.join(dir_chave, nome))
+        ]
+        versoes.sort(key=os.path.getmtime, reverse=True)
+        antigas = [v for v in versoes if v != manter][self.manter_versoes - 1:]
+        for caminho in antigas:
+            shutil.rmtree(caminho, ignore_errors=True)
+
+
+_cache = None
+
+
+def cache_artefatos() -> CacheArtefatos:
+    """Instância compartilhada do cache (criada no primeiro uso)."""
+    global _cache
+    with _cliente_lock:
+        if _cache is None:
+            _cache = CacheArtefatos()
+        return _cache
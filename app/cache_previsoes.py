@@ -0,0 +1,189 @@
+# app/cache_previsoes.py
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+
+class BackendMemoriaCompartilhada:
+    """
+    Stand-in local do backend compartilhado (mesma interface do Redis: get/set com TTL).
+    Útil em testes e em desenvolvimento; não é compartilhado entre processos.
+    """
+
+    def __init__(self):
+        self._dados = {}
+
+    def get(self, chave: str) -> Optional[bytes]:
+        item = self._dados.get(chave)
+        if item is None:
+            return None
+        valor, expira = item
+        if expira < time.monotonic():
+            self._dados.pop(chave, None)
+            return None
+        return valor
+
+    def mget(self, chaves: Sequence[str]) -> List[Optional[bytes]]:
+        return [self.get(chave) for chave in chaves]
+
+    def set(self, chave: str, valor: bytes, ex: int):
+        self._dados[chave] = (valor, time.monotonic() + ex)
+
+    def delete(self, *chaves):
+        for chave in chaves:
+            self._dados.pop(chave, None)
+
+
+def criar_backend_compartilhado():
+    """
+    CACHE_BACKEND=redis (REDIS_URL) compartilha acertos entre os workers do uvicorn;
+    CACHE_BACKEND=memoria usa o stand-in local; vazio (padrão) = só o LRU do processo.
+    """
+    tipo = os.getenv("CACHE_BACKEND", "").lower()
+    if not tipo:
+        return None
+    if tipo == "memoria":
+        return BackendMemoriaCompartilhada()
+    if tipo == "redis":
+        import redis  # opcional: só necessário com CACHE_BACKEND=redis
+
+        return redis.Redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0"),
+                                    socket_timeout=0.05, socket_connect_timeout=0.2)
+    raise RuntimeError(f"❌ CACHE_BACKEND '{tipo}' inválido. Opções: memoria, redis.")
+
+
+class CachePrevisoes:
+    """
+    Cache de respostas do /prever por (ticker, versão do modelo, hash da janela).
+
+    1) LRU local com TTL (limite `max_itens`)
+    2) Backend compartilhado opcional consultado em caso de miss local
+    3) Cada entrada guarda o tempo de modelo gasto para produzi-la: cada hit soma
+       esse tempo em `latencia_economizada_s`
+
+    O LRU local é lido e escrito no event loop. O backend compartilhado (cliente Redis
+    síncrono) só é chamado em `threads` threads próprias: `obter`/`obter_varios` aguardam
+    a leitura sem bloquear o loop (um MGET para as chaves que faltam), e `guardar` agenda a
+    escrita sem esperá-la.
+    """
+
+    def __init__(self, max_itens: int = 10000, ttl_s: float = 3600.0, compartilhado=None, threads: int = 4):
+        self.max_itens = max(1, int(max_itens))
+        self.ttl_s = float(ttl_s)
+        self.compartilhado = compartilhado
+        self._pool = ThreadPoolExecutor(max_workers=max(1, int(threads)), thread_name_prefix="cache") \
+            if compartilhado is not None else None
+        self._itens: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = 0
+        self.hits_compartilhados = 0
+        self.misses = 0
+        self.invalidacoes = 0
+        self.latencia_economizada_s = 0.0
+
+    @staticmethod
+    def chave(ticker: str, versao: str, janela: np.ndarray) -> str:
+        digest = hashlib.blake2b(np.ascontiguousarray(janela, dtype=np.float32).tobytes(), digest_size=16)
+        return f"prev:{ticker}:{versao}:{digest.hexdigest()}"
+
+    def _obter_local(self, chave: str) -> Optional[dict]:
+        item = self._itens.get(chave)
+        if item is None:
+            return None
+        payload, custo_s, expira = item
+        if expira < time.monotonic():
+            del self._itens[chave]
+            return None
+        self._itens.move_to_end(chave)
+        self.hits += 1
+        self.latencia_economizada_s += custo_s
+        return payload
+
+    def _ler_compartilhado(self, chaves: List[str]) -> List[Optional[bytes]]:
+        try:
+            return list(self.compartilhado.mget(chaves))
+        except Exception as e:
+            print(f"⚠ Cache compartilhado indisponível: {e}")
+            return [None] * len(chaves)
+
+    def _gravar_compartilhado(self, chave: str, payload: dict, custo_s: float):
+        try:
+            bruto = json.dumps({"payload": payload, "custo_s": custo_s}, ensure_ascii=False)
+            self.compartilhado.set(chave, bruto.encode("utf-8"), ex=max(1, int(self.ttl_s)))
+        except Exception as e:
+            print(f"⚠ Cache compartilhado indisponível: {e}")
+
+    async def obter(self, chave: str) -> Optional[dict]:
+        return (await self.obter_varios([chave]))[0]
+
+    async def obter_varios(self, chaves: Sequence[str]) -> List[Optional[dict]]:
+        """Respostas em cache na ordem de `chaves` (None nos misses)."""
+        respostas = [self._obter_local(chave) for chave in chaves]
+        faltando = [k for k, resposta in enumerate(respostas) if resposta is None]
+        if faltando and self.compartilhado is not None:
+            brutos = await asyncio.get_running_loop().run_in_executor(
+                self._pool, self._ler_compartilhado, [chaves[k] for k in faltando])
+            for k, bruto in zip(faltando, brutos):
+                if bruto is None:
+                    continue
+                registro = json.loads(bruto)
+                self._guardar_local(chaves[k], registro["payload"], registro["custo_s"])
+                self.hits += 1
+                self.hits_compartilhados += 1
+                self.latencia_economizada_s += registro["custo_s"]
+                respostas[k] = registro["payload"]
+        self.misses += sum(1 for resposta in respostas if resposta is None)
+        return respostas
+
+    def guardar(self, chave: str, payload: dict, custo_s: float):
+        self._guardar_local(chave, payload, custo_s)
+        if self._pool is not None:
+            self._pool.submit(self._gravar_compartilhado, chave, payload, custo_s)
+
+    def encerrar(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _guardar_local(self, chave: str, payload: dict, custo_s: float):
+        self._itens[chave] = (payload, custo_s, time.monotonic() + self.ttl_s)
+        self._itens.move_to_end(chave)
+        while len(self._itens) > self.max_itens:
+            self._itens.popitem(last=False)
+
+    def invalidar(self, ticker: Optional[str] = None):
+        """
+        Remove as entradas locais do ticker (ou todas). No backend compartilhado as
+        entradas antigas ficam inalcançáveis, pois a chave inclui a versão do modelo.
+        """
+        if ticker is None:
+            removidas = len(self._itens)
+            self._itens.clear()
+        else:
+            prefixo = f"prev:{ticker}:"
+            chaves = [c for c in self._itens if c.startswith(prefixo)]
+            for c in chaves:
+                del self._itens[c]
+            removidas = len(chaves)
+        self.invalidacoes += removidas
+
+    def estatisticas(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "itens": len(self._itens),
+            "max_itens": self.max_itens,
+            "ttl_s": self.ttl_s,
+            "compartilhado": type(self.compartilhado).__name__ if self.compartilhado is not None else None,
+            "hits": self.hits,
+            "hits_compartilhados": self.hits_compartilhados,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+            "invalidacoes": self.invalidacoes,
+            "latencia_economizada_s": self.latencia_economizada_s,
+        }
@@ -0,0 +1,120 @@
+# app/executor_inferencia.py
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+
+class FilaCheia(Exception):
+    """Fila de inferência no limite: a API responde 429."""
+
+
+class PrazoExcedido(Exception):
+    """A previsão não terminou dentro do prazo da requisição: a API responde 504."""
+
+
+class ExecutorInferencia:
+    """
+    Pool de threads dedicado às chamadas ao modelo, separado do threadpool padrão
+    (que continua com cargas de modelo, leitura de histórico e endpoints síncronos).
+
+    1) `threads` chamadas ao modelo em paralelo; as demais esperam na fila
+    2) Acima de `fila_max` chamadas pendentes, `executar` levanta FilaCheia (backpressure)
+    3) Cada chamada tem um prazo (`prazo_ms`): quem expirou na fila nem chega ao modelo,
+       e quem aguarda além do prazo recebe PrazoExcedido (o resultado tardio é descartado)
+    4) `espera` (série de histograma, opcional) observa o tempo na fila antes de rodar
+    """
+
+    def __init__(self, threads: int = 2, fila_max: int = 64, prazo_ms: float = 2000.0, espera=None):
+        self.threads = max(1, int(threads))
+        self.fila_max = max(1, int(fila_max))
+        self.prazo_s = max(0.0, float(prazo_ms)) / 1000.0
+        self.espera = espera
+        self._pool = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="inferencia")
+        self._trava = threading.Lock()
+        self.pendentes = 0
+        self.executadas = 0
+        self.rejeitadas = 0
+        self.expiradas = 0
+
+    @classmethod
+    def do_ambiente(cls, espera=None) -> "ExecutorInferencia":
+        return cls(
+            threads=int(os.getenv("INFERENCIA_THREADS", "2")),
+            fila_max=int(os.getenv("INFERENCIA_FILA_MAX", "64")),
+            prazo_ms=float(os.getenv("INFERENCIA_PRAZO_MS", "2000")),
+            espera=espera,
+        )
+
+    def _rodar(self, funcao: Callable, args: tuple, enfileirado: float, limite: Optional[float]):
+        inicio = time.perf_counter()
+        try:
+            if self.espera is not None:
+                self.espera.observar(inicio - enfileirado)
+            if limite is not None and inicio > limite:
+                raise PrazoExcedido("prazo esgotado na fila de inferência")
+            return funcao(*args)
+        finally:
+            with self._trava:
+                self.pendentes -= 1
+
+    async def executar(self, funcao: Callable, *args, prazo_s: Optional[float] = None):
+        prazo_s = self.prazo_s if prazo_s is None else prazo_s
+        with self._trava:
+            if self.pendentes >= self.fila_max:
+                self.rejeitadas += 1
+                raise FilaCheia(f"fila de inferência cheia ({self.fila_max} chamadas pendentes)")
+            self.pendentes += 1
+
+        agora = time.perf_counter()
+        limite = agora + prazo_s if prazo_s else None
+        futuro = asyncio.wrap_future(self._pool.submit(self._rodar, funcao, args, agora, limite))
+        # Resultado ou erro de uma chamada já abandonada pelo prazo não deve virar aviso no log
+        futuro.add_done_callback(lambda f: f.cancelled() or f.exception())
+        try:
+            # shield: expirar aqui não cancela a thread; ela termina e libera a vaga na fila
+            resultado = await asyncio.wait_for(asyncio.shield(futuro), prazo_s or None)
+        except (asyncio.TimeoutError, PrazoExcedido):
+            self.expiradas += 1
+            raise PrazoExcedido(f"previsão não concluída em {prazo_s * 1000:.0f} ms")
+        self.executadas += 1
+        return resultado
+
+    def encerrar(self):
+        self._pool.shutdown(wait=False)
+
+    def estatisticas(self) -> dict:
+        return {
+            "threads": self.threads,
+            "fila_max": self.fila_max,
+            "prazo_ms": self.prazo_s * 1000,
+            "pendentes": self.pendentes,
+            "executadas": self.executadas,
+            "rejeitadas": self.rejeitadas,
+            "expiradas": self.expiradas,
+        }
+
+
+def configurar_threads_tensorflow(tf, threads_inferencia: Optional[int] = None):
+    """
+    Ajusta intra/inter-op do TensorFlow ao pool de inferência: sem isso, cada uma das
+    `threads_inferencia` chamadas abre um pool do tamanho da máquina e elas disputam os núcleos.
+    TF_INTRA_OP_THREADS / TF_INTER_OP_THREADS têm precedência; WEB_CONCURRENCY divide os núcleos
+    entre os workers do uvicorn. Precisa rodar antes da primeira operação do TF.
+    """
+    if threads_inferencia is None:
+        threads_inferencia = int(os.getenv("INFERENCIA_THREADS", "2"))
+    workers = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+    padrao = max(1, (os.cpu_count() or 1) // (workers * max(1, threads_inferencia)))
+    intra = int(os.getenv("TF_INTRA_OP_THREADS", str(padrao)))
+    inter = int(os.getenv("TF_INTER_OP_THREADS", "1"))
+    try:
+        tf.config.threading.set_intra_op_parallelism_threads(intra)
+        tf.config.threading.set_inter_op_parallelism_threads(inter)
+    except RuntimeError:
+        # Runtime do TF já inicializado (ex.: segundo modelo carregado): mantém a configuração atual
+        return
+    print(f"🧵 TensorFlow: intra-op={intra}, inter-op={inter} (inferência com {threads_inferencia} threads).")
@@ -0,0 +1,89 @@
+# app/formatos.py
+
+import json
+from typing import Optional, Tuple
+
+import numpy as np
+from fastapi.responses import JSONResponse
+
+from app.preprocessamento import ErroValidacao
+
+# orjson e msgpack são opcionais: sem eles o caminho rápido usa json da stdlib e recusa msgpack
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende da imagem
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - depende da imagem
+    msgpack = None
+
+if orjson is not None:
+    from fastapi.responses import ORJSONResponse as RespostaRapida
+else:
+    RespostaRapida = JSONResponse
+
+TIPO_BINARIO = "application/octet-stream"
+TIPOS_MSGPACK = ("application/msgpack", "application/x-msgpack")
+
+
+def _vetor(valores, origem: str) -> np.ndarray:
+    """Converte para float32 1-D de uma vez (sem validar elemento a elemento) e rejeita NaN/inf."""
+    try:
+        historico = np.asarray(valores, dtype=np.float32)
+    except (TypeError, ValueError):
+        raise ErroValidacao(f"'historico' deve ser uma lista de números ({origem}).")
+    if historico.ndim != 1:
+        raise ErroValidacao(f"'historico' deve ser uma lista de números ({origem}).")
+    if not np.isfinite(historico).all():
+        raise ErroValidacao("'historico' contém valores não finitos.")
+    return historico
+
+
+def ler_binario(corpo: bytes) -> np.ndarray:
+    """Corpo octet-stream: sequência de float32 little-endian (4 bytes por preço), sem cópia."""
+    if len(corpo) % 4:
+        raise ErroValidacao("Corpo binário deve ter múltiplo de 4 bytes (float32 little-endian).")
+    return _vetor(np.frombuffer(corpo, dtype="<f4"), "binário")
+
+
+def _ler_mapa(dados, origem: str) -> Tuple[np.ndarray, Optional[str]]:
+    if not isinstance(dados, dict) or "historico" not in dados:
+        raise ErroValidacao(f"Corpo {origem} deve ser um objeto com o campo 'historico'.")
+    historico = dados["historico"]
+    if isinstance(historico, (bytes, bytearray)):
+        historico = ler_binario(bytes(historico))
+    ticker = dados.get("ticker")
+    if ticker is not None and not isinstance(ticker, str):
+        raise ErroValidacao("'ticker' deve ser texto.")
+    return _vetor(historico, origem), ticker
+
+
+def ler_json(corpo: bytes) -> Tuple[np.ndarray, Optional[str]]:
+    try:
+        dados = orjson.loads(corpo) if orjson is not None else json.loads(corpo)
+    except ValueError:
+        raise ErroValidacao("JSON inválido.")
+    return _ler_mapa(dados, "JSON")
+
+
+def ler_msgpack(corpo: bytes) -> Tuple[np.ndarray, Optional[str]]:
+    """Mapa msgpack {"historico": [..] ou bytes float32, "ticker": ".."}."""
+    if msgpack is None:
+        raise ErroValidacao("msgpack não está disponível neste servidor; use JSON ou octet-stream.")
+    try:
+        dados = msgpack.unpackb(corpo, raw=False)
+    except Exception:
+        raise ErroValidacao("msgpack inválido.")
+    return _ler_mapa(dados, "msgpack")
+
+
+def decodificar_entrada(tipo_conteudo: str, corpo: bytes) -> Tuple[np.ndarray, Optional[str]]:
+    """Escolhe o decodificador pelo Content-Type; devolve (historico float32, ticker do corpo ou None)."""
+    tipo = tipo_conteudo.split(";", 1)[0].strip().lower()
+    if tipo == TIPO_BINARIO:
+        return ler_binario(corpo), None
+    if tipo in TIPOS_MSGPACK:
+        return ler_msgpack(corpo)
+    return ler_json(corpo)
@@ -0,0 +1,212 @@
+# app/historico_store.py
+
+import importlib.util
+import os
+import threading
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+class BufferCircular:
+    """
+    Últimos `capacidade` fechamentos de um ticker num único array float32 (sem listas Python).
+    `anexar` sobrescreve os mais antigos; `ultimos(n)` devolve uma cópia contígua em ordem.
+    """
+
+    __slots__ = ("_dados", "_inicio", "tamanho", "ultima_data")
+
+    def __init__(self, capacidade: int):
+        self._dados = np.zeros(max(1, int(capacidade)), dtype=np.float32)
+        self._inicio = 0
+        self.tamanho = 0
+        self.ultima_data: Optional[np.datetime64] = None
+
+    @property
+    def capacidade(self) -> int:
+        return len(self._dados)
+
+    @property
+    def nbytes(self) -> int:
+        return self._dados.nbytes
+
+    def anexar(self, valores, ultima_data: Optional[np.datetime64] = None):
+        valores = np.asarray(valores, dtype=np.float32).ravel()
+        cap = self.capacidade
+        if len(valores) >= cap:
+            self._dados[:] = valores[-cap:]
+            self._inicio, self.tamanho = 0, cap
+        elif len(valores):
+            fim = (self._inicio + self.tamanho) % cap
+            primeira = min(len(valores), cap - fim)
+            self._dados[fim:fim + primeira] = valores[:primeira]
+            self._dados[:len(valores) - primeira] = valores[primeira:]
+            excesso = max(0, self.tamanho + len(valores) - cap)
+            self._inicio = (self._inicio + excesso) % cap
+            self.tamanho = min(cap, self.tamanho + len(valores))
+        if ultima_data is not None:
+            self.ultima_data = ultima_data
+
+    def ultimos(self, n: int) -> np.ndarray:
+        n = min(int(n), self.tamanho)
+        inicio = (self._inicio + self.tamanho - n) % self.capacidade
+        fim = inicio + n
+        if fim <= self.capacidade:
+            return self._dados[inicio:fim].copy()
+        return np.concatenate([self._dados[inicio:], self._dados[:fim - self.capacidade]])
+
+
+class LeituraIndisponivel(RuntimeError):
+    """A imagem não tem o que é preciso para ler o dataset (data/, pandas, pyarrow)."""
+
+
+def dependencias_faltando() -> List[str]:
+    """Módulos ausentes para ler o dataset: a imagem da API pode não trazer data/, pandas nem pyarrow."""
+    return [nome for nome in ("data", "pandas", "pyarrow") if importlib.util.find_spec(nome) is None]
+
+
+class HistoricoStore:
+    """
+    Janela móvel de fechamentos por ticker, em memória, para o GET /prever?ticker=.
+
+    1) `carregar(ticker)` lê só a coluna Close: do feature store (data/features.py) quando
+       existir (atualizado antes se estiver atrás do dataset), senão do dataset Parquet local
+       (DATASET_DIR) ou, com `bucket`, direto do S3
+    2) `atualizar(ticker)` lê apenas os pregões após a última data em memória
+       (depois de uma coleta); `anexar` recebe barras novas diretamente
+    3) Os buffers são por processo, e o POST da coleta chega a um só worker: com
+       `iniciar(intervalo_s)` cada worker roda `atualizar` nos seus tickers periodicamente,
+       numa thread própria
+    4) pandas/pyarrow só são importados ao ler o dataset; sem eles (ou sem data/) a leitura
+       fica desativada (`faltando`) e só `anexar` alimenta os buffers
+    """
+
+    def __init__(self, capacidade: int = 256, bucket: Optional[str] = None, raiz: Optional[str] = None):
+        self.capacidade = int(capacidade)
+        self.bucket = bucket
+        self.raiz = raiz
+        self._buffers: Dict[str, BufferCircular] = {}
+        self._trava = threading.Lock()
+        self._parar = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.intervalo_s = 0.0
+        self.atualizacoes = 0
+        self.falhas = 0
+        self.faltando = dependencias_faltando()
+
+    def __contains__(self, ticker: str) -> bool:
+        return ticker in self._buffers
+
+    def _ler_dataset(self, ticker: str, desde=None):
+        if self.faltando:
+            raise LeituraIndisponivel(f"Leitura do dataset indisponível: faltam {', '.join(self.faltando)}.")
+        from data import dataset, features
+
+        if self.bucket:
+            df = dataset.ler_precos_s3(ticker, self.bucket, colunas=["Date", "Close"], desde=desde)
+        elif features.existe(ticker):
+            # Feature store: Close mapeado do arquivo Arrow; ler_colunas o atualiza antes se o
+            # dataset tiver pregões mais novos (coleta com FEATURES_ATUALIZAR=false ou que falhou)
+            df = features.ler_colunas(ticker, ["Close"], raiz_dataset=self.raiz, desde=desde)
+        else:
+            df = dataset.ler_precos(ticker, colunas=["Close"], raiz=self.raiz, desde=desde)
+            if desde is not None:
+                df = df[df["Date"] > desde]
+        return df.dropna(subset=["Close"])
+
+    def carregar(self, ticker: str) -> BufferCircular:
+        df = self._ler_dataset(ticker)
+        buffer = BufferCircular(self.capacidade)
+        if not df.empty:
+            buffer.anexar(df["Close"].to_numpy()[-self.capacidade:], df["Date"].iloc[-1].to_datetime64())
+        with self._trava:
+            self._buffers[ticker] = buffer
+        print(f"📚 Histórico de {ticker} carregado ({buffer.tamanho} pregões).")
+        return buffer
+
+    def atualizar(self, ticker: str) -> int:
+        """Anexa os pregões gravados no dataset após a última data em memória. Devolve quantos entraram."""
+        buffer = self._buffers.get(ticker)
+        if buffer is None or buffer.ultima_data is None:
+            return self.carregar(ticker).tamanho
+        import pandas as pd
+
+        df = self._ler_dataset(ticker, desde=pd.Timestamp(buffer.ultima_data))
+        if df.empty:
+            return 0
+        # Via `anexar`: barras que chegaram pelo POST durante a leitura não entram duas vezes
+        return self.anexar(ticker, df["Close"].to_numpy(), df["Date"].to_numpy())
+
+    def iniciar(self, intervalo_s: float):
+        """Atualiza periodicamente todos os tickers em memória deste processo (0 desativa)."""
+        if intervalo_s <= 0 or self.faltando or self._thread is not None:
+            return
+        self.intervalo_s = float(intervalo_s)
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._executar, name="historico-atualizacao", daemon=True)
+        self._thread.start()
+        print(f"🔄 Histórico atualizado do dataset a cada {self.intervalo_s:.0f}s.")
+
+    def parar(self):
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _executar(self):
+        while not self._parar.wait(self.intervalo_s):
+            for ticker in list(self._buffers):
+                if self._parar.is_set():
+                    return
+                try:
+                    if self.atualizar(ticker):
+                        self.atualizacoes += 1
+                except Exception as e:
+                    self.falhas += 1
+                    print(f"⚠ Atualização do histórico de {ticker} falhou: {e}")
+
+    def anexar(self, ticker: str, precos: Sequence[float], datas: Optional[Sequence[str]] = None) -> int:
+        """
+        Anexa barras novas. Com `datas`, descarta as que não são posteriores à última
+        data em memória (reenvio da mesma coleta não duplica pregões).
+        """
+        with self._trava:
+            buffer = self._buffers.setdefault(ticker, BufferCircular(self.capacidade))
+            precos = np.asarray(precos, dtype=np.float32)
+            ultima = None
+            if datas is not None:
+                datas = np.asarray(datas, dtype="datetime64[ns]")
+                if len(datas) != len(precos):
+                    raise ValueError("'datas' e 'precos' devem ter o mesmo tamanho.")
+                if buffer.ultima_data is not None:
+                    novas = datas > buffer.ultima_data
+                    precos, datas = precos[novas], datas[novas]
+                ultima = datas.max() if len(datas) else None
+            buffer.anexar(precos, ultima)
+            return len(precos)
+
+    def janela(self, ticker: str, tamanho: int) -> Optional[np.ndarray]:
+        """Últimos `tamanho` fechamentos (float32) ou None se o ticker não estiver em memória."""
+        buffer = self._buffers.get(ticker)
+        if buffer is None:
+            return None
+        with self._trava:
+            return buffer.ultimos(tamanho)
+
+    def estatisticas(self) -> dict:
+        return {
+            "tickers": {
+                t: {"pregoes": b.tamanho, "ultima_data": str(b.ultima_data) if b.ultima_data is not None else None}
+                for t, b in self._buffers.items()
+            },
+            "capacidade": self.capacidade,
+            "bytes": sum(b.nbytes for b in self._buffers.values()),
+            "leitura_dataset": not self.faltando,
+            "atualizacao": {"intervalo_s": self.intervalo_s, "atualizacoes": self.atualizacoes,
+                            "falhas": self.falhas},
+        }
+
+
+def tickers_preload() -> List[str]:
+    """HISTORICO_TICKERS (separados por vírgula) carregados na inicialização."""
+    return [t.strip().upper() for t in os.getenv("HISTORICO_TICKERS", "").split(",") if t.strip()]
@@ -0,0 +1,249 @@
+# app/lstm_numpy.py
+
+import glob
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+class LSTMNumpy:
+    """
+    Forward pass de LSTM(units) + Dense(1) em NumPy puro, com os mesmos pesos
+    e a mesma ordem de portas (i, f, c, o) do Keras.
+
+    - kernel:           (features, 4*units)
+    - recurrent_kernel: (units, 4*units)
+    - bias:             (4*units,)
+    - dense_kernel:     (units, 1)
+    - dense_bias:       (1,)
+    """
+
+    def __init__(self, kernel, recurrent_kernel, bias, dense_kernel, dense_bias, dtype=np.float32):
+        self.dtype = np.dtype(dtype)
+        self.kernel = np.ascontiguousarray(kernel, dtype=self.dtype)
+        self.recurrent_kernel = np.ascontiguousarray(recurrent_kernel, dtype=self.dtype)
+        self.bias = np.ascontiguousarray(bias, dtype=self.dtype)
+        self.dense_kernel = np.ascontiguousarray(dense_kernel, dtype=self.dtype)
+        self.dense_bias = np.ascontiguousarray(dense_bias, dtype=self.dtype)
+        self.units = self.recurrent_kernel.shape[0]
+
+    @classmethod
+    def de_modelo_keras(cls, modelo, dtype=np.float32):
+        """Extrai os pesos da primeira camada LSTM e da última Dense de um modelo Keras."""
+        lstm = next((c for c in modelo.layers if c.__class__.__name__ == "LSTM"), None)
+        dense = next((c for c in reversed(modelo.layers) if c.__class__.__name__ == "Dense"), None)
+        if lstm is None or dense is None:
+            raise ValueError("Modelo não possui camadas LSTM e Dense compatíveis com o backend NumPy.")
+        if getattr(lstm, "recurrent_activation", None) is not None and \
+                lstm.recurrent_activation.__name__ != "sigmoid":
+            raise ValueError("Backend NumPy suporta apenas recurrent_activation='sigmoid'.")
+        kernel, recurrent_kernel, bias = lstm.get_weights()
+        dense_kernel, dense_bias = dense.get_weights()
+        return cls(kernel, recurrent_kernel, bias, dense_kernel, dense_bias, dtype=dtype)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(p.nbytes for p in (self.kernel, self.recurrent_kernel, self.bias,
+                                      self.dense_kernel, self.dense_bias))
+
+    def passo(self, xw_t, h, c):
+        """Um passo de tempo; `xw_t` já contém x_t @ kernel + bias."""
+        z = xw_t + h @ self.recurrent_kernel
+        u = self.units
+        i = _sigmoid(z[:, :u])
+        f = _sigmoid(z[:, u:2 * u])
+        g = np.tanh(z[:, 2 * u:3 * u])
+        o = _sigmoid(z[:, 3 * u:])
+        c = f * c + i * g
+        h = o * np.tanh(c)
+        return h, c
+
+    def estado(self, X: np.ndarray):
+        """Percorre a janela inteira e devolve o estado final (h, c)."""
+        X = np.asarray(X, dtype=self.dtype)
+        n = X.shape[0]
+        # Projeção de entrada de todos os passos numa única multiplicação
+        xw = X @ self.kernel + self.bias
+        h = np.zeros((n, self.units), dtype=self.dtype)
+        c = np.zeros((n, self.units), dtype=self.dtype)
+        for t in range(X.shape[1]):
+            h, c = self.passo(xw[:, t, :], h, c)
+        return h, c
+
+    def saida(self, h) -> np.ndarray:
+        return (h @ self.dense_kernel + self.dense_bias)[:, 0]
+
+    def prever(self, X: np.ndarray) -> np.ndarray:
+        """Recebe (n, janela, features) e devolve (n,) previsões normalizadas."""
+        h, _ = self.estado(X)
+        return self.saida(h)
+
+    def prever_horizonte(self, X: np.ndarray, horizonte: int) -> np.ndarray:
+        """
+        Rollout autoregressivo de `horizonte` passos para (n, janela, 1): cada previsão vira
+        a entrada do passo seguinte continuando do estado (h, c) da janela, então cada dia
+        extra custa um passo de LSTM em vez de `janela` passos. Devolve (n, horizonte).
+
+        Diferente de deslizar a janela: o estado carrega o histórico inteiro (janela + passos
+        já previstos), não só os últimos `janela` valores.
+        """
+        h, c = self.estado(X)
+        saidas = np.empty((h.shape[0], horizonte), dtype=self.dtype)
+        for k in range(horizonte):
+            y = self.saida(h)
+            saidas[:, k] = y
+            if k + 1 < horizonte:
+                h, c = self.passo(y[:, np.newaxis] @ self.kernel + self.bias, h, c)
+        return saidas
+
+
+class ScalerMinMaxNumpy:
+    """
+    Equivalente mínimo do `MinMaxScaler` ajustado (sem sklearn):
+    transform(x) = x * scale_ + min_ ; inverse_transform(x) = (x - min_) / scale_
+    """
+
+    def __init__(self, data_min_, data_max_, scale_, min_):
+        self.data_min_ = np.asarray(data_min_, dtype=np.float64)
+        self.data_max_ = np.asarray(data_max_, dtype=np.float64)
+        self.scale_ = np.asarray(scale_, dtype=np.float64)
+        self.min_ = np.asarray(min_, dtype=np.float64)
+
+    @classmethod
+    def de_sklearn(cls, scaler):
+        return cls(scaler.data_min_, scaler.data_max_, scaler.scale_, scaler.min_)
+
+    def transform(self, X):
+        return np.asarray(X, dtype=np.float64) * self.scale_ + self.min_
+
+    def inverse_transform(self, X):
+        return (np.asarray(X, dtype=np.float64) - self.min_) / self.scale_
+
+
+# Matrizes de pesos quantizadas na variante int8 (vieses ficam em float32: são poucos bytes)
+MATRIZES_QUANTIZAVEIS = ("kernel", "recurrent_kernel", "dense_kernel")
+PRECISOES = ("float32", "int8")
+
+
+def quantizar_int8(pesos: np.ndarray):
+    """
+    Quantização simétrica por coluna (uma escala por unidade de saída, como a
+    dynamic-range do TFLite): pesos ≈ q * escala, com q em [-127, 127].
+    """
+    pesos = np.asarray(pesos, dtype=np.float32)
+    maximo = np.abs(pesos).max(axis=0)
+    escala = np.where(maximo > 0, maximo / 127.0, 1.0).astype(np.float32)
+    q = np.clip(np.rint(pesos / escala), -127, 127).astype(np.int8)
+    return q, escala
+
+
+def desquantizar_int8(q: np.ndarray, escala: np.ndarray) -> np.ndarray:
+    return q.astype(np.float32) * np.asarray(escala, dtype=np.float32)
+
+
+def exportar_npz(caminho, lstm: LSTMNumpy, scaler, janela: int, precisao: str = "float32"):
+    """
+    Grava pesos LSTM/Dense e parâmetros do scaler num único .npz (sem TensorFlow/sklearn para ler).
+    precisao="int8" grava as matrizes quantizadas (`<nome>_q` + `<nome>_escala`).
+    """
+    if precisao not in PRECISOES:
+        raise ValueError(f"Precisão '{precisao}' inválida. Opções: {', '.join(PRECISOES)}.")
+    pesos = {
+        "kernel": lstm.kernel,
+        "recurrent_kernel": lstm.recurrent_kernel,
+        "bias": lstm.bias,
+        "dense_kernel": lstm.dense_kernel,
+        "dense_bias": lstm.dense_bias,
+    }
+    if precisao == "int8":
+        for nome in MATRIZES_QUANTIZAVEIS:
+            pesos[f"{nome}_q"], pesos[f"{nome}_escala"] = quantizar_int8(pesos.pop(nome))
+    np.savez_compressed(
+        caminho,
+        **pesos,
+        precisao=np.array(precisao),
+        janela=np.array(janela),
+        scaler_data_min=np.asarray(scaler.data_min_),
+        scaler_data_max=np.asarray(scaler.data_max_),
+        scaler_scale=np.asarray(scaler.scale_),
+        scaler_min=np.asarray(scaler.min_),
+    )
+
+
+def _de_arrays(dados):
+    """(lstm, scaler, janela) a partir dos arrays de `exportar_npz` (mapeamento nome → array)."""
+    precisao = str(dados["precisao"]) if "precisao" in dados else "float32"
+    pesos = {}
+    for nome in MATRIZES_QUANTIZAVEIS:
+        if precisao == "int8":
+            # Desquantiza uma vez na carga: a inferência roda em float32 (o NumPy não tem GEMM int8)
+            pesos[nome] = desquantizar_int8(dados[f"{nome}_q"], dados[f"{nome}_escala"])
+        else:
+            pesos[nome] = dados[nome]
+    lstm = LSTMNumpy(pesos["kernel"], pesos["recurrent_kernel"], dados["bias"],
+                     pesos["dense_kernel"], dados["dense_bias"])
+    scaler = ScalerMinMaxNumpy(dados["scaler_data_min"], dados["scaler_data_max"],
+                               dados["scaler_scale"], dados["scaler_min"])
+    return lstm, scaler, int(dados["janela"])
+
+
+def carregar_npz(caminho):
+    """Lê o arquivo gerado por `exportar_npz` (float32 ou int8). Retorna (lstm, scaler, janela)."""
+    with np.load(caminho) as dados:
+        return _de_arrays(dados)
+
+
+def extrair_npy(caminho_npz) -> str:
+    """
+    Descompacta o .npz (compactado, não mapeável) num diretório com um .npy por array, ao lado do
+    arquivo: '<caminho>.<mtime>-<tamanho>.npy.d'. Extrai uma vez por versão do .npz — o primeiro
+    processo grava num diretório temporário e renomeia; os demais reaproveitam. Versões anteriores
+    ficam no disco: quem carregou a nova as apaga com `remover_extracoes_antigas`.
+    """
+    caminho_npz = os.path.abspath(caminho_npz)
+    st = os.stat(caminho_npz)
+    destino = f"{caminho_npz}.{st.st_mtime_ns:x}-{st.st_size:x}.npy.d"
+    if not os.path.isdir(destino):
+        temporario = tempfile.mkdtemp(dir=os.path.dirname(caminho_npz), prefix=".extraindo-")
+        with np.load(caminho_npz) as dados:
+            for nome in dados.files:
+                np.save(os.path.join(temporario, f"{nome}.npy"), dados[nome])
+        try:
+            os.rename(temporario, destino)
+        except OSError:
+            # Outro worker extraiu a mesma versão primeiro
+            shutil.rmtree(temporario, ignore_errors=True)
+    return destino
+
+
+def remover_extracoes_antigas(caminho_npz, atual: str):
+    """
+    Apaga as extrações de versões anteriores do .npz, exceto `atual`. Chamar só depois de mapear
+    `atual`: pesos já mapeados continuam legíveis (o unlink não desfaz o mmap), e um worker que
+    abriria uma versão apagada no meio da carga extrai de novo a versão corrente (model_loader).
+    """
+    atual = os.path.abspath(atual)
+    for antigo in glob.glob(f"{glob.escape(os.path.abspath(caminho_npz))}.*.npy.d"):
+        if antigo != atual:
+            shutil.rmtree(antigo, ignore_errors=True)
+
+
+def carregar_npy(diretorio, mmap: bool = True):
+    """
+    Lê o diretório gerado por `extrair_npy`. Com `mmap`, os pesos são mapeados somente leitura:
+    todos os processos que abrem os mesmos arquivos compartilham as mesmas páginas do page cache
+    em vez de cada um manter sua cópia (na variante int8 as matrizes desquantizadas são privadas).
+    Retorna (lstm, scaler, janela).
+    """
+    dados = {
+        arquivo[:-len(".npy")]: np.load(os.path.join(diretorio, arquivo), mmap_mode="r" if mmap else None)
+        for arquivo in os.listdir(diretorio) if arquivo.endswith(".npy")
+    }
+    # Já gravados em float32/float64 contíguos: LSTMNumpy e ScalerMinMaxNumpy usam os mapas sem copiar
+    return _de_arrays(dados)
@@ -1,107 +1,512 @@
 # app/main.py
 
 from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
-from typing import List
+from fastapi.responses import JSONResponse, PlainTextResponse
+from typing import List, Optional
+import asyncio
 import numpy as np
+import os
+import re
 import time
-from app.model_loader import carregar_modelo, carregar_scaler
+from app.executor_inferencia import ExecutorInferencia, FilaCheia, PrazoExcedido
+from app.formatos import RespostaRapida, decodificar_entrada
+from app.historico_store import HistoricoStore, LeituraIndisponivel, tickers_preload
+from app.cache_previsoes import CachePrevisoes, criar_backend_compartilhado
+from app.metricas import BUCKETS_CARGA, EmissorUDP, MiddlewareMetricas, RegistroMetricas, cronometrar
+from app.model_loader import assinatura_artefatos, carregar_artefatos, versao_modelo, ModeloNaoEncontrado
+from app.microbatch import MicroBatcher
+from app.recarga import ObservadorModelos
+from app.preprocessamento import (
+    ErroValidacao, EscalaMinMax, preparar_janelas, tendencias_historico, tendencias_previstas,
+)
+# Mantidas acessíveis por app.main para quem já as importava daqui
+from app.preprocessamento import detectar_tendencia_historico, detectar_tendencia_prevista  # noqa: F401
+from app.registry import ModeloServido, RegistroModelos
+from app.schemas import (
+    HistoricoAnexarRequest, PrevisaoRequest, PrevisaoLoteRequest, PrevisaoHorizonteRequest, PrevisaoHorizonteLoteRequest,
+)
 
 app = FastAPI()
 
-ATIVO = "AAPL"
+# Ticker servido pelos artefatos padrão de /app/model (demais tickers em /app/model/<TICKER>/)
+ATIVO = os.getenv("TICKER_PADRAO", "AAPL").upper()
 WINDOW_SIZE = 30
+TICKER_REGEX = re.compile(r"^[A-Z0-9^][A-Z0-9.\-=]{0,14}$")
 
-# Carrega modelo e scaler
-try:
-    modelo = carregar_modelo()
-    scaler = carregar_scaler()
-except Exception as e:
-    raise RuntimeError(f"❌ Erro ao inicializar a aplicação: {e}")
-
-# Obter limites do scaler para validação de escala
-DATA_MIN = scaler.data_min_[0]
-DATA_MAX = scaler.data_max_[0]
-
-# Middleware de log
-@app.middleware("http")
-async def log_request_time(request: Request, call_next):
-    inicio = time.time()
-    resp = await call_next(request)
-    print(f"⏱️ {request.method} {request.url.path} demorou {time.time() - inicio:.3f}s")
-    return resp
-
-# Schema de entrada
-class PrevisaoRequest(BaseModel):
-    historico: List[float]
-
-# 1) Detecta tendência no histórico
-def detectar_tendencia_historico(prices: List[float]) -> str:
-    arr = np.array(prices, dtype=float)
-    primeiro, ultimo = arr[0], arr[-1]
-    diff_pct = (ultimo - primeiro) / primeiro * 100 if primeiro > 0 else 0.0
-    if diff_pct >= 1.0:
-        return "alta"
-    if diff_pct <= -1.0:
-        return "queda"
-    coef_var = np.std(arr) / np.mean(arr) * 100 if np.mean(arr) > 0 else float("inf")
-    return "volátil" if coef_var > 1.5 else "neutro"
-
-# 2) Detecta tendência prevista (comparação previsão x último preço)
-def detectar_tendencia_prevista(predito: float, ultimo: float) -> str:
-    diff_pct = (predito - ultimo) / ultimo * 100 if ultimo > 0 else 0.0
-    if diff_pct >= 1.0:
-        return "alta"
-    if diff_pct <= -1.0:
-        return "queda"
-    return "estável"
+# Micro-batching: agrupa /prever concorrentes por até BATCH_ESPERA_MS ou BATCH_MAX_JANELAS
+BATCH_MAX_JANELAS = int(os.getenv("BATCH_MAX_JANELAS", "32"))
+BATCH_ESPERA_MS = float(os.getenv("BATCH_ESPERA_MS", "5"))
 
-@app.post("/prever")
-def prever(request: PrevisaoRequest):
-    # 1) Valida quantidade
-    if len(request.historico) < WINDOW_SIZE:
-        raise HTTPException(
-            status_code=400,
-            detail=f"É necessário fornecer pelo menos {WINDOW_SIZE} valores em 'historico'."
-        )
-
-    seq_raw = request.historico[-WINDOW_SIZE:]
-
-    # 2) Valida escala
-    for i, p in enumerate(seq_raw):
-        if p < DATA_MIN or p > DATA_MAX:
-            raise HTTPException(
-                status_code=400,
-                detail=(
-                    f"historico[{i}] = {p:.2f} está fora do range "
-                    f"[{DATA_MIN:.2f}, {DATA_MAX:.2f}]."
-                )
-            )
-
-    # 3) Tendência no histórico
-    tendencia_historico = detectar_tendencia_historico(seq_raw)
-
-    # 4) Previsão
-    seq_arr = np.array(seq_raw, dtype=float).reshape(1, WINDOW_SIZE, 1)
-    pred_norm = modelo.predict(seq_arr)[0][0]
-    pred = scaler.inverse_transform([[pred_norm]])[0][0]
-    ultimo_preco = seq_raw[-1]
-
-    # 5) Tendência prevista
-    tendencia_prevista = detectar_tendencia_prevista(pred, ultimo_preco)
-
-    # 6) Monta resposta
-    return JSONResponse(
-        content={
-            "ticker": ATIVO,
-            "ultimo_preco": f"US$ {ultimo_preco:.2f}",
-            "preco_previsto": f"US$ {pred:.2f}",
-            "tendencia_historico": tendencia_historico,
-            "tendencia_prevista": tendencia_prevista,
-            "explicacao": (
-                f"Histórico classificado como '{tendencia_historico}'. "
-                f"A previsão é '{tendencia_prevista}' em relação ao último preço."
-            )
-        }
+# Registro de modelos por ticker (LRU por quantidade e por memória dos pesos)
+REGISTRO_MAX_MODELOS = int(os.getenv("REGISTRO_MAX_MODELOS", "100"))
+REGISTRO_MAX_MB = float(os.getenv("REGISTRO_MAX_MB", "512"))
+# Ticker sem modelo: o 404 fica guardado por REGISTRO_AUSENTE_TTL_S (sem nova busca/HEAD no S3)
+REGISTRO_AUSENTE_TTL_S = float(os.getenv("REGISTRO_AUSENTE_TTL_S", "60"))
+
+# Recarga a quente: intervalo entre verificações dos artefatos (0 desliga)
+RECARGA_INTERVALO_S = float(os.getenv("RECARGA_INTERVALO_S", "30"))
+
+# Cache de previsões por (ticker, versão do modelo, hash da janela)
+CACHE_PREVISOES_MAX = int(os.getenv("CACHE_PREVISOES_MAX", "10000"))
+CACHE_PREVISOES_TTL_S = float(os.getenv("CACHE_PREVISOES_TTL_S", "3600"))
+
+# Métricas (GET /metrics, formato texto do Prometheus)
+metricas = RegistroMetricas(prefixo="lstm_api_")
+LATENCIA_ROTA = metricas.histograma(
+    "requisicao_segundos", "Latência por rota HTTP (perf_counter).", ("metodo", "rota", "status"))
+EM_ANDAMENTO = metricas.gauge("requisicoes_em_andamento", "Requisições HTTP em andamento.", ("metodo",))
+ETAPAS = metricas.histograma("etapa_segundos", "Tempo por etapa do /prever e /prever/lote.", ("rota", "etapa"))
+LOTE_MODELO = metricas.histograma("modelo_lote_segundos", "Tempo de uma chamada ao modelo (lote inteiro).")
+CARGA_MODELO = metricas.histograma(
+    "modelo_carga_segundos", "Tempo de carga de um modelo no registro.", buckets=BUCKETS_CARGA)
+ESPERA_INFERENCIA = metricas.histograma(
+    "inferencia_fila_segundos", "Tempo na fila do executor de inferência até a chamada ao modelo.")
+VERSAO_MODELO = metricas.gauge("modelo_versao_info", "Versão servida de cada ticker (valor sempre 1).", ("ticker", "versao"))
+
+# Séries resolvidas uma vez: no caminho quente só sobra o `observar`
+T_VALIDACAO = ETAPAS.serie("/prever", "validacao")
+T_INFERENCIA = ETAPAS.serie("/prever", "inferencia")
+T_TENDENCIA = ETAPAS.serie("/prever", "tendencia")
+T_SERIALIZACAO = ETAPAS.serie("/prever", "serializacao")
+T_RAPIDO_DECODIFICACAO = ETAPAS.serie("/prever/rapido", "decodificacao")
+T_RAPIDO_VALIDACAO = ETAPAS.serie("/prever/rapido", "validacao")
+T_RAPIDO_INFERENCIA = ETAPAS.serie("/prever/rapido", "inferencia")
+T_RAPIDO_TENDENCIA = ETAPAS.serie("/prever/rapido", "tendencia")
+T_RAPIDO_SERIALIZACAO = ETAPAS.serie("/prever/rapido", "serializacao")
+T_LOTE_VALIDACAO = ETAPAS.serie("/prever/lote", "validacao")
+T_LOTE_INFERENCIA = ETAPAS.serie("/prever/lote", "inferencia")
+T_LOTE_TENDENCIA = ETAPAS.serie("/prever/lote", "tendencia")
+T_LOTE_SERIALIZACAO = ETAPAS.serie("/prever/lote", "serializacao")
+T_HORIZONTE_INFERENCIA = ETAPAS.serie("/prever/horizonte", "inferencia")
+T_HORIZONTE_SERIALIZACAO = ETAPAS.serie("/prever/horizonte", "serializacao")
+T_HORIZONTE_LOTE_INFERENCIA = ETAPAS.serie("/prever/horizonte/lote", "inferencia")
+T_HORIZONTE_LOTE_SERIALIZACAO = ETAPAS.serie("/prever/horizonte/lote", "serializacao")
+T_LOTE_MODELO = LOTE_MODELO.serie()
+T_CARGA_MODELO = CARGA_MODELO.serie()
+
+app.add_middleware(MiddlewareMetricas, latencia=LATENCIA_ROTA, em_andamento=EM_ANDAMENTO,
+                   emissor=EmissorUDP.do_ambiente())
+
+# Chamadas ao modelo num pool dedicado (INFERENCIA_THREADS), com fila limitada
+# (INFERENCIA_FILA_MAX → 429) e prazo por chamada (INFERENCIA_PRAZO_MS → 504)
+executor = ExecutorInferencia.do_ambiente(espera=ESPERA_INFERENCIA.serie())
+
+@app.exception_handler(FilaCheia)
+async def fila_cheia(request: Request, exc: FilaCheia):
+    return JSONResponse(status_code=429, content={"detail": f"Servidor ocupado: {exc}."},
+                        headers={"Retry-After": "1"})
+
+@app.exception_handler(PrazoExcedido)
+async def prazo_excedido(request: Request, exc: PrazoExcedido):
+    return JSONResponse(status_code=504, content={"detail": f"Tempo esgotado: {exc}."})
+
+cache = CachePrevisoes(
+    max_itens=CACHE_PREVISOES_MAX,
+    ttl_s=CACHE_PREVISOES_TTL_S,
+    compartilhado=criar_backend_compartilhado(),
+)
+
+# Histórico de fechamentos por ticker em memória (GET /prever?ticker=): ring buffers float32
+HISTORICO_CAPACIDADE = int(os.getenv("HISTORICO_CAPACIDADE", "256"))
+# Cada worker relê do dataset os pregões novos dos seus tickers (o POST da coleta chega a um só worker)
+HISTORICO_ATUALIZAR_S = float(os.getenv("HISTORICO_ATUALIZAR_S", "60"))
+
+historico = HistoricoStore(capacidade=HISTORICO_CAPACIDADE, bucket=os.getenv("HISTORICO_BUCKET") or None)
+
+# Carrega o par modelo+scaler de um ticker (roda no threadpool do registro)
+def carregar_modelo_servido(ticker: str) -> ModeloServido:
+    inicio = time.perf_counter()
+    # Assinatura lida antes dos artefatos: se mudarem durante a carga, a próxima verificação recarrega
+    assinatura = assinatura_artefatos(None if ticker == ATIVO else ticker)
+    backend, scaler = carregar_artefatos(None if ticker == ATIVO else ticker)
+    prever_lote = cronometrar(backend.prever, T_LOTE_MODELO)
+    modelo = ModeloServido(
+        ticker=ticker,
+        versao=versao_modelo(backend, scaler),
+        backend=backend,
+        scaler=scaler,
+        escala=EscalaMinMax(scaler),
+        batcher=MicroBatcher(prever_lote, max_janelas=BATCH_MAX_JANELAS, espera_ms=BATCH_ESPERA_MS,
+                             executar=executor.executar),
+        assinatura=assinatura,
     )
+    T_CARGA_MODELO.observar(time.perf_counter() - inicio)
+    VERSAO_MODELO.serie(ticker, modelo.versao).definir(1)
+    return modelo
+
+# Modelo removido ou substituído: descarta as previsões em cache do ticker e a série da versão
+def descartar_modelo(modelo: ModeloServido):
+    cache.invalidar(modelo.ticker)
+    VERSAO_MODELO.remover(modelo.ticker, modelo.versao)
+
+registro = RegistroModelos(
+    carregar_modelo_servido,
+    max_modelos=REGISTRO_MAX_MODELOS,
+    max_bytes=int(REGISTRO_MAX_MB * 1024 * 1024),
+    ao_remover=descartar_modelo,
+    ausente=(ModeloNaoEncontrado,),
+    ttl_ausente_s=REGISTRO_AUSENTE_TTL_S,
+)
+
+observador = ObservadorModelos(
+    registro,
+    carregar_modelo_servido,
+    assinatura=lambda ticker: assinatura_artefatos(None if ticker == ATIVO else ticker),
+    intervalo_s=RECARGA_INTERVALO_S,
+)
+
+# Carrega o modelo padrão na inicialização: se falhar, o worker não sobe
+@app.on_event("startup")
+async def carregar_modelo_padrao():
+    try:
+        await registro.obter(ATIVO)
+    except Exception as e:
+        raise RuntimeError(f"❌ Erro ao inicializar a aplicação: {e}")
+
+    # Históricos pré-carregados (HISTORICO_TICKERS); falha aqui não impede o worker de subir
+    loop = asyncio.get_running_loop()
+    if historico.faltando:
+        print(f"⚠ Histórico do dataset desativado (faltam {', '.join(historico.faltando)} nesta imagem): "
+              "GET /prever?ticker= só usa barras enviadas ao POST /historico/{ticker}.")
+    for ticker in ([] if historico.faltando else tickers_preload()):
+        try:
+            await loop.run_in_executor(None, historico.carregar, ticker)
+        except Exception as e:
+            print(f"⚠ Histórico de {ticker} não carregado: {e}")
+
+    observador.iniciar(loop)
+    historico.iniciar(HISTORICO_ATUALIZAR_S)
+
+@app.on_event("shutdown")
+def encerrar_segundo_plano():
+    observador.parar()
+    historico.parar()
+    cache.encerrar()
+    executor.encerrar()
+
+# Resolve o ticker da requisição e obtém o modelo correspondente
+def normalizar_ticker(ticker: Optional[str]) -> str:
+    ticker = (ticker or ATIVO).strip().upper()
+    if not TICKER_REGEX.match(ticker):
+        raise HTTPException(status_code=400, detail=f"Ticker '{ticker}' inválido.")
+    return ticker
+
+async def obter_modelo(ticker: Optional[str]) -> ModeloServido:
+    ticker = normalizar_ticker(ticker)
+    try:
+        return await registro.obter(ticker)
+    except ModeloNaoEncontrado:
+        raise HTTPException(status_code=404, detail=f"Não há modelo disponível para o ticker '{ticker}'.")
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Erro ao carregar o modelo de '{ticker}': {e}")
+
+# 1) Valida quantidade e escala; devolve (batch, WINDOW_SIZE) float32 de preços
+def preparar_entrada(historicos: List[List[float]], modelo: ModeloServido,
+                     prefixos: Optional[List[str]] = None) -> np.ndarray:
+    try:
+        janelas = preparar_janelas(historicos, WINDOW_SIZE, prefixos)
+        modelo.escala.validar_faixa(janelas, prefixos)
+    except ErroValidacao as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return janelas
+
+# 2) Monta o payload de resposta de cada janela (tendências calculadas em lote)
+def montar_respostas(ticker: str, janelas: np.ndarray, preds, ultimos: List[float],
+                     versao: Optional[str] = None) -> List[dict]:
+    tendencias_hist = tendencias_historico(janelas)
+    tendencias_prev = tendencias_previstas(preds, ultimos)
+    return [
+        montar_resposta(ticker, ultimo, float(pred), t_hist, t_prev, versao)
+        for ultimo, pred, t_hist, t_prev in zip(ultimos, preds, tendencias_hist, tendencias_prev)
+    ]
+
+# 2b) Caminho previsto de cada janela: preço e tendência de cada dia (em relação ao dia anterior)
+def montar_horizontes(ticker: str, janelas: np.ndarray, caminhos: np.ndarray, ultimos: List[float],
+                      versao: Optional[str] = None) -> List[dict]:
+    ultimos_arr = np.asarray(ultimos, dtype=np.float64)
+    anteriores = np.concatenate([ultimos_arr[:, np.newaxis], caminhos[:, :-1]], axis=1)
+    tendencias_dias = np.asarray(
+        tendencias_previstas(caminhos.ravel(), anteriores.ravel()), dtype=object).reshape(caminhos.shape)
+    tendencias_hist = tendencias_historico(janelas)
+    tendencias_finais = tendencias_previstas(caminhos[:, -1], ultimos_arr)
+
+    respostas = []
+    for ultimo, caminho, t_dias, t_hist, t_final in zip(
+            ultimos, caminhos, tendencias_dias, tendencias_hist, tendencias_finais):
+        respostas.append({
+            "ticker": ticker,
+            "ultimo_preco": f"US$ {ultimo:.2f}",
+            "horizonte": len(caminho),
+            "previsoes": [
+                {"dia": k + 1, "preco_previsto": f"US$ {float(preco):.2f}", "tendencia_prevista": t}
+                for k, (preco, t) in enumerate(zip(caminho, t_dias))
+            ],
+            "tendencia_historico": t_hist,
+            "tendencia_horizonte": t_final,
+            "explicacao": (
+                f"Histórico classificado como '{t_hist}'. Em {len(caminho)} dias a previsão é "
+                f"'{t_final}' em relação ao último preço; cada dia compara com o dia anterior."
+            ),
+            "versao_modelo": versao,
+        })
+    return respostas
+
+# Rollout autoregressivo de um lote de janelas (em preço), fora do event loop
+async def prever_caminhos(modelo: ModeloServido, janelas: np.ndarray, horizonte: int, serie) -> np.ndarray:
+    inicio = time.perf_counter()
+    X = modelo.escala.transformar(janelas)[:, :, np.newaxis]
+    caminhos_norm = await executor.executar(modelo.backend.prever_horizonte, X, horizonte)
+    caminhos = modelo.escala.inverter(np.asarray(caminhos_norm, dtype=np.float32))
+    serie.observar(time.perf_counter() - inicio)
+    return caminhos
+
+# 3) Serializa o payload (JSONResponse renderiza o corpo no construtor)
+def serializar(conteudo, serie, classe=JSONResponse) -> JSONResponse:
+    inicio = time.perf_counter()
+    resposta = classe(content=conteudo)
+    serie.observar(time.perf_counter() - inicio)
+    return resposta
+
+def montar_resposta(ticker: str, ultimo_preco: float, pred: float,
+                    tendencia_historico: str, tendencia_prevista: str, versao: Optional[str] = None) -> dict:
+    return {
+        "ticker": ticker,
+        "ultimo_preco": f"US$ {ultimo_preco:.2f}",
+        "preco_previsto": f"US$ {pred:.2f}",
+        "tendencia_historico": tendencia_historico,
+        "tendencia_prevista": tendencia_prevista,
+        "explicacao": (
+            f"Histórico classificado como '{tendencia_historico}'. "
+            f"A previsão é '{tendencia_prevista}' em relação ao último preço."
+        ),
+        # Mesmos preços em número, para clientes que não querem interpretar "US$ x.xx"
+        "valores": {"ultimo_preco": round(float(ultimo_preco), 4), "preco_previsto": round(float(pred), 4)},
+        # Versão do modelo que respondeu (muda após uma recarga a quente)
+        "versao_modelo": versao,
+    }
+
+@app.post("/prever")
+async def prever(request: PrevisaoRequest):
+    modelo = await obter_modelo(request.ticker)
+
+    # 1) Valida quantidade e escala (vetorizado)
+    inicio = time.perf_counter()
+    janelas = preparar_entrada([request.historico], modelo)
+    T_VALIDACAO.observar(time.perf_counter() - inicio)
+    return await prever_janela(modelo, janelas, request.historico[-1])
+
+@app.get("/prever")
+async def prever_do_historico(ticker: Optional[str] = None):
+    """Previsão a partir do histórico em memória do ticker: nenhum corpo na requisição."""
+    modelo = await obter_modelo(ticker)
+    janela = await janela_historico(modelo.ticker)
+
+    inicio = time.perf_counter()
+    janelas = preparar_entrada([janela], modelo)
+    T_VALIDACAO.observar(time.perf_counter() - inicio)
+    return await prever_janela(modelo, janelas, float(janela[-1]))
+
+@app.post("/prever/rapido")
+async def prever_rapido(request: Request, ticker: Optional[str] = None):
+    """
+    Caminho rápido do /prever: lê o corpo cru sem Pydantic.
+    - application/octet-stream: float32 little-endian (ticker na query)
+    - application/msgpack: {"historico": [...] ou bytes float32, "ticker": ...}
+    - application/json (padrão): mesmo corpo do POST /prever, lido com orjson
+    Resposta via orjson, com os campos formatados e "valores" numéricos.
+    """
+    inicio = time.perf_counter()
+    try:
+        historico_req, ticker_corpo = decodificar_entrada(
+            request.headers.get("content-type", ""), await request.body())
+    except ErroValidacao as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    T_RAPIDO_DECODIFICACAO.observar(time.perf_counter() - inicio)
+
+    modelo = await obter_modelo(ticker or ticker_corpo)
+    inicio = time.perf_counter()
+    janelas = preparar_entrada([historico_req], modelo)
+    T_RAPIDO_VALIDACAO.observar(time.perf_counter() - inicio)
+    resposta = await calcular_previsao(modelo, janelas, float(historico_req[-1]),
+                                       T_RAPIDO_INFERENCIA, T_RAPIDO_TENDENCIA)
+    return serializar(resposta, T_RAPIDO_SERIALIZACAO, RespostaRapida)
+
+# Últimos WINDOW_SIZE fechamentos do ticker (carrega do dataset na primeira vez)
+async def janela_historico(ticker: str) -> np.ndarray:
+    if ticker not in historico:
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, historico.carregar, ticker)
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail=f"Não há histórico armazenado para o ticker '{ticker}'.")
+        except LeituraIndisponivel as e:
+            raise HTTPException(status_code=503, detail=f"Histórico de '{ticker}' não está em memória. {e}")
+        except Exception as e:
+            raise HTTPException(status_code=503, detail=f"Erro ao carregar o histórico de '{ticker}': {e}")
+    janela = historico.janela(ticker, WINDOW_SIZE)
+    if len(janela) < WINDOW_SIZE:
+        raise HTTPException(status_code=400, detail=(
+            f"Histórico de '{ticker}' tem {len(janela)} pregões; são necessários {WINDOW_SIZE}."))
+    return janela
+
+# Previsão de uma janela já validada (cache + micro-batching), comum ao POST e ao GET /prever
+async def prever_janela(modelo: ModeloServido, janelas: np.ndarray, ultimo: float):
+    return serializar(await calcular_previsao(modelo, janelas, ultimo), T_SERIALIZACAO)
+
+async def calcular_previsao(modelo: ModeloServido, janelas: np.ndarray, ultimo: float,
+                            t_inferencia=T_INFERENCIA, t_tendencia=T_TENDENCIA) -> dict:
+    # 2) Mesma janela já prevista por esta versão do modelo?
+    chave = cache.chave(modelo.ticker, modelo.versao, janelas[0])
+    resposta = await cache.obter(chave)
+    if resposta is not None:
+        return resposta
+
+    # 3) Previsão na escala do treino (agrupada com outras requisições concorrentes do mesmo ticker)
+    inicio = time.perf_counter()
+    entrada = modelo.escala.transformar(janelas[0])[:, np.newaxis]
+    pred_norm = await modelo.batcher.submeter(entrada)
+    pred = float(modelo.escala.inverter(pred_norm))
+    custo_s = time.perf_counter() - inicio
+    t_inferencia.observar(custo_s)
+
+    # 4) Tendências e resposta
+    inicio = time.perf_counter()
+    resposta = montar_respostas(modelo.ticker, janelas, [pred], [ultimo], modelo.versao)[0]
+    t_tendencia.observar(time.perf_counter() - inicio)
+    cache.guardar(chave, resposta, custo_s)
+    return resposta
+
+@app.post("/prever/lote")
+async def prever_lote(request: PrevisaoLoteRequest):
+    if not request.historicos:
+        raise HTTPException(status_code=400, detail="Informe ao menos um item em 'historicos'.")
+    modelo = await obter_modelo(request.ticker)
+
+    # 1) Valida todas as janelas de uma vez
+    inicio = time.perf_counter()
+    prefixos = [f"historicos[{k}]: " for k in range(len(request.historicos))]
+    janelas = preparar_entrada(request.historicos, modelo, prefixos)
+    T_LOTE_VALIDACAO.observar(time.perf_counter() - inicio)
+
+    # 2) Separa as janelas já em cache
+    chaves = [cache.chave(modelo.ticker, modelo.versao, janela) for janela in janelas]
+    respostas = await cache.obter_varios(chaves)
+    faltando = [k for k, resposta in enumerate(respostas) if resposta is None]
+
+    if faltando:
+        # 3) Uma única chamada ao modelo para as janelas restantes, fora do event loop
+        inicio = time.perf_counter()
+        X = modelo.escala.transformar(janelas[faltando])[:, :, np.newaxis]
+        preds_norm = await executor.executar(modelo.batcher.funcao_lote, X)
+        preds = modelo.escala.inverter(preds_norm)
+        duracao = time.perf_counter() - inicio
+        T_LOTE_INFERENCIA.observar(duracao)
+        custo_s = duracao / len(faltando)
+
+        # 4) Mesmo formato de resposta do /prever, um item por janela
+        inicio = time.perf_counter()
+        ultimos = [request.historicos[k][-1] for k in faltando]
+        novas = montar_respostas(modelo.ticker, janelas[faltando], preds, ultimos, modelo.versao)
+        T_LOTE_TENDENCIA.observar(time.perf_counter() - inicio)
+        for k, resposta in zip(faltando, novas):
+            respostas[k] = resposta
+            cache.guardar(chaves[k], resposta, custo_s)
+
+    return serializar({"previsoes": respostas}, T_LOTE_SERIALIZACAO)
+
+@app.post("/prever/horizonte")
+async def prever_horizonte(request: PrevisaoHorizonteRequest):
+    modelo = await obter_modelo(request.ticker)
+    janelas = preparar_entrada([request.historico], modelo)
+    caminhos = await prever_caminhos(modelo, janelas, request.horizonte, T_HORIZONTE_INFERENCIA)
+    resposta = montar_horizontes(modelo.ticker, janelas, caminhos, [request.historico[-1]], modelo.versao)[0]
+    return serializar(resposta, T_HORIZONTE_SERIALIZACAO)
+
+@app.post("/prever/horizonte/lote")
+async def prever_horizonte_lote(request: PrevisaoHorizonteLoteRequest):
+    if not request.itens:
+        raise HTTPException(status_code=400, detail="Informe ao menos um item em 'itens'.")
+
+    # 1) Agrupa os itens por ticker: um rollout (lote) por modelo
+    grupos = {}
+    for k, item in enumerate(request.itens):
+        grupos.setdefault((item.ticker or ATIVO).strip().upper(), []).append(k)
+
+    async def prever_grupo(ticker, indices):
+        modelo = await obter_modelo(ticker)
+        historicos = [request.itens[k].historico for k in indices]
+        janelas = preparar_entrada(historicos, modelo, [f"itens[{k}]: " for k in indices])
+        caminhos = await prever_caminhos(modelo, janelas, request.horizonte, T_HORIZONTE_LOTE_INFERENCIA)
+        return indices, montar_horizontes(
+            modelo.ticker, janelas, caminhos, [h[-1] for h in historicos], modelo.versao)
+
+    # 2) Tickers diferentes rodam em paralelo; a resposta mantém a ordem de `itens`
+    respostas = [None] * len(request.itens)
+    for indices, grupo in await asyncio.gather(*(prever_grupo(t, idx) for t, idx in grupos.items())):
+        for k, resposta in zip(indices, grupo):
+            respostas[k] = resposta
+    return serializar({"previsoes": respostas}, T_HORIZONTE_LOTE_SERIALIZACAO)
+
+@app.post("/historico/{ticker}")
+def anexar_historico(ticker: str, request: HistoricoAnexarRequest):
+    """Barras novas (ex.: enviadas por data/coleta.py); com 'datas', pregões já em memória são ignorados."""
+    ticker = normalizar_ticker(ticker)
+    try:
+        anexados = historico.anexar(ticker, request.precos, request.datas)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"ticker": ticker, "anexados": anexados, **historico.estatisticas()["tickers"][ticker]}
+
+@app.post("/historico/{ticker}/atualizar")
+def atualizar_historico(ticker: str):
+    """Relê do dataset só os pregões após a última data em memória."""
+    ticker = normalizar_ticker(ticker)
+    try:
+        anexados = historico.atualizar(ticker)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Não há histórico armazenado para o ticker '{ticker}'.")
+    except LeituraIndisponivel as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return {"ticker": ticker, "anexados": anexados, **historico.estatisticas()["tickers"][ticker]}
+
+@app.get("/historico")
+def estatisticas_historico():
+    return historico.estatisticas()
+
+@app.get("/registro")
+def estatisticas_registro():
+    return {**registro.estatisticas(), "recarga": observador.estatisticas(), "inferencia": executor.estatisticas()}
+
+@app.get("/cache")
+def estatisticas_cache():
+    return cache.estatisticas()
+
+# Estatísticas do registro e do cache lidas só na raspagem do /metrics
+@metricas.coletor
+def coletar_estatisticas():
+    reg = registro.estatisticas()
+    yield "registro_modelos_carregados", "gauge", "Modelos em memória no registro.", reg["modelos_carregados"]
+    yield "registro_bytes_em_uso", "gauge", "Bytes de pesos em memória no registro.", reg["bytes_em_uso"]
+    yield "registro_hits_total", "counter", "Modelos encontrados em memória.", reg["hits"]
+    yield "registro_misses_total", "counter", "Modelos carregados sob demanda.", reg["misses"]
+    yield "registro_cargas_compartilhadas_total", "counter", "Requisições que aguardaram uma carga já em curso.", reg["cargas_compartilhadas"]
+    yield "registro_evictions_total", "counter", "Modelos despejados (LRU).", reg["evictions"]
+    yield "registro_falhas_total", "counter", "Falhas de carga de modelo.", reg["falhas"]
+    yield "registro_recargas_total", "counter", "Modelos trocados por recarga a quente.", reg["recargas"]
+    exe = executor.estatisticas()
+    yield "inferencia_pendentes", "gauge", "Chamadas ao modelo na fila ou em execução.", exe["pendentes"]
+    yield "inferencia_rejeitadas_total", "counter", "Chamadas recusadas com 429 (fila cheia).", exe["rejeitadas"]
+    yield "inferencia_expiradas_total", "counter", "Chamadas que estouraram o prazo (504).", exe["expiradas"]
+    rec = observador.estatisticas()
+    yield "recarga_verificacoes_total", "counter", "Verificações de artefatos de modelos carregados.", rec["verificacoes"]
+    yield "recarga_falhas_total", "counter", "Recargas que falharam (modelo anterior mantido).", rec["falhas"]
+    est = cache.estatisticas()
+    yield "cache_itens", "gauge", "Previsões em cache local.", est["itens"]
+    yield "cache_hits_total", "counter", "Acertos do cache de previsões.", est["hits"]
+    yield "cache_hits_compartilhados_total", "counter", "Acertos vindos do backend compartilhado.", est["hits_compartilhados"]
+    yield "cache_misses_total", "counter", "Falhas do cache de previsões.", est["misses"]
+    yield "cache_invalidacoes_total", "counter", "Entradas invalidadas.", est["invalidacoes"]
+    yield "cache_latencia_economizada_segundos_total", "counter", "Tempo de modelo poupado pelo cache.", est["latencia_economizada_s"]
+
+@app.get("/metrics")
+def exportar_metricas():
+    return PlainTextResponse(metricas.exportar(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,298 @@
+# app/metricas.py
+
+import os
+import socket
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Buckets de latência (segundos): de 0,5 ms a 10 s
+BUCKETS_LATENCIA = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Carga de modelo: de 50 ms (NPZ em cache local) a 2 min (download + TensorFlow)
+BUCKETS_CARGA = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _formatar_rotulos(nomes: Sequence[str], valores: Sequence, extra: str = "") -> str:
+    pares = [f'{n}="{_escapar(v)}"' for n, v in zip(nomes, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def _formatar_numero(valor: float) -> str:
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(float(valor)) if not float(valor).is_integer() else str(int(valor))
+
+
+class _SerieHistograma:
+    """Uma combinação de rótulos: contagem por bucket (não acumulada), soma e total."""
+
+    __slots__ = ("_limites", "_contagens", "soma", "total", "_trava")
+
+    def __init__(self, limites: Tuple[float, ...]):
+        self._limites = limites
+        self._contagens = [0] * (len(limites) + 1)
+        self.soma = 0.0
+        self.total = 0
+        self._trava = threading.Lock()
+
+    def observar(self, valor: float):
+        i = bisect_left(self._limites, valor)
+        with self._trava:
+            self._contagens[i] += 1
+            self.soma += valor
+            self.total += 1
+
+    def acumulado(self) -> List[int]:
+        with self._trava:
+            contagens = list(self._contagens)
+        acumulado, total = [], 0
+        for c in contagens:
+            total += c
+            acumulado.append(total)
+        return acumulado
+
+
+class _SerieValor:
+    """Contador ou gauge de uma combinação de rótulos."""
+
+    __slots__ = ("valor", "_trava")
+
+    def __init__(self):
+        self.valor = 0.0
+        self._trava = threading.Lock()
+
+    def inc(self, quantidade: float = 1.0):
+        with self._trava:
+            self.valor += quantidade
+
+    def dec(self, quantidade: float = 1.0):
+        with self._trava:
+            self.valor -= quantidade
+
+    def definir(self, valor: float):
+        self.valor = valor
+
+    # Contadores usam `observar` como sinônimo de `inc` para casar com a interface do histograma
+    observar = inc
+
+
+class _Metrica:
+    tipo = ""
+
+    def __init__(self, nome: str, ajuda: str, rotulos: Sequence[str] = ()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self._series: Dict[tuple, object] = {}
+        self._trava = threading.Lock()
+
+    def _nova_serie(self):
+        raise NotImplementedError
+
+    def serie(self, *valores):
+        """
+        Série de uma combinação de rótulos (como `.labels()` do prometheus_client).
+        Guarde o retorno em uma constante no caminho quente para não repetir a busca.
+        """
+        if len(valores) != len(self.rotulos):
+            raise ValueError(f"❌ {self.nome} espera os rótulos {self.rotulos}, recebeu {valores}.")
+        serie = self._series.get(valores)
+        if serie is None:
+            with self._trava:
+                serie = self._series.setdefault(valores, self._nova_serie())
+        return serie
+
+    def remover(self, *valores):
+        """Descarta a série de uma combinação de rótulos (ex.: versão de modelo que saiu de uso)."""
+        with self._trava:
+            self._series.pop(tuple(valores), None)
+
+    def exportar(self) -> Iterable[str]:
+        yield f"# HELP {self.nome} {self.ajuda}"
+        yield f"# TYPE {self.nome} {self.tipo}"
+        for valores, serie in sorted(self._series.items()):
+            yield from self._linhas(valores, serie)
+
+    def _linhas(self, valores, serie) -> Iterable[str]:
+        yield f"{self.nome}{_formatar_rotulos(self.rotulos, valores)} {_formatar_numero(serie.valor)}"
+
+
+class Contador(_Metrica):
+    tipo = "counter"
+
+    def _nova_serie(self):
+        return _SerieValor()
+
+
+class Gauge(_Metrica):
+    tipo = "gauge"
+
+    def _nova_serie(self):
+        return _SerieValor()
+
+
+class Histograma(_Metrica):
+    tipo = "histogram"
+
+    def __init__(self, nome: str, ajuda: str, rotulos: Sequence[str] = (),
+                 buckets: Sequence[float] = BUCKETS_LATENCIA):
+        super().__init__(nome, ajuda, rotulos)
+        self.buckets = tuple(sorted(float(b) for b in buckets))
+
+    def _nova_serie(self):
+        return _SerieHistograma(self.buckets)
+
+    def _linhas(self, valores, serie) -> Iterable[str]:
+        acumulado = serie.acumulado()
+        limites = self.buckets + (float("inf"),)
+        for limite, total in zip(limites, acumulado):
+            rotulos = _formatar_rotulos(self.rotulos, valores, f'le="{_formatar_numero(limite)}"')
+            yield f"{self.nome}_bucket{rotulos} {total}"
+        rotulos = _formatar_rotulos(self.rotulos, valores)
+        yield f"{self.nome}_sum{rotulos} {_formatar_numero(serie.soma)}"
+        yield f"{self.nome}_count{rotulos} {acumulado[-1]}"
+
+
+class RegistroMetricas:
+    """
+    Coleção de métricas exportadas no formato texto do Prometheus (sem dependências).
+
+    1) `histograma`/`contador`/`gauge` criam (ou devolvem) a métrica pelo nome
+    2) `coletor(funcao)` registra uma função chamada só na raspagem, que devolve
+       (nome, tipo, ajuda, valor) — usada para expor estatísticas que já existem
+       em outros objetos (registro de modelos, cache) sem custo por requisição
+    3) `exportar()` gera o corpo do GET /metrics
+    """
+
+    def __init__(self, prefixo: str = ""):
+        self.prefixo = prefixo
+        self._metricas: Dict[str, _Metrica] = {}
+        self._coletores: List[Callable[[], Iterable[Tuple[str, str, str, float]]]] = []
+
+    def _registrar(self, classe, nome: str, *args, **kwargs):
+        nome = self.prefixo + nome
+        metrica = self._metricas.get(nome)
+        if metrica is None:
+            metrica = self._metricas[nome] = classe(nome, *args, **kwargs)
+        elif not isinstance(metrica, classe):
+            raise ValueError(f"❌ Métrica '{nome}' já registrada como {metrica.tipo}.")
+        return metrica
+
+    def histograma(self, nome: str, ajuda: str, rotulos: Sequence[str] = (),
+                   buckets: Sequence[float] = BUCKETS_LATENCIA) -> Histograma:
+        return self._registrar(Histograma, nome, ajuda, rotulos, buckets)
+
+    def contador(self, nome: str, ajuda: str, rotulos: Sequence[str] = ()) -> Contador:
+        return self._registrar(Contador, nome, ajuda, rotulos)
+
+    def gauge(self, nome: str, ajuda: str, rotulos: Sequence[str] = ()) -> Gauge:
+        return self._registrar(Gauge, nome, ajuda, rotulos)
+
+    def coletor(self, funcao: Callable[[], Iterable[Tuple[str, str, str, float]]]):
+        self._coletores.append(funcao)
+        return funcao
+
+    def exportar(self) -> str:
+        linhas: List[str] = []
+        for metrica in self._metricas.values():
+            linhas.extend(metrica.exportar())
+        for coletor in self._coletores:
+            for nome, tipo, ajuda, valor in coletor():
+                nome = self.prefixo + nome
+                linhas.append(f"# HELP {nome} {ajuda}")
+                linhas.append(f"# TYPE {nome} {tipo}")
+                linhas.append(f"{nome} {_formatar_numero(valor)}")
+        return "\n".join(linhas) + "\n"
+
+
+def cronometrar(funcao: Callable, serie) -> Callable:
+    """Envolve `funcao` para observar sua duração (perf_counter) em `serie`."""
+    def medida(*args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return funcao(*args, **kwargs)
+        finally:
+            serie.observar(time.perf_counter() - inicio)
+    return medida
+
+
+class EmissorUDP:
+    """
+    Envia a latência de cada requisição ao agente de métricas (push_metrics.py) por UDP.
+    O sendto é não bloqueante e falhas são ignoradas: sem agente, nada muda na API.
+    """
+
+    def __init__(self, host: str, porta: int, nome: str = "LatenciaRequisicao"):
+        self.destino = (host, int(porta))
+        self.nome = nome
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._socket.setblocking(False)
+
+    @classmethod
+    def do_ambiente(cls) -> Optional["EmissorUDP"]:
+        """METRICAS_UDP_DESTINO=host:porta ativa o envio; vazio (padrão) desativa."""
+        destino = os.getenv("METRICAS_UDP_DESTINO", "")
+        if not destino:
+            return None
+        host, _, porta = destino.rpartition(":")
+        return cls(host or "127.0.0.1", int(porta))
+
+    def enviar(self, rota: str, duracao_s: float):
+        try:
+            self._socket.sendto(f"{self.nome}:{duracao_s * 1000:.3f}|ms|#Rota={rota}".encode(), self.destino)
+        except OSError:
+            pass
+
+
+class MiddlewareMetricas:
+    """
+    Middleware ASGI puro (sem BaseHTTPMiddleware) que mede cada requisição HTTP:
+
+    1) Gauge de requisições em andamento por método
+    2) Histograma de latência (perf_counter) por método, rota e status
+    3) A rota é o template do FastAPI (ex.: "/prever/lote"), nunca o path bruto;
+       paths sem rota viram "nao_mapeada" para não explodir a cardinalidade
+    4) Com `emissor`, a latência também vai para o agente de métricas do host
+    """
+
+    def __init__(self, app, latencia: Histograma, em_andamento: Gauge,
+                 emissor: Optional[EmissorUDP] = None):
+        self.app = app
+        self.latencia = latencia
+        self.em_andamento = em_andamento
+        self.emissor = emissor
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def enviar(mensagem):
+            nonlocal status
+            if mensagem["type"] == "http.response.start":
+                status = mensagem["status"]
+            await send(mensagem)
+
+        metodo = scope["method"]
+        andamento = self.em_andamento.serie(metodo)
+        andamento.inc()
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            duracao = time.perf_counter() - inicio
+            andamento.dec()
+            rota = scope.get("route")
+            caminho = getattr(rota, "path", None) or "nao_mapeada"
+            self.latencia.serie(metodo, caminho, str(status)).observar(duracao)
+            if self.emissor is not None:
+                self.emissor.enviar(caminho, duracao)
@@ -0,0 +1,73 @@
+# app/microbatch.py
+
+import asyncio
+from typing import Awaitable, Callable, List, Optional, Set, Tuple
+
+import numpy as np
+
+
+class MicroBatcher:
+    """
+    Agrupa janelas enviadas por requisições concorrentes e executa o modelo
+    uma única vez com o tensor empilhado.
+
+    1) Cada chamada a `submeter` entra numa fila pendente e recebe um Future
+    2) A fila é despachada quando atinge `max_janelas` ou após `espera_ms`
+    3) `funcao_lote` recebe um array (n, janela, 1) e devolve n previsões
+       normalizadas; roda fora do event loop, em `executar(funcao, X)` (ex.: o
+       ExecutorInferencia) ou, sem ele, no threadpool padrão
+    """
+
+    def __init__(self, funcao_lote: Callable[[np.ndarray], np.ndarray],
+                 max_janelas: int = 32, espera_ms: float = 5.0,
+                 executar: Optional[Callable[..., Awaitable]] = None):
+        self.funcao_lote = funcao_lote
+        self.executar = executar
+        self.max_janelas = max(1, int(max_janelas))
+        self.espera_ms = max(0.0, float(espera_ms))
+        self._pendentes: List[Tuple[np.ndarray, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # O loop só guarda referências fracas às tarefas: sem esta, um lote em execução
+        # poderia ser coletado e deixar os Futures das requisições sem resposta
+        self._tarefas: Set[asyncio.Task] = set()
+
+    async def submeter(self, janela: np.ndarray) -> float:
+        loop = asyncio.get_running_loop()
+        futuro = loop.create_future()
+        self._pendentes.append((janela, futuro))
+
+        if len(self._pendentes) >= self.max_janelas:
+            self._despachar()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.espera_ms / 1000.0, self._despachar)
+
+        return await futuro
+
+    def _despachar(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pendentes:
+            return
+        lote, self._pendentes = self._pendentes, []
+        tarefa = asyncio.get_running_loop().create_task(self._executar(lote))
+        self._tarefas.add(tarefa)
+        tarefa.add_done_callback(self._tarefas.discard)
+
+    async def _executar(self, lote: List[Tuple[np.ndarray, asyncio.Future]]):
+        loop = asyncio.get_running_loop()
+        X = np.stack([janela for janela, _ in lote])
+        try:
+            if self.executar is not None:
+                preds = await self.executar(self.funcao_lote, X)
+            else:
+                preds = await loop.run_in_executor(None, self.funcao_lote, X)
+        except Exception as e:
+            for _, futuro in lote:
+                if not futuro.done():
+                    futuro.set_exception(e)
+            return
+
+        for (_, futuro), pred in zip(lote, preds):
+            if not futuro.done():
+                futuro.set_result(float(pred))
@@ -1,45 +1,89 @@
 # projeto_lstm_acoes/app/model_loader.py
 
+import hashlib
 import os
-import boto3
-import joblib
-from tensorflow.keras.models import load_model
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-def carregar_modelo():
+import numpy as np
+
+from app.artifact_cache import cache_artefatos, cliente_s3
+from app.lstm_numpy import PRECISOES, LSTMNumpy, carregar_npy, carregar_npz, extrair_npy, remover_extracoes_antigas
+
+# TensorFlow e joblib/sklearn são importados sob demanda: no modo SERVING_MODE=npz
+# a imagem de runtime não precisa deles.
+
+
+class ModeloNaoEncontrado(RuntimeError):
+    """Artefato (modelo, scaler ou pesos NPZ) inexistente para o ticker pedido."""
+
+
+def diretorio_modelos(ticker=None):
     """
-    1) Se definidas BUCKET_NAME e MODEL_KEY, baixa do S3 para /app/model/<nome_do_arquivo>
-    2) Caso contrário, busca ‘/app/model/modelo_lstm.keras’ (nome local exato)
+    Diretório local dos artefatos: <MODEL_DIR> (padrão /app/model) para o modelo
+    padrão e <MODEL_DIR>/<TICKER>/ para modelos por ticker.
     """
-    bucket = os.getenv("BUCKET_NAME")
-    model_key = os.getenv("MODEL_KEY")  # ex.: "model/modelo_lstm_padrao.keras"
-    local_dir = "/app/model"
-    os.makedirs(local_dir, exist_ok=True)
+    base = os.getenv("MODEL_DIR", "/app/model")
+    return os.path.join(base, ticker) if ticker else base
 
-    if model_key:
-        filename = os.path.basename(model_key)  # “modelo_lstm_padrao.keras” se vier do S3
+
+def _resolver_artefato(ticker, env_key, nome_padrao):
+    """
+    Resolve (chave S3, caminho local) de um artefato.
+    - Sem ticker: usa <env_key> (ex.: MODEL_KEY) e o nome padrão em <MODEL_DIR>
+    - Com ticker: usa <env_key>_TEMPLATE (ex.: "modelos/{ticker}/modelo_lstm.keras") e <MODEL_DIR>/<TICKER>/
+    """
+    if ticker:
+        template = os.getenv(f"{env_key}_TEMPLATE")
+        chave = template.format(ticker=ticker) if template else None
     else:
-        # fallback local: usa exatamente o arquivo que existe no repositório
-        filename = "modelo_lstm.keras"
+        chave = os.getenv(env_key)
 
-    local_model_path = os.path.join(local_dir, filename)
+    # Só resolve o caminho: artefatos do S3 vão para o cache (ARTIFACT_CACHE_DIR), nada é criado aqui
+    filename = os.path.basename(chave) if chave else nome_padrao
+    return chave, os.path.join(diretorio_modelos(ticker), filename)
 
-    # Se BUCKET_NAME e MODEL_KEY estiverem definidos, baixa do S3
-    if bucket and model_key:
-        s3 = boto3.client("s3")
-        try:
-            print(f"☁️ Baixando modelo do S3: s3://{bucket}/{model_key} → {local_model_path}")
-            s3.download_file(bucket, model_key, local_model_path)
-            print("✅ Download concluído.")
-        except Exception as e:
-            raise RuntimeError(f"❌ Erro ao baixar o modelo do S3: {e}")
+
+def _obter_artefato(chave, local_path, descricao):
+    """
+    Se BUCKET_NAME e a chave estiverem definidos, devolve o caminho no cache local de
+    artefatos (HEAD + GET só quando a versão no S3 mudou). Caso contrário, o caminho local.
+    """
+    bucket = os.getenv("BUCKET_NAME")
+    if not (bucket and chave):
+        return local_path
+    try:
+        print(f"☁️ Verificando {descricao} no S3: s3://{bucket}/{chave}")
+        caminho = cache_artefatos().obter(bucket, chave)
+        print(f"✅ {descricao.capitalize()} disponível em '{caminho}'.")
+        return caminho
+    except Exception as e:
+        codigo = getattr(e, "response", {}).get("Error", {}).get("Code")
+        if codigo in ("404", "NoSuchKey", "NotFound"):
+            raise ModeloNaoEncontrado(f"❌ Não há {descricao} no S3 em s3://{bucket}/{chave}.")
+        raise RuntimeError(f"❌ Erro ao baixar o {descricao} do S3: {e}")
+
+
+def carregar_modelo(ticker=None):
+    """
+    1) Se definidas BUCKET_NAME e MODEL_KEY (ou MODEL_KEY_TEMPLATE com ticker), baixa do S3
+    2) Caso contrário, busca '<MODEL_DIR>/modelo_lstm.keras' (ou '<MODEL_DIR>/<TICKER>/modelo_lstm.keras')
+    """
+    model_key, local_model_path = _resolver_artefato(ticker, "MODEL_KEY", "modelo_lstm.keras")
+    local_model_path = _obter_artefato(model_key, local_model_path, "modelo")
 
     # Verifica se o arquivo localizado existe
     if not os.path.isfile(local_model_path):
-        raise RuntimeError(f"❌ Modelo não encontrado em '{local_model_path}'. "
-                           "Verifique MODEL_KEY/BUCKET_NAME ou copie ‘modelo_lstm.keras’ para /app/model/.")
+        raise ModeloNaoEncontrado(f"❌ Modelo não encontrado em '{local_model_path}'. "
+                                  "Verifique MODEL_KEY/BUCKET_NAME ou copie ‘modelo_lstm.keras’ para /app/model/.")
 
     # Carrega o modelo com Keras
     try:
+        import tensorflow as tf
+        from tensorflow.keras.models import load_model
+
+        from app.executor_inferencia import configurar_threads_tensorflow
+        configurar_threads_tensorflow(tf)
         model = load_model(local_model_path)
         print(f"✅ Modelo carregado com sucesso de '{local_model_path}'")
         return model
@@ -47,43 +91,277 @@ def carregar_modelo():
         raise RuntimeError(f"❌ Erro ao carregar o modelo de '{local_model_path}': {e}")
 
 
-def carregar_scaler():
+def carregar_scaler(ticker=None):
     """
-    1) Se definidas BUCKET_NAME e SCALER_KEY, baixa do S3 para /app/model/<nome_do_scaler>
-    2) Caso contrário, busca ‘/app/model/scaler.gz’ (nome local exato)
+    1) Se definidas BUCKET_NAME e SCALER_KEY (ou SCALER_KEY_TEMPLATE com ticker), baixa do S3
+    2) Caso contrário, busca '<MODEL_DIR>/scaler.gz' (ou '<MODEL_DIR>/<TICKER>/scaler.gz')
     """
-    bucket = os.getenv("BUCKET_NAME")
-    scaler_key = os.getenv("SCALER_KEY")  # ex.: "model/scaler_padrao.gz"
-    local_dir = "/app/model"
-    os.makedirs(local_dir, exist_ok=True)
-
-    if scaler_key:
-        filename = os.path.basename(scaler_key)  # “scaler_padrao.gz” se vier do S3
-    else:
-        # fallback local: usa exatamente o arquivo presente no repositório
-        filename = "scaler.gz"
-
-    local_scaler_path = os.path.join(local_dir, filename)
-
-    # Se BUCKET_NAME e SCALER_KEY estiverem definidos, baixa do S3
-    if bucket and scaler_key:
-        s3 = boto3.client("s3")
-        try:
-            print(f"☁️ Baixando scaler do S3: s3://{bucket}/{scaler_key} → {local_scaler_path}")
-            s3.download_file(bucket, scaler_key, local_scaler_path)
-            print("✅ Download do scaler concluído.")
-        except Exception as e:
-            raise RuntimeError(f"❌ Erro ao baixar o scaler do S3: {e}")
+    scaler_key, local_scaler_path = _resolver_artefato(ticker, "SCALER_KEY", "scaler.gz")
+    local_scaler_path = _obter_artefato(scaler_key, local_scaler_path, "scaler")
 
     # Verifica se o arquivo local existe
     if not os.path.isfile(local_scaler_path):
-        raise RuntimeError(f"❌ Scaler não encontrado em '{local_scaler_path}'. "
-                           "Verifique SCALER_KEY/BUCKET_NAME ou copie ‘scaler.gz’ para /app/model/.")
+        raise ModeloNaoEncontrado(f"❌ Scaler não encontrado em '{local_scaler_path}'. "
+                                  "Verifique SCALER_KEY/BUCKET_NAME ou copie ‘scaler.gz’ para /app/model/.")
 
     # Carrega o scaler com joblib
     try:
+        import joblib
         scaler = joblib.load(local_scaler_path)
         print(f"✅ Scaler carregado com sucesso de '{local_scaler_path}'")
         return scaler
     except Exception as e:
         raise RuntimeError(f"❌ Erro ao carregar o scaler de '{local_scaler_path}': {e}")
+
+
+# ───────────────────────────────────────────────────────
+# Backends de inferência
+# ───────────────────────────────────────────────────────
+class BackendInferencia:
+    """
+    Interface comum de inferência: `prever(X)` recebe (n, janela, 1)
+    e devolve (n,) previsões normalizadas.
+    """
+    nome = "base"
+
+    def __init__(self, modelo, janela=None):
+        self.modelo = modelo
+        self.janela = janela or modelo.input_shape[1]
+
+    @property
+    def nbytes(self) -> int:
+        """Estimativa de memória dos pesos (float32), usada pelo registro de modelos."""
+        return int(self.modelo.count_params()) * 4
+
+    def pesos(self):
+        return self.modelo.get_weights()
+
+    def prever(self, X: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def prever_horizonte(self, X: np.ndarray, horizonte: int) -> np.ndarray:
+        """
+        Rollout autoregressivo deslizando a janela: a cada passo a previsão entra no fim e o
+        valor mais antigo sai. Uma chamada ao modelo por passo (para todo o lote). Devolve (n, horizonte).
+        """
+        n, janela = X.shape[0], X.shape[1]
+        buffer = np.empty((n, janela + horizonte, 1), dtype=np.float32)
+        buffer[:, :janela] = X
+        for k in range(horizonte):
+            buffer[:, janela + k, 0] = self.prever(buffer[:, k:k + janela])
+        return buffer[:, janela:, 0].copy()
+
+
+class BackendKeras(BackendInferencia):
+    """Caminho original: `model.predict` (adapter de dados + callbacks a cada chamada)."""
+    nome = "keras"
+
+    def prever(self, X):
+        return self.modelo.predict(X, verbose=0)[:, 0]
+
+
+class BackendTFFunction(BackendInferencia):
+    """Chamada direta `model(x, training=False)` traçada uma vez com assinatura fixa."""
+    nome = "tf_function"
+
+    def __init__(self, modelo):
+        import tensorflow as tf
+        super().__init__(modelo)
+        self._tf = tf
+        assinatura = [tf.TensorSpec(shape=(None, self.janela, 1), dtype=tf.float32)]
+        self._funcao = tf.function(lambda x: modelo(x, training=False), input_signature=assinatura)
+
+    def prever(self, X):
+        return self._funcao(self._tf.convert_to_tensor(X, dtype=self._tf.float32)).numpy()[:, 0]
+
+
+class BackendNumpy(BackendInferencia):
+    """
+    Forward pass do LSTM em NumPy. Os pesos vêm do modelo Keras ou, sem
+    TensorFlow, de um `LSTMNumpy` já carregado do .npz (modelo=None).
+    """
+    nome = "numpy"
+
+    def __init__(self, modelo=None, lstm=None, janela=None):
+        self.modelo = modelo
+        self.lstm = lstm if lstm is not None else LSTMNumpy.de_modelo_keras(modelo)
+        self.janela = janela or modelo.input_shape[1]
+        # true: rollout continua do estado (h, c); false: desliza a janela como os demais backends
+        self.reusar_estado = os.getenv("HORIZONTE_REUSAR_ESTADO", "true").lower() == "true"
+
+    @property
+    def nbytes(self) -> int:
+        return self.lstm.nbytes
+
+    def pesos(self):
+        l = self.lstm
+        return [l.kernel, l.recurrent_kernel, l.bias, l.dense_kernel, l.dense_bias]
+
+    def prever(self, X):
+        return self.lstm.prever(X)
+
+    def prever_horizonte(self, X, horizonte):
+        if self.reusar_estado:
+            return self.lstm.prever_horizonte(X, horizonte)
+        return super().prever_horizonte(X, horizonte)
+
+
+BACKENDS = {
+    BackendKeras.nome: BackendKeras,
+    BackendTFFunction.nome: BackendTFFunction,
+    BackendNumpy.nome: BackendNumpy,
+}
+
+
+def versao_modelo(backend, scaler) -> str:
+    """
+    Identificador da versão servida: hash dos pesos (float32) e dos parâmetros do scaler.
+    Igual em todos os workers que carregam os mesmos artefatos; muda a cada novo modelo.
+    """
+    h = hashlib.blake2b(digest_size=6)
+    for peso in backend.pesos():
+        h.update(np.ascontiguousarray(peso, dtype=np.float32).tobytes())
+    for atributo in ("data_min_", "data_max_", "scale_", "min_"):
+        h.update(np.ascontiguousarray(getattr(scaler, atributo), dtype=np.float64).tobytes())
+    return h.hexdigest()
+
+
+def verificar_paridade(backend, modelo, tolerancia=None, n_amostras=8):
+    """
+    Compara o backend com `model.predict` em janelas aleatórias no intervalo [0, 1]
+    (escala do MinMaxScaler). Retorna o maior erro absoluto encontrado.
+    """
+    if tolerancia is None:
+        tolerancia = float(os.getenv("INFERENCE_PARIDADE_TOL", "1e-4"))
+
+    rng = np.random.default_rng(0)
+    X = rng.random((n_amostras, backend.janela, 1), dtype=np.float32)
+    referencia = modelo.predict(X, verbose=0)[:, 0]
+    erro = float(np.max(np.abs(backend.prever(X) - referencia)))
+    if erro > tolerancia:
+        raise RuntimeError(f"❌ Backend '{backend.nome}' divergiu do Keras: erro máximo {erro:.2e} > {tolerancia:.0e}.")
+    return erro
+
+
+def criar_backend(modelo, nome=None):
+    """
+    1) Escolhe o backend por INFERENCE_BACKEND (keras | tf_function | numpy; padrão numpy)
+    2) Valida paridade numérica com o Keras antes de servir
+    3) Faz uma chamada de aquecimento (tracing/alocação) fora do caminho de requisição
+    """
+    nome = (nome or os.getenv("INFERENCE_BACKEND", "numpy")).lower()
+    if nome not in BACKENDS:
+        raise RuntimeError(f"❌ INFERENCE_BACKEND '{nome}' inválido. Opções: {', '.join(BACKENDS)}.")
+
+    backend = BACKENDS[nome](modelo)
+    if nome != BackendKeras.nome:
+        erro = verificar_paridade(backend, modelo)
+        print(f"✅ Paridade do backend '{nome}' com Keras verificada (erro máximo {erro:.2e}).")
+
+    inicio = time.perf_counter()
+    backend.prever(np.zeros((1, backend.janela, 1), dtype=np.float32))
+    print(f"🔥 Backend '{nome}' aquecido em {(time.perf_counter() - inicio) * 1000:.1f} ms.")
+    return backend
+
+
+def arquivo_npz() -> str:
+    """
+    Nome padrão do .npz servido conforme NPZ_PRECISAO: float32 (modelo_lstm.npz, padrão) ou
+    int8 (modelo_lstm_int8.npz, gerado e validado por model/quantizacao.py).
+    """
+    precisao = os.getenv("NPZ_PRECISAO", "float32").lower()
+    if precisao not in PRECISOES:
+        raise ValueError(f"❌ NPZ_PRECISAO '{precisao}' inválida. Opções: {', '.join(PRECISOES)}.")
+    return "modelo_lstm.npz" if precisao == "float32" else f"modelo_lstm_{precisao}.npz"
+
+
+def _carregar_npy_mapeado(caminho_npz, tentativas: int = 3):
+    """
+    Extrai (se preciso) e mapeia a versão atual do .npz; depois apaga as extrações anteriores.
+    Se outro worker apagou a extração enquanto esta carga a abria (o .npz mudou no meio), extrai
+    de novo a partir da versão corrente.
+    """
+    for tentativa in range(tentativas):
+        diretorio = extrair_npy(caminho_npz)
+        try:
+            carregado = carregar_npy(diretorio)
+        except FileNotFoundError:
+            if tentativa == tentativas - 1:
+                raise
+            continue
+        remover_extracoes_antigas(caminho_npz, diretorio)
+        return carregado
+
+
+def carregar_artefatos_npz(ticker=None):
+    """
+    Modo SERVING_MODE=npz (sem TensorFlow nem sklearn):
+    1) Se definidas BUCKET_NAME e MODEL_NPZ_KEY (ou MODEL_NPZ_KEY_TEMPLATE com ticker), baixa do S3
+    2) Caso contrário, busca '<MODEL_DIR>/modelo_lstm.npz' (gerado por model/treino_modelo.py)
+       ou, com NPZ_PRECISAO=int8, '<MODEL_DIR>/modelo_lstm_int8.npz'
+    3) Com NPZ_MMAP=true, extrai o .npz em arquivos .npy e mapeia os pesos (somente leitura),
+       compartilhados entre os workers (ver app/servidor.py)
+    Retorna (backend, scaler).
+    """
+    npz_key, local_npz_path = _resolver_artefato(ticker, "MODEL_NPZ_KEY", arquivo_npz())
+    local_npz_path = _obter_artefato(npz_key, local_npz_path, "arquivo de pesos NPZ")
+
+    if not os.path.isfile(local_npz_path):
+        raise ModeloNaoEncontrado(f"❌ Pesos NPZ não encontrados em '{local_npz_path}'. "
+                                  "Verifique MODEL_NPZ_KEY/BUCKET_NAME ou rode model/treino_modelo.py.")
+
+    try:
+        if os.getenv("NPZ_MMAP", "false").lower() == "true":
+            lstm, scaler, janela = _carregar_npy_mapeado(local_npz_path)
+        else:
+            lstm, scaler, janela = carregar_npz(local_npz_path)
+    except Exception as e:
+        raise RuntimeError(f"❌ Erro ao carregar os pesos NPZ de '{local_npz_path}': {e}")
+
+    backend = BackendNumpy(lstm=lstm, janela=janela)
+    print(f"✅ Modelo NumPy e scaler carregados de '{local_npz_path}' ({lstm.nbytes / 1024:.1f} KiB)")
+    return backend, scaler
+
+
+def carregar_artefatos(ticker=None):
+    """
+    Carrega o par (backend, scaler) de um ticker conforme SERVING_MODE:
+    - keras (padrão): modelo .keras + scaler.gz, backend escolhido por INFERENCE_BACKEND
+    - npz: apenas os pesos NumPy (sem TensorFlow)
+    """
+    if os.getenv("SERVING_MODE", "keras").lower() == "npz":
+        return carregar_artefatos_npz(ticker)
+    # Modelo e scaler são obtidos (e baixados, se preciso) em paralelo
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        futuro_modelo = pool.submit(carregar_modelo, ticker)
+        futuro_scaler = pool.submit(carregar_scaler, ticker)
+        modelo, scaler = futuro_modelo.result(), futuro_scaler.result()
+    return criar_backend(modelo), scaler
+
+
+def assinatura_artefatos(ticker=None) -> str:
+    """
+    Identifica a versão dos artefatos de origem sem baixá-los, para detectar um deploy novo:
+    - no S3: VersionId (ou ETag) via HEAD
+    - local: mtime_ns e tamanho do arquivo
+    Muda quando qualquer artefato do SERVING_MODE atual muda.
+    """
+    if os.getenv("SERVING_MODE", "keras").lower() == "npz":
+        artefatos = [("MODEL_NPZ_KEY", arquivo_npz())]
+    else:
+        artefatos = [("MODEL_KEY", "modelo_lstm.keras"), ("SCALER_KEY", "scaler.gz")]
+
+    bucket = os.getenv("BUCKET_NAME")
+    partes = []
+    for env_key, nome_padrao in artefatos:
+        chave, local_path = _resolver_artefato(ticker, env_key, nome_padrao)
+        if bucket and chave:
+            cabecalho = cliente_s3().head_object(Bucket=bucket, Key=chave)
+            partes.append(f"s3:{cabecalho.get('VersionId') or cabecalho['ETag'].strip(chr(34))}")
+        else:
+            try:
+                st = os.stat(local_path)
+                partes.append(f"local:{st.st_mtime_ns}:{st.st_size}")
+            except FileNotFoundError:
+                partes.append("ausente")
+    return "|".join(partes)
@@ -0,0 +1,105 @@
+# app/preprocessamento.py
+
+from typing import List, Sequence
+
+import numpy as np
+
+
+class ErroValidacao(ValueError):
+    """Histórico inválido; a mensagem é devolvida como `detail` do HTTP 400."""
+
+
+class EscalaMinMax:
+    """
+    Constantes do MinMaxScaler pré-calculadas em float32, sem passar pelo sklearn:
+    normalizado = preco * scale + offset ; preco = normalizado * inv_scale + inv_offset
+    """
+
+    def __init__(self, scaler):
+        self.data_min = float(scaler.data_min_[0])
+        self.data_max = float(scaler.data_max_[0])
+        scale = float(scaler.scale_[0])
+        offset = float(scaler.min_[0])
+        self.scale = np.float32(scale)
+        self.offset = np.float32(offset)
+        self.inv_scale = np.float32(1.0 / scale)
+        self.inv_offset = np.float32(-offset / scale)
+        self._min32 = np.float32(self.data_min)
+        self._max32 = np.float32(self.data_max)
+
+    def transformar(self, precos: np.ndarray) -> np.ndarray:
+        return precos * self.scale + self.offset
+
+    def inverter(self, normalizado):
+        return normalizado * self.inv_scale + self.inv_offset
+
+    def validar_faixa(self, janelas: np.ndarray, prefixos: Sequence[str] = None):
+        """Checa (batch, janela) de uma vez; a mensagem cita o primeiro valor fora do range."""
+        fora = (janelas < self._min32) | (janelas > self._max32)
+        if not fora.any():
+            return
+        linha, i = np.argwhere(fora)[0]
+        prefixo = prefixos[linha] if prefixos else ""
+        raise ErroValidacao(
+            f"{prefixo}historico[{i}] = {float(janelas[linha, i]):.2f} está fora do range "
+            f"[{self.data_min:.2f}, {self.data_max:.2f}]."
+        )
+
+
+def preparar_janelas(historicos: Sequence[Sequence[float]], janela: int,
+                     prefixos: Sequence[str] = None) -> np.ndarray:
+    """
+    Converte um ou mais históricos numa única matriz float32 (batch, janela),
+    mantendo só os últimos `janela` valores de cada um.
+    """
+    for k, historico in enumerate(historicos):
+        if len(historico) < janela:
+            prefixo = prefixos[k] if prefixos else ""
+            raise ErroValidacao(f"{prefixo}É necessário fornecer pelo menos {janela} valores em 'historico'.")
+
+    if all(len(h) == janela for h in historicos):
+        return np.asarray(historicos, dtype=np.float32)
+    return np.asarray([h[-janela:] for h in historicos], dtype=np.float32)
+
+
+def tendencias_historico(janelas: np.ndarray) -> List[str]:
+    """
+    Versão vetorizada de `detectar_tendencia_historico` para (batch, janela):
+    variação primeiro→último (±1%) e, se estável, coeficiente de variação (> 1,5% = volátil).
+    """
+    janelas = np.atleast_2d(janelas)
+    primeiro = janelas[:, 0].astype(np.float64)
+    ultimo = janelas[:, -1].astype(np.float64)
+    media = janelas.mean(axis=1, dtype=np.float64)
+    desvio = janelas.std(axis=1, dtype=np.float64)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        diff_pct = np.where(primeiro > 0, (ultimo - primeiro) / primeiro * 100, 0.0)
+        coef_var = np.where(media > 0, desvio / media * 100, np.inf)
+
+    rotulos = np.where(coef_var > 1.5, "volátil", "neutro").astype(object)
+    rotulos[diff_pct <= -1.0] = "queda"
+    rotulos[diff_pct >= 1.0] = "alta"
+    return rotulos.tolist()
+
+
+def tendencias_previstas(preditos, ultimos) -> List[str]:
+    """Versão vetorizada de `detectar_tendencia_prevista` (previsão x último preço)."""
+    preditos = np.atleast_1d(np.asarray(preditos, dtype=np.float64))
+    ultimos = np.atleast_1d(np.asarray(ultimos, dtype=np.float64))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        diff_pct = np.where(ultimos > 0, (preditos - ultimos) / ultimos * 100, 0.0)
+    rotulos = np.full(diff_pct.shape, "estável", dtype=object)
+    rotulos[diff_pct <= -1.0] = "queda"
+    rotulos[diff_pct >= 1.0] = "alta"
+    return rotulos.tolist()
+
+
+# 1) Detecta tendência no histórico
+def detectar_tendencia_historico(prices: List[float]) -> str:
+    return tendencias_historico(np.asarray(prices, dtype=np.float64)[np.newaxis, :])[0]
+
+
+# 2) Detecta tendência prevista (comparação previsão x último preço)
+def detectar_tendencia_prevista(predito: float, ultimo: float) -> str:
+    return tendencias_previstas(predito, ultimo)[0]
@@ -0,0 +1,102 @@
+# app/recarga.py
+
+import asyncio
+import threading
+import time
+from typing import Callable, Optional
+
+import numpy as np
+
+from app.registry import ModeloServido, RegistroModelos
+
+
+class ObservadorModelos:
+    """
+    Recarga a quente dos modelos do registro, numa thread própria.
+
+    1) A cada `intervalo_s`, calcula a assinatura dos artefatos de cada ticker carregado
+       (HEAD no S3 ou mtime local) e compara com a do modelo servido
+    2) Se mudou, carrega o novo modelo+scaler nesta thread e o aquece com um lote fictício
+    3) A troca é agendada no event loop (`registro.substituir`): é uma única troca de
+       referência, e requisições em andamento terminam no modelo antigo
+    4) Falha na carga mantém o modelo atual; a próxima verificação tenta de novo
+    """
+
+    def __init__(self, registro: RegistroModelos, carregador: Callable[[str], ModeloServido],
+                 assinatura: Callable[[str], str], intervalo_s: float = 30.0,
+                 ao_recarregar: Optional[Callable[[ModeloServido, ModeloServido], None]] = None):
+        self.registro = registro
+        self.carregador = carregador
+        self.assinatura = assinatura
+        self.intervalo_s = float(intervalo_s)
+        self.ao_recarregar = ao_recarregar
+        self._parar = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.verificacoes = 0
+        self.recargas = 0
+        self.falhas = 0
+
+    def iniciar(self, loop: asyncio.AbstractEventLoop):
+        if self.intervalo_s <= 0 or self._thread is not None:
+            return
+        self._loop = loop
+        self._thread = threading.Thread(target=self._executar, name="observador-modelos", daemon=True)
+        self._thread.start()
+        print(f"👀 Recarga a quente ativa (verificação a cada {self.intervalo_s:.0f}s).")
+
+    def parar(self):
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _executar(self):
+        while not self._parar.wait(self.intervalo_s):
+            for atual in self.registro.modelos():
+                if self._parar.is_set():
+                    return
+                try:
+                    self.verificar(atual)
+                except Exception as e:
+                    self.falhas += 1
+                    print(f"⚠ Recarga de {atual.ticker} falhou; mantendo a versão {atual.versao}: {e}")
+
+    def verificar(self, atual: ModeloServido) -> bool:
+        """Recarrega `atual` se os artefatos mudaram. Devolve True se houve troca."""
+        self.verificacoes += 1
+        nova = self.assinatura(atual.ticker)
+        if nova == atual.assinatura:
+            return False
+
+        inicio = time.perf_counter()
+        novo = self.carregador(atual.ticker)
+        if novo.versao == atual.versao:
+            # Artefato regravado com o mesmo conteúdo (ex.: touch, novo upload idêntico)
+            atual.assinatura = novo.assinatura
+            return False
+
+        # Aquecimento: a primeira previsão paga alocações e caminhos frios antes de receber tráfego
+        novo.backend.prever(np.zeros((1, novo.backend.janela, 1), dtype=np.float32))
+
+        futuro = asyncio.run_coroutine_threadsafe(self._trocar(novo), self._loop)
+        if not futuro.result(timeout=30):
+            return False
+        self.recargas += 1
+        print(f"🔄 Modelo de {atual.ticker} recarregado: {atual.versao} → {novo.versao} "
+              f"em {time.perf_counter() - inicio:.2f}s.")
+        if self.ao_recarregar is not None:
+            self.ao_recarregar(atual, novo)
+        return True
+
+    async def _trocar(self, novo: ModeloServido) -> bool:
+        return self.registro.substituir(novo)
+
+    def estatisticas(self) -> dict:
+        return {
+            "intervalo_s": self.intervalo_s,
+            "ativo": self._thread is not None,
+            "verificacoes": self.verificacoes,
+            "recargas": self.recargas,
+            "falhas": self.falhas,
+        }
@@ -0,0 +1,189 @@
+# app/registry.py
+
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+
+from app.microbatch import MicroBatcher
+from app.preprocessamento import EscalaMinMax
+
+
+@dataclass
+class ModeloServido:
+    """Par modelo+scaler de um ticker, com o micro-batcher próprio."""
+    ticker: str
+    versao: str
+    backend: Any
+    scaler: Any
+    escala: EscalaMinMax = field(repr=False)
+    batcher: MicroBatcher = field(repr=False)
+    # Versão dos artefatos de origem (VersionId/ETag no S3 ou mtime local) lida antes da carga
+    assinatura: str = ""
+
+    @property
+    def data_min(self) -> float:
+        return self.escala.data_min
+
+    @property
+    def data_max(self) -> float:
+        return self.escala.data_max
+
+    @property
+    def nbytes(self) -> int:
+        return self.backend.nbytes
+
+
+class RegistroModelos:
+    """
+    Registro de modelos por ticker com carga preguiçosa e despejo LRU.
+
+    1) `obter(ticker)` devolve o modelo em memória (hit) ou dispara a carga (miss)
+    2) Cargas concorrentes do mesmo ticker compartilham a mesma tarefa
+    3) A carga roda no threadpool, sem bloquear o event loop
+    4) Após inserir, despeja os menos usados enquanto exceder `max_modelos` ou `max_bytes`
+    5) `ao_remover(modelo)` é chamado quando um modelo sai do registro (despejo ou substituição)
+    6) `substituir(modelo)` troca a referência servida (recarga a quente): requisições que
+       já obtiveram o modelo antigo terminam nele; as seguintes recebem o novo
+    7) Falhas de carga dos tipos em `ausente` (ex.: ModeloNaoEncontrado) ficam guardadas por
+       `ttl_ausente_s`: nesse intervalo o mesmo ticker falha de novo sem repetir a busca
+       (no máximo `max_ausentes` tickers, os mais antigos saem primeiro)
+    """
+
+    def __init__(self, carregador: Callable[[str], ModeloServido],
+                 max_modelos: int = 100, max_bytes: int = 512 * 1024 * 1024,
+                 ao_remover: Optional[Callable[[ModeloServido], None]] = None,
+                 ausente: Tuple[Type[BaseException], ...] = (), ttl_ausente_s: float = 30.0,
+                 max_ausentes: int = 10000):
+        self.carregador = carregador
+        self.ao_remover = ao_remover
+        self.ausente = tuple(ausente)
+        self.ttl_ausente_s = float(ttl_ausente_s)
+        self.max_ausentes = max(1, int(max_ausentes))
+        self._ausentes: "OrderedDict[str, Tuple[float, BaseException]]" = OrderedDict()
+        self.hits_ausentes = 0
+        self.max_modelos = max(1, int(max_modelos))
+        self.max_bytes = int(max_bytes)
+        self._modelos: "OrderedDict[str, ModeloServido]" = OrderedDict()
+        self._carregando: Dict[str, asyncio.Task] = {}
+        self.bytes_em_uso = 0
+        self.hits = 0
+        self.misses = 0
+        self.cargas_compartilhadas = 0
+        self.evictions = 0
+        self.falhas = 0
+        self.recargas = 0
+
+    def __contains__(self, ticker: str) -> bool:
+        return ticker in self._modelos
+
+    async def obter(self, ticker: str) -> ModeloServido:
+        modelo = self._modelos.get(ticker)
+        if modelo is not None:
+            self._modelos.move_to_end(ticker)
+            self.hits += 1
+            return modelo
+
+        ausencia = self._ausentes.get(ticker)
+        if ausencia is not None:
+            expira, erro = ausencia
+            if expira > time.monotonic():
+                self.hits_ausentes += 1
+                # Nova instância a cada vez: relançar a mesma acumularia tracebacks
+                raise type(erro)(*erro.args)
+            del self._ausentes[ticker]
+
+        tarefa = self._carregando.get(ticker)
+        if tarefa is None:
+            self.misses += 1
+            tarefa = asyncio.get_running_loop().create_task(self._carregar(ticker))
+            self._carregando[ticker] = tarefa
+        else:
+            self.cargas_compartilhadas += 1
+
+        # shield: o cancelamento de um chamador não cancela a carga dos demais
+        return await asyncio.shield(tarefa)
+
+    def precarregar(self, ticker: str) -> ModeloServido:
+        """
+        Carga síncrona, fora de um event loop: usada pelo processo pai antes do fork
+        (app/servidor.py), para que os workers herdem o modelo já em memória.
+        """
+        modelo = self.carregador(ticker)
+        self._inserir(modelo)
+        return modelo
+
+    def _registrar_ausente(self, ticker: str, erro: BaseException):
+        if not self.ausente or self.ttl_ausente_s <= 0 or not isinstance(erro, self.ausente):
+            return
+        self._ausentes.pop(ticker, None)
+        self._ausentes[ticker] = (time.monotonic() + self.ttl_ausente_s, erro)
+        while len(self._ausentes) > self.max_ausentes:
+            self._ausentes.popitem(last=False)
+
+    async def _carregar(self, ticker: str) -> ModeloServido:
+        loop = asyncio.get_running_loop()
+        try:
+            modelo = await loop.run_in_executor(None, self.carregador, ticker)
+        except Exception as e:
+            self.falhas += 1
+            self._registrar_ausente(ticker, e)
+            raise
+        finally:
+            self._carregando.pop(ticker, None)
+        self._inserir(modelo)
+        return modelo
+
+    def _inserir(self, modelo: ModeloServido):
+        antigo = self._modelos.pop(modelo.ticker, None)
+        if antigo is not None:
+            self.bytes_em_uso -= antigo.nbytes
+            self._removido(antigo)
+        self._modelos[modelo.ticker] = modelo
+        self.bytes_em_uso += modelo.nbytes
+
+        # Nunca despeja o modelo recém-inserido
+        while len(self._modelos) > 1 and (
+                len(self._modelos) > self.max_modelos or self.bytes_em_uso > self.max_bytes):
+            ticker, despejado = self._modelos.popitem(last=False)
+            self.bytes_em_uso -= despejado.nbytes
+            self.evictions += 1
+            self._removido(despejado)
+            print(f"♻️ Modelo de {ticker} removido do registro (LRU).")
+
+    def modelos(self) -> List[ModeloServido]:
+        """Cópia dos modelos em memória (segura para iterar fora do event loop)."""
+        return list(self._modelos.values())
+
+    def substituir(self, modelo: ModeloServido) -> bool:
+        """Troca o modelo de um ticker ainda carregado. Deve rodar no event loop."""
+        if modelo.ticker not in self._modelos:
+            # Despejado durante a recarga: o novo modelo é descartado sem entrar no registro
+            self._removido(modelo)
+            return False
+        self._inserir(modelo)
+        self.recargas += 1
+        return True
+
+    def _removido(self, modelo: ModeloServido):
+        if self.ao_remover is not None:
+            self.ao_remover(modelo)
+
+    def estatisticas(self) -> dict:
+        return {
+            "modelos_carregados": len(self._modelos),
+            "tickers": list(self._modelos),
+            "bytes_em_uso": self.bytes_em_uso,
+            "max_modelos": self.max_modelos,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "cargas_compartilhadas": self.cargas_compartilhadas,
+            "evictions": self.evictions,
+            "falhas": self.falhas,
+            "recargas": self.recargas,
+            "ausentes": len(self._ausentes),
+            "hits_ausentes": self.hits_ausentes,
+            "versoes": {t: m.versao for t, m in self._modelos.items()},
+        }
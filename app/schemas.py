@@ -1,6 +1,30 @@
-from pydantic import BaseModel
-from typing import List
+from pydantic import BaseModel, Field
+from typing import List, Optional
 
 class PrevisaoRequest(BaseModel):
     historico: List[float]
+    ticker: Optional[str] = None
 
+class PrevisaoLoteRequest(BaseModel):
+    historicos: List[List[float]]
+    ticker: Optional[str] = None
+
+# Horizonte máximo (dias) do rollout autoregressivo
+HORIZONTE_MAX = 30
+
+class PrevisaoHorizonteRequest(BaseModel):
+    historico: List[float]
+    horizonte: int = Field(5, ge=1, le=HORIZONTE_MAX)
+    ticker: Optional[str] = None
+
+class ItemHorizonte(BaseModel):
+    historico: List[float]
+    ticker: Optional[str] = None
+
+class PrevisaoHorizonteLoteRequest(BaseModel):
+    itens: List[ItemHorizonte]
+    horizonte: int = Field(5, ge=1, le=HORIZONTE_MAX)
+
+class HistoricoAnexarRequest(BaseModel):
+    precos: List[float]
+    datas: Optional[List[str]] = None
@@ -0,0 +1,125 @@
+# app/servidor.py
+"""
+Servidor multi-processo com pré-carga antes do fork (SERVING_MODE=npz).
+
+`uvicorn --workers N` inicia N interpretadores do zero: cada um importa NumPy/FastAPI e
+carrega sua própria cópia do modelo. Aqui o processo pai:
+
+1) Abre o socket de escuta (herdado por todos os workers; o kernel distribui as conexões)
+2) Importa app.main e carrega o modelo padrão no registro (com NPZ_MMAP=true os pesos
+   são mapeados de arquivos .npy, e cargas posteriores nos workers mapeiam os mesmos arquivos)
+3) Congela o GC (gc.freeze) para a coleta dos workers não tocar nos objetos herdados
+4) Faz fork de N workers, que compartilham essas páginas (copy-on-write), e reinicia quem morrer
+
+Com TensorFlow (SERVING_MODE=keras) o runtime não sobrevive a um fork: o pai só importa a
+aplicação e cada worker carrega o modelo na inicialização, como no uvicorn.
+
+Uso:
+    python -m app.servidor --workers 4 --host 0.0.0.0 --port 80
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+
+
+def criar_socket(host: str, porta: int, backlog: int = 2048) -> socket.socket:
+    familia = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(familia, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, porta))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def precarregar():
+    """Importa a aplicação e, sem TensorFlow, carrega o modelo padrão ainda no processo pai."""
+    from app import main
+
+    if os.getenv("SERVING_MODE", "keras").lower() != "npz":
+        print("⚠ SERVING_MODE diferente de npz: cada worker carrega o próprio modelo (TensorFlow não suporta fork).")
+        return main.app
+    try:
+        main.registro.precarregar(main.ATIVO)
+    except Exception as e:
+        raise RuntimeError(f"❌ Erro ao pré-carregar o modelo de {main.ATIVO}: {e}")
+    print(f"📦 Modelo de {main.ATIVO} pré-carregado no processo pai (pid {os.getpid()}).")
+    return main.app
+
+
+def rodar_worker(app, sock: socket.socket, log_level: str):
+    import uvicorn
+
+    config = uvicorn.Config(app, log_level=log_level, access_log=False, lifespan="on")
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def iniciar_worker(app, sock: socket.socket, log_level: str) -> int:
+    pid = os.fork()
+    if pid:
+        return pid
+    # Worker: o uvicorn instala os próprios tratadores de sinal
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    codigo = 0
+    try:
+        rodar_worker(app, sock, log_level)
+    except BaseException:
+        traceback.print_exc()
+        codigo = 1
+    finally:
+        os._exit(codigo)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor multi-processo com pré-carga do modelo antes do fork.")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "1")))
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=80)
+    parser.add_argument("--log-level", default="warning")
+    args = parser.parse_args()
+
+    sock = criar_socket(args.host, args.port)
+    app = precarregar()
+    # Objetos do pai saem das gerações do GC: a coleta nos workers não escreve nessas páginas
+    gc.collect()
+    gc.freeze()
+
+    workers = {iniciar_worker(app, sock, args.log_level) for _ in range(max(1, args.workers))}
+    print(f"🚀 {len(workers)} worker(s) servindo em {args.host}:{args.port} (pai {os.getpid()}).")
+
+    encerrando = False
+
+    def encerrar(signum, frame):
+        nonlocal encerrando
+        encerrando = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, encerrar)
+    signal.signal(signal.SIGINT, encerrar)
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        workers.discard(pid)
+        if not encerrando:
+            print(f"⚠ Worker {pid} encerrou (código {os.waitstatus_to_exitcode(status)}); reiniciando.")
+            time.sleep(1)
+            workers.add(iniciar_worker(app, sock, args.log_level))
+    sock.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,38 @@
+"""
+Mede o tempo de modelo (p50/p95) de cada backend de inferência.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.backends_inferencia model/modelo_lstm.keras
+"""
+import sys
+import time
+
+import numpy as np
+from tensorflow.keras.models import load_model
+
+from app.model_loader import BACKENDS, criar_backend
+
+
+def medir(backend, lote=1, repeticoes=500):
+    X = np.random.default_rng(0).random((lote, backend.janela, 1), dtype=np.float32)
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        backend.prever(X)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return np.percentile(tempos, 50), np.percentile(tempos, 95)
+
+
+def main():
+    caminho = sys.argv[1] if len(sys.argv) > 1 else "model/modelo_lstm.keras"
+    modelo = load_model(caminho)
+    print(f"{'backend':<12} {'lote':>5} {'p50 (ms)':>10} {'p95 (ms)':>10}")
+    for nome in BACKENDS:
+        backend = criar_backend(modelo, nome)
+        for lote in (1, 32):
+            p50, p95 = medir(backend, lote=lote, repeticoes=100 if nome == "keras" else 500)
+            print(f"{nome:<12} {lote:>5} {p50:>10.3f} {p95:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
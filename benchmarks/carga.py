@@ -0,0 +1,382 @@
+"""
+Teste de carga do app.main:app com um modelo sintético (roda offline, sem TensorFlow).
+
+1) Gera um modelo_lstm.npz aleatório (LSTM(50) + Dense(1), janela 30) e sobe a API em
+   SERVING_MODE=npz — no próprio processo (httpx.ASGITransport) ou via uvicorn
+2) Executa cada cenário em concorrência fixa (loop fechado) ou taxa de chegada fixa
+   (loop aberto; a latência conta a partir do horário agendado, sem omissão coordenada)
+3) Cenários: /prever unitário, /prever com históricos mais longos e /prever/lote
+4) Reporta throughput, p50/p95/p99, CPU e RSS por processo do servidor e grava tudo
+   em benchmarks/resultados/<commit>.json para comparar entre commits
+
+Uso (na raiz do projeto; requer httpx, ver requirements-dev.txt):
+    python -m benchmarks.carga                                  # in-process, concorrência 16
+    python -m benchmarks.carga --modo uvicorn --workers 2 --taxa 200
+    python -m benchmarks.carga --comparar resultados/a.json resultados/b.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from app.lstm_numpy import LSTMNumpy, ScalerMinMaxNumpy, exportar_npz
+
+JANELA = 30
+PRECO_MIN, PRECO_MAX = 100.0, 200.0
+DIRETORIO_RESULTADOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "resultados")
+
+# (nome, rota, tamanho do histórico, janelas por requisição)
+CENARIOS = {
+    "unitario": ("/prever", JANELA, 1),
+    "historico_90": ("/prever", 90, 1),
+    "historico_250": ("/prever", 250, 1),
+    "lote_8": ("/prever/lote", JANELA, 8),
+    "lote_32": ("/prever/lote", JANELA, 32),
+}
+
+
+def gerar_modelo_sintetico(diretorio, unidades=50, seed=0):
+    """Grava <diretorio>/modelo_lstm.npz com pesos aleatórios e um scaler em [PRECO_MIN, PRECO_MAX]."""
+    rng = np.random.default_rng(seed)
+    escala = 0.1
+    lstm = LSTMNumpy(
+        kernel=rng.normal(0, escala, (1, 4 * unidades)),
+        recurrent_kernel=rng.normal(0, escala, (unidades, 4 * unidades)),
+        bias=np.zeros(4 * unidades),
+        dense_kernel=rng.normal(0, escala, (unidades, 1)),
+        dense_bias=np.full(1, 0.5),
+    )
+    scale = 1.0 / (PRECO_MAX - PRECO_MIN)
+    scaler = ScalerMinMaxNumpy([PRECO_MIN], [PRECO_MAX], [scale], [-PRECO_MIN * scale])
+    caminho = os.path.join(diretorio, "modelo_lstm.npz")
+    exportar_npz(caminho, lstm, scaler, JANELA)
+    return caminho
+
+
+def ambiente_servidor(diretorio):
+    """
+    Variáveis que isolam o servidor de S3 e dos artefatos reais. O cache de previsões fica com
+    1 item: os payloads se repetem ao longo da execução e os acertos mediriam o cache, não o modelo.
+    """
+    env = {"SERVING_MODE": "npz", "MODEL_DIR": diretorio, "BUCKET_NAME": "", "MODEL_NPZ_KEY": "",
+           "CACHE_BACKEND": "", "CACHE_PREVISOES_MAX": "1", "METRICAS_UDP_DESTINO": ""}
+    return env
+
+
+def gerar_payloads(cenario, quantidade, seed=1):
+    """
+    `quantidade` payloads distintos (passeio aleatório dentro do range do scaler), repetidos em ciclo
+    pelos cenários; o cache de previsões fica desligado em `ambiente_servidor`.
+    """
+    rota, tamanho, janelas = CENARIOS[cenario]
+    rng = np.random.default_rng(seed)
+    base = rng.uniform(PRECO_MIN + 20, PRECO_MAX - 20, (quantidade, janelas, 1))
+    passos = rng.normal(0, 0.5, (quantidade, janelas, tamanho)).cumsum(axis=2)
+    series = np.clip(base + passos, PRECO_MIN, PRECO_MAX).round(2)
+    if janelas == 1:
+        return rota, [{"historico": s[0].tolist()} for s in series]
+    return rota, [{"historicos": s.tolist()} for s in series]
+
+
+# ───────────────────────────────────────────────────────
+# CPU e RSS dos processos do servidor (/proc)
+# ───────────────────────────────────────────────────────
+def _ler_stat(pid):
+    with open(f"/proc/{pid}/stat") as f:
+        campos = f.read().rsplit(")", 1)[1].split()
+    # campos[1] = ppid; campos[11], campos[12] = utime, stime (em ticks)
+    return int(campos[1]), int(campos[11]) + int(campos[12])
+
+
+def _ler_rss_mb(pid):
+    valores = {}
+    with open(f"/proc/{pid}/status") as f:
+        for linha in f:
+            if linha.startswith(("VmRSS", "VmHWM")):
+                chave, valor = linha.split(":", 1)
+                valores[chave] = int(valor.split()[0]) / 1024
+    return valores.get("VmRSS", 0.0), valores.get("VmHWM", 0.0)
+
+
+def processos_servidor(pid_raiz):
+    """O processo raiz e seus filhos diretos (workers do uvicorn)."""
+    pids = [pid_raiz]
+    for nome in os.listdir("/proc"):
+        if nome.isdigit():
+            try:
+                if _ler_stat(int(nome))[0] == pid_raiz:
+                    pids.append(int(nome))
+            except (FileNotFoundError, ProcessLookupError, IndexError):
+                continue
+    return pids
+
+
+class MedidorProcessos:
+    def __init__(self, pid_raiz):
+        self.pids = processos_servidor(pid_raiz)
+        self._ticks = os.sysconf("SC_CLK_TCK")
+
+    def iniciar(self):
+        self._inicio = time.perf_counter()
+        self._cpu = {pid: _ler_stat(pid)[1] for pid in self.pids}
+
+    def finalizar(self):
+        duracao = time.perf_counter() - self._inicio
+        processos = []
+        for pid in self.pids:
+            try:
+                cpu = (_ler_stat(pid)[1] - self._cpu[pid]) / self._ticks
+                rss, pico = _ler_rss_mb(pid)
+            except FileNotFoundError:
+                continue
+            processos.append({"pid": pid, "cpu_pct": cpu / duracao * 100, "rss_mb": rss, "rss_pico_mb": pico})
+        return processos
+
+
+# ───────────────────────────────────────────────────────
+# Geração de carga
+# ───────────────────────────────────────────────────────
+async def _enviar(cliente, rota, payload, latencias, erros, inicio):
+    try:
+        resp = await cliente.post(rota, json=payload)
+        if resp.status_code != 200:
+            erros.append(resp.status_code)
+            return
+    except Exception as e:
+        erros.append(type(e).__name__)
+        return
+    latencias.append(time.perf_counter() - inicio)
+
+
+async def concorrencia_fixa(cliente, rota, payloads, concorrencia, duracao_s):
+    """Loop fechado: `concorrencia` clientes, cada um envia a próxima requisição ao receber a resposta."""
+    latencias, erros = [], []
+    fim = time.perf_counter() + duracao_s
+    proximo = iter(range(10 ** 9))
+
+    async def cliente_virtual():
+        while time.perf_counter() < fim:
+            payload = payloads[next(proximo) % len(payloads)]
+            await _enviar(cliente, rota, payload, latencias, erros, time.perf_counter())
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(cliente_virtual() for _ in range(concorrencia)))
+    return latencias, erros, time.perf_counter() - inicio
+
+
+async def taxa_fixa(cliente, rota, payloads, taxa, duracao_s):
+    """Loop aberto: dispara `taxa` req/s no horário agendado, independente das respostas pendentes."""
+    latencias, erros = [], []
+    total = int(taxa * duracao_s)
+    inicio = time.perf_counter()
+    tarefas = []
+    for i in range(total):
+        agendado = inicio + i / taxa
+        espera = agendado - time.perf_counter()
+        if espera > 0:
+            await asyncio.sleep(espera)
+        payload = payloads[i % len(payloads)]
+        tarefas.append(asyncio.ensure_future(_enviar(cliente, rota, payload, latencias, erros, agendado)))
+    await asyncio.gather(*tarefas)
+    return latencias, erros, time.perf_counter() - inicio
+
+
+def resumir(cenario, latencias, erros, duracao, janelas):
+    ms = np.asarray(latencias) * 1000 if latencias else np.zeros(1)
+    return {
+        "cenario": cenario,
+        "requisicoes": len(latencias),
+        "erros": len(erros),
+        "duracao_s": duracao,
+        "req_s": len(latencias) / duracao if duracao else 0.0,
+        "janelas_s": len(latencias) * janelas / duracao if duracao else 0.0,
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "max_ms": float(ms.max()),
+    }
+
+
+async def estatisticas_cache(cliente):
+    """
+    Acertos do cache de previsões segundo o worker que responder (acumulado desde a subida):
+    hit_ratio acima de ~0 indica uma execução que mediu o cache em vez do modelo.
+    """
+    resposta = await cliente.get("/cache")
+    if resposta.status_code != 200:
+        return None
+    est = resposta.json()
+    return {chave: est[chave] for chave in ("hits", "misses", "hit_ratio")}
+
+
+async def executar_cenarios(cliente, pid_servidor, args):
+    resultados = []
+    for cenario in args.cenarios:
+        rota, _, janelas = CENARIOS[cenario]
+        _, payloads = gerar_payloads(cenario, args.payloads)
+        # Aquecimento: carga do modelo, caminhos frios do numpy e conexões
+        await concorrencia_fixa(cliente, rota, payloads, min(4, args.concorrencia), 0.5)
+
+        medidor = MedidorProcessos(pid_servidor)
+        medidor.iniciar()
+        if args.taxa:
+            latencias, erros, duracao = await taxa_fixa(cliente, rota, payloads, args.taxa, args.duracao)
+        else:
+            latencias, erros, duracao = await concorrencia_fixa(
+                cliente, rota, payloads, args.concorrencia, args.duracao)
+        resultado = resumir(cenario, latencias, erros, duracao, janelas)
+        resultado["processos"] = medidor.finalizar()
+        resultado["cache"] = await estatisticas_cache(cliente)
+        resultados.append(resultado)
+        imprimir_linha(resultado)
+    return resultados
+
+
+# ───────────────────────────────────────────────────────
+# Modos de execução
+# ───────────────────────────────────────────────────────
+async def rodar_em_processo(args, diretorio):
+    import httpx
+
+    os.environ.update(ambiente_servidor(diretorio))
+    from app.main import app
+
+    async with app.router.lifespan_context(app):
+        transporte = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://carga") as cliente:
+            # No modo in-process o gerador de carga divide o processo (e a CPU) com a API
+            return await executar_cenarios(cliente, os.getpid(), args)
+
+
+def _porta_livre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def rodar_uvicorn(args, diretorio):
+    import httpx
+
+    porta = args.porta or _porta_livre()
+    env = dict(os.environ, **ambiente_servidor(diretorio))
+    servidor = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(porta),
+         "--workers", str(args.workers), "--log-level", "warning", "--no-access-log"],
+        env=env,
+    )
+    base = f"http://127.0.0.1:{porta}"
+    limites = httpx.Limits(max_connections=max(args.concorrencia, 100), max_keepalive_connections=args.concorrencia)
+    try:
+        async with httpx.AsyncClient(base_url=base, limits=limites, timeout=30.0) as cliente:
+            limite = time.perf_counter() + 60
+            while True:
+                if servidor.poll() is not None:
+                    raise RuntimeError(f"❌ uvicorn encerrou com código {servidor.returncode}.")
+                try:
+                    if (await cliente.get("/registro")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if time.perf_counter() > limite:
+                    raise RuntimeError("❌ uvicorn não respondeu em 60 s.")
+                await asyncio.sleep(0.2)
+            return await executar_cenarios(cliente, servidor.pid, args)
+    finally:
+        servidor.terminate()
+        servidor.wait(timeout=10)
+
+
+# ───────────────────────────────────────────────────────
+# Resultados
+# ───────────────────────────────────────────────────────
+def commit_atual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "sem-git"
+
+
+def imprimir_cabecalho():
+    print(f"{'cenário':<15} {'req/s':>9} {'janelas/s':>10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'erros':>6} {'CPU %':>7} {'RSS MB':>7}")
+
+
+def imprimir_linha(r):
+    cpu = sum(p["cpu_pct"] for p in r.get("processos", []))
+    rss = max((p["rss_mb"] for p in r.get("processos", [])), default=0.0)
+    print(f"{r['cenario']:<15} {r['req_s']:>9.1f} {r['janelas_s']:>10.1f} {r['p50_ms']:>8.2f} "
+          f"{r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['erros']:>6} {cpu:>7.1f} {rss:>7.1f}")
+
+
+def gravar(resultados, args):
+    os.makedirs(DIRETORIO_RESULTADOS, exist_ok=True)
+    commit = commit_atual()
+    caminho = args.saida or os.path.join(DIRETORIO_RESULTADOS, f"{commit}.json")
+    documento = {
+        "commit": commit,
+        "data": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "config": {
+            "modo": args.modo, "workers": args.workers, "concorrencia": args.concorrencia,
+            "taxa": args.taxa, "duracao_s": args.duracao, "cpus": os.cpu_count(),
+        },
+        "resultados": resultados,
+    }
+    with open(caminho, "w") as f:
+        json.dump(documento, f, indent=2, ensure_ascii=False)
+    print(f"💾 Resultados gravados em {caminho}")
+
+
+def comparar(caminho_base, caminho_novo):
+    with open(caminho_base) as f:
+        base = {r["cenario"]: r for r in json.load(f)["resultados"]}
+    with open(caminho_novo) as f:
+        novo = json.load(f)["resultados"]
+    print(f"{'cenário':<15} {'req/s':>16} {'p95 ms':>18} {'p99 ms':>18}")
+    for r in novo:
+        b = base.get(r["cenario"])
+        if b is None:
+            continue
+
+        def delta(chave):
+            return (r[chave] - b[chave]) / b[chave] * 100 if b[chave] else 0.0
+
+        print(f"{r['cenario']:<15} {r['req_s']:>8.1f} ({delta('req_s'):+5.1f}%) "
+              f"{r['p95_ms']:>9.2f} ({delta('p95_ms'):+5.1f}%) {r['p99_ms']:>9.2f} ({delta('p99_ms'):+5.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga da API com modelo sintético.")
+    parser.add_argument("--modo", choices=("processo", "uvicorn"), default="processo")
+    parser.add_argument("--workers", type=int, default=1, help="Workers do uvicorn (modo uvicorn).")
+    parser.add_argument("--porta", type=int, default=0)
+    parser.add_argument("--concorrencia", type=int, default=16, help="Clientes simultâneos (loop fechado).")
+    parser.add_argument("--taxa", type=float, default=0.0, help="Req/s fixas (loop aberto); 0 = concorrência fixa.")
+    parser.add_argument("--duracao", type=float, default=10.0, help="Segundos por cenário.")
+    parser.add_argument("--payloads", type=int, default=2000, help="Payloads distintos por cenário.")
+    parser.add_argument("--cenarios", nargs="+", choices=list(CENARIOS), default=list(CENARIOS))
+    parser.add_argument("--saida", help="Arquivo JSON (padrão: benchmarks/resultados/<commit>.json).")
+    parser.add_argument("--comparar", nargs=2, metavar=("BASE", "NOVO"), help="Compara dois arquivos de resultado.")
+    args = parser.parse_args()
+
+    if args.comparar:
+        comparar(*args.comparar)
+        return
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        gerar_modelo_sintetico(diretorio)
+        imprimir_cabecalho()
+        rodar = rodar_uvicorn if args.modo == "uvicorn" else rodar_em_processo
+        resultados = asyncio.run(rodar(args, diretorio))
+    gravar(resultados, args)
+
+
+if __name__ == "__main__":
+    main()
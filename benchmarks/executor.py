@@ -0,0 +1,77 @@
+"""
+Vazão e latência de cauda do /prever por configuração de workers x threads de inferência.
+
+Para cada combinação sobe um uvicorn (benchmarks.carga.rodar_uvicorn) com WEB_CONCURRENCY e
+INFERENCIA_THREADS ajustados e mede os mesmos cenários do teste de carga. Respostas 429/504
+(fila cheia / prazo) aparecem na coluna de erros.
+
+Uso (na raiz do projeto; pip install -r requirements-dev.txt):
+    python -m benchmarks.executor [--configs 1x1 1x2 1x4 2x1 2x2 4x1] [--concorrencia 64]
+    (cada config é <workers>x<threads de inferência>)
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.carga import (
+    CENARIOS, DIRETORIO_RESULTADOS, commit_atual, gerar_modelo_sintetico, imprimir_cabecalho, rodar_uvicorn,
+)
+
+
+def interpretar_config(texto):
+    workers, threads = texto.lower().split("x")
+    return int(workers), int(threads)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Varre workers x threads de inferência com o teste de carga.")
+    parser.add_argument("--configs", nargs="+", default=["1x1", "1x2", "1x4", "2x1", "2x2", "4x1"])
+    parser.add_argument("--concorrencia", type=int, default=64)
+    parser.add_argument("--taxa", type=float, default=0.0, help="Req/s fixas (loop aberto); 0 = concorrência fixa.")
+    parser.add_argument("--duracao", type=float, default=10.0)
+    parser.add_argument("--payloads", type=int, default=2000)
+    parser.add_argument("--cenarios", nargs="+", choices=list(CENARIOS), default=["unitario", "lote_32"])
+    parser.add_argument("--fila-max", type=int, default=None, help="INFERENCIA_FILA_MAX (padrão da API).")
+    parser.add_argument("--prazo-ms", type=float, default=None, help="INFERENCIA_PRAZO_MS (padrão da API).")
+    args = parser.parse_args()
+    args.porta = 0
+
+    if args.fila_max is not None:
+        os.environ["INFERENCIA_FILA_MAX"] = str(args.fila_max)
+    if args.prazo_ms is not None:
+        os.environ["INFERENCIA_PRAZO_MS"] = str(args.prazo_ms)
+
+    por_config = {}
+    with tempfile.TemporaryDirectory() as diretorio:
+        gerar_modelo_sintetico(diretorio)
+        for texto in args.configs:
+            workers, threads = interpretar_config(texto)
+            args.workers = workers
+            os.environ.update(WEB_CONCURRENCY=str(workers), INFERENCIA_THREADS=str(threads))
+            print(f"\n⚙️ {workers} worker(s) x {threads} thread(s) de inferência ({os.cpu_count()} CPUs)")
+            imprimir_cabecalho()
+            por_config[texto] = asyncio.run(rodar_uvicorn(args, diretorio))
+
+    print(f"\n{'config':<8} {'cenário':<15} {'req/s':>9} {'p99 ms':>9} {'erros':>6}")
+    for texto, resultados in por_config.items():
+        for r in resultados:
+            print(f"{texto:<8} {r['cenario']:<15} {r['req_s']:>9.1f} {r['p99_ms']:>9.2f} {r['erros']:>6}")
+
+    os.makedirs(DIRETORIO_RESULTADOS, exist_ok=True)
+    caminho = os.path.join(DIRETORIO_RESULTADOS, f"executor-{commit_atual()}.json")
+    with open(caminho, "w") as f:
+        json.dump({
+            "commit": commit_atual(),
+            "data": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "config": {"concorrencia": args.concorrencia, "taxa": args.taxa, "duracao_s": args.duracao,
+                       "cpus": os.cpu_count()},
+            "resultados": por_config,
+        }, f, indent=2, ensure_ascii=False)
+    print(f"💾 Resultados gravados em {caminho}")
+
+
+if __name__ == "__main__":
+    main()
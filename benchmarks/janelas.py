@@ -0,0 +1,50 @@
+"""
+Compara a montagem de janelas com loop Python (implementação antiga) e com
+utils.janelas.criar_janelas (sliding_window_view).
+
+Uso (na raiz do projeto):
+    python -m benchmarks.janelas
+"""
+import time
+import tracemalloc
+
+import numpy as np
+
+from utils.janelas import criar_janelas
+
+
+def criar_janelas_loop(series, janela):
+    X, y = [], []
+    for i in range(len(series) - janela):
+        X.append(series[i:i+janela])
+        y.append(series[i+janela])
+    X, y = np.array(X), np.array(y)
+    return X.reshape((X.shape[0], X.shape[1], 1)), y
+
+
+def medir(funcao, *args):
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    X, y = funcao(*args)
+    duracao = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return duracao, pico / 1024 ** 2, X, y
+
+
+def main():
+    janela = 30
+    print(f"{'pontos':>9} {'versão':<16} {'tempo (ms)':>11} {'pico (MB)':>10}")
+    for n in (10_000, 100_000, 1_000_000):
+        serie = np.random.default_rng(0).random(n)
+        t_loop, m_loop, X_loop, y_loop = medir(criar_janelas_loop, serie, janela)
+        t_vet, m_vet, X_vet, y_vet = medir(criar_janelas, serie, janela)
+        t_f32, m_f32, _, _ = medir(lambda s, j: criar_janelas(s, j, dtype=np.float32), serie, janela)
+        assert np.array_equal(X_loop, X_vet) and np.array_equal(y_loop, y_vet)
+        print(f"{n:>9} {'loop':<16} {t_loop * 1000:>11.1f} {m_loop:>10.1f}")
+        print(f"{n:>9} {'vetorizado':<16} {t_vet * 1000:>11.1f} {m_vet:>10.1f}")
+        print(f"{n:>9} {'vetorizado f32':<16} {t_f32 * 1000:>11.1f} {m_f32:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
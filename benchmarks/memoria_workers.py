@@ -0,0 +1,112 @@
+"""
+Memória por worker e total do servidor com 1, 4 e 8 workers, em cada forma de subir a API.
+
+- uvicorn:       python -m uvicorn app.main:app --workers N (cada worker importa e carrega tudo)
+- fork:          python -m app.servidor --workers N (pré-carga no pai + fork)
+- fork_mmap:     idem, com NPZ_MMAP=true (pesos mapeados de .npy, compartilhados pelo page cache)
+
+RSS conta páginas compartilhadas em todos os processos que as usam; PSS divide cada página
+compartilhada pelo número de processos, então a soma do PSS é a memória real do conjunto.
+Usa o modelo sintético de benchmarks.carga (SERVING_MODE=npz, sem TensorFlow).
+
+Uso (na raiz do projeto, Linux; pip install -r requirements-dev.txt):
+    python -m benchmarks.memoria_workers [--workers 1 4 8] [--requisicoes 400]
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.carga import _porta_livre, ambiente_servidor, gerar_modelo_sintetico, gerar_payloads, processos_servidor
+
+MODOS = {
+    "uvicorn": (["-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--log-level", "warning",
+                 "--no-access-log"], {}),
+    "fork": (["-m", "app.servidor", "--host", "127.0.0.1"], {}),
+    "fork_mmap": (["-m", "app.servidor", "--host", "127.0.0.1"], {"NPZ_MMAP": "true"}),
+}
+
+
+def ler_memoria_mb(pid):
+    """(RSS, PSS) em MB a partir de /proc/<pid>/smaps_rollup."""
+    valores = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for linha in f:
+            if linha.startswith(("Rss:", "Pss:")):
+                chave, valor = linha.split(":", 1)
+                valores[chave] = int(valor.split()[0]) / 1024
+    return valores.get("Rss", 0.0), valores.get("Pss", 0.0)
+
+
+async def exercitar(porta, workers, requisicoes):
+    """Espera a API responder e distribui requisições para todos os workers tocarem no modelo."""
+    import httpx
+
+    _, payloads = gerar_payloads("unitario", requisicoes)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{porta}", timeout=30.0) as cliente:
+        limite = time.perf_counter() + 60
+        while True:
+            try:
+                if (await cliente.get("/registro")).status_code == 200:
+                    break
+            except httpx.TransportError:
+                pass
+            if time.perf_counter() > limite:
+                raise RuntimeError("❌ Servidor não respondeu em 60 s.")
+            await asyncio.sleep(0.2)
+        semaforo = asyncio.Semaphore(max(4, workers * 4))
+
+        async def enviar(payload):
+            async with semaforo:
+                await cliente.post("/prever", json=payload)
+
+        await asyncio.gather(*(enviar(p) for p in payloads))
+
+
+def medir(modo, workers, diretorio, requisicoes):
+    argumentos, extra = MODOS[modo]
+    porta = _porta_livre()
+    env = dict(os.environ, **ambiente_servidor(diretorio), **extra)
+    servidor = subprocess.Popen(
+        [sys.executable, *argumentos, "--port", str(porta), "--workers", str(workers)], env=env)
+    try:
+        asyncio.run(exercitar(porta, workers, requisicoes))
+        time.sleep(1.0)
+        pids = processos_servidor(servidor.pid)
+        filhos = [pid for pid in pids if pid != servidor.pid]
+        memoria = {pid: ler_memoria_mb(pid) for pid in pids}
+    finally:
+        servidor.terminate()
+        servidor.wait(timeout=15)
+    return {
+        "modo": modo,
+        "workers": workers,
+        "rss_worker_mb": sum(memoria[p][0] for p in filhos) / max(1, len(filhos)),
+        "pss_worker_mb": sum(memoria[p][1] for p in filhos) / max(1, len(filhos)),
+        "rss_total_mb": sum(rss for rss, _ in memoria.values()),
+        "pss_total_mb": sum(pss for _, pss in memoria.values()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RSS/PSS por worker e total em cada modo de servir a API.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--modos", nargs="+", choices=list(MODOS), default=list(MODOS))
+    parser.add_argument("--requisicoes", type=int, default=400)
+    args = parser.parse_args()
+
+    print(f"{'modo':<10} {'workers':>7} {'RSS/worker':>11} {'PSS/worker':>11} {'RSS total':>10} {'PSS total':>10}  (MB)")
+    with tempfile.TemporaryDirectory() as diretorio:
+        gerar_modelo_sintetico(diretorio)
+        for modo in args.modos:
+            for workers in args.workers:
+                r = medir(modo, workers, diretorio, args.requisicoes)
+                print(f"{r['modo']:<10} {r['workers']:>7} {r['rss_worker_mb']:>11.1f} {r['pss_worker_mb']:>11.1f} "
+                      f"{r['rss_total_mb']:>10.1f} {r['pss_total_mb']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Mede o custo da instrumentação de app/metricas.py:
+
+1) `observar` de um histograma (série já resolvida), por chamada
+2) Middleware ASGI: latência de uma app ASGI mínima com e sem o MiddlewareMetricas
+3) `exportar()` com as séries geradas
+
+Não depende do FastAPI nem do modelo. Uso (na raiz do projeto):
+    python -m benchmarks.metricas
+"""
+import asyncio
+import time
+
+from app.metricas import MiddlewareMetricas, RegistroMetricas
+
+
+class _Rota:
+    path = "/prever"
+
+
+async def _app_minima(scope, receive, send):
+    scope["route"] = _Rota
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def _receber():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def _enviar(mensagem):
+    pass
+
+
+def medir_observar(repeticoes=1_000_000):
+    metricas = RegistroMetricas()
+    serie = metricas.histograma("etapa_segundos", "bench", ("rota", "etapa")).serie("/prever", "validacao")
+    inicio = time.perf_counter()
+    for i in range(repeticoes):
+        serie.observar(0.0001 * (i % 50))
+    return (time.perf_counter() - inicio) / repeticoes * 1e9
+
+
+async def _rodar(app, repeticoes):
+    scope = {"type": "http", "method": "POST", "path": "/prever"}
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        await app(dict(scope), _receber, _enviar)
+    return (time.perf_counter() - inicio) / repeticoes * 1e6
+
+
+def medir_middleware(repeticoes=200_000):
+    metricas = RegistroMetricas()
+    instrumentada = MiddlewareMetricas(
+        _app_minima,
+        latencia=metricas.histograma("requisicao_segundos", "bench", ("metodo", "rota", "status")),
+        em_andamento=metricas.gauge("requisicoes_em_andamento", "bench", ("metodo",)),
+    )
+    sem = asyncio.run(_rodar(_app_minima, repeticoes))
+    com = asyncio.run(_rodar(instrumentada, repeticoes))
+    inicio = time.perf_counter()
+    corpo = metricas.exportar()
+    exportar_ms = (time.perf_counter() - inicio) * 1000
+    return sem, com, exportar_ms, len(corpo)
+
+
+def main():
+    print(f"observar (histograma): {medir_observar():.0f} ns/chamada")
+    sem, com, exportar_ms, tamanho = medir_middleware()
+    print(f"app ASGI mínima:       {sem:.2f} µs/requisição")
+    print(f"com MiddlewareMetricas: {com:.2f} µs/requisição (+{com - sem:.2f} µs)")
+    print(f"exportar():            {exportar_ms:.3f} ms ({tamanho} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+CPU por requisição de cada formato de entrada/saída do /prever.
+
+1) Decodificação isolada: Pydantic (POST /prever) x orjson x json x float32 binário x msgpack
+2) Serialização isolada: JSONResponse x RespostaRapida (orjson)
+3) Ponta a ponta in-process (modelo sintético de benchmarks.carga): CPU de processo por requisição
+   em POST /prever e POST /prever/rapido com cada Content-Type
+
+Uso (na raiz do projeto; requer httpx, orjson/msgpack opcionais):
+    python -m benchmarks.serializacao [--historico 30] [--requisicoes 2000]
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.carga import ambiente_servidor, gerar_modelo_sintetico, gerar_payloads
+
+
+def cpu_por_chamada(funcao, repeticoes):
+    inicio = time.process_time()
+    for _ in range(repeticoes):
+        funcao()
+    return (time.process_time() - inicio) / repeticoes * 1e6
+
+
+def corpos(historico):
+    """Mesmo histórico em cada formato: (nome, content-type, rota, corpo)."""
+    from app import formatos
+
+    payload = {"historico": historico, "ticker": "AAPL"}
+    binario = np.asarray(historico, dtype="<f4").tobytes()
+    saida = [
+        ("pydantic_json", "application/json", "/prever", json.dumps(payload).encode()),
+        ("rapido_json", "application/json", "/prever/rapido", json.dumps(payload).encode()),
+        ("rapido_binario", formatos.TIPO_BINARIO, "/prever/rapido?ticker=AAPL", binario),
+    ]
+    if formatos.msgpack is not None:
+        saida.append(("rapido_msgpack", formatos.TIPOS_MSGPACK[0], "/prever/rapido",
+                      formatos.msgpack.packb({"historico": binario, "ticker": "AAPL"})))
+    return saida
+
+
+def medir_decodificacao(historico, repeticoes):
+    from app import formatos
+    from app.schemas import PrevisaoRequest
+
+    resultados = {}
+    for nome, tipo, _, corpo in corpos(historico):
+        if nome == "pydantic_json":
+            funcao = lambda c=corpo: PrevisaoRequest.model_validate_json(c)
+        else:
+            funcao = lambda t=tipo, c=corpo: formatos.decodificar_entrada(t, c)
+        resultados[nome] = cpu_por_chamada(funcao, repeticoes)
+    corpo_json = corpos(historico)[0][3]
+    resultados["json_stdlib"] = cpu_por_chamada(lambda: formatos._ler_mapa(json.loads(corpo_json), "JSON"), repeticoes)
+    return resultados
+
+
+def medir_serializacao(repeticoes):
+    from fastapi.responses import JSONResponse
+
+    from app import formatos
+    from app.main import montar_resposta
+
+    resposta = montar_resposta("AAPL", 187.32, 188.05, "alta", "estável")
+    return {
+        "JSONResponse": cpu_por_chamada(lambda: JSONResponse(content=resposta), repeticoes),
+        formatos.RespostaRapida.__name__: cpu_por_chamada(lambda: formatos.RespostaRapida(content=resposta), repeticoes),
+    }
+
+
+async def medir_ponta_a_ponta(tamanho, requisicoes):
+    import httpx
+
+    from app.main import app
+
+    cenario = "historico_90" if tamanho <= 90 else "historico_250"
+    por_formato = {}
+    for payload in gerar_payloads(cenario, requisicoes)[1]:
+        for item in corpos(payload["historico"][-tamanho:]):
+            por_formato.setdefault(item[0], []).append(item)
+
+    resultados = {}
+    async with app.router.lifespan_context(app):
+        transporte = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://bench") as cliente:
+            for nome, lista in por_formato.items():
+                _, tipo, rota, _ = lista[0]
+                # Aquecimento
+                for _, _, _, corpo in lista[:50]:
+                    await cliente.post(rota, content=corpo, headers={"content-type": tipo})
+                inicio = time.process_time()
+                for _, _, _, corpo in lista:
+                    resp = await cliente.post(rota, content=corpo, headers={"content-type": tipo})
+                    if resp.status_code != 200:
+                        raise RuntimeError(f"❌ {nome}: HTTP {resp.status_code} {resp.text}")
+                resultados[nome] = (time.process_time() - inicio) / len(lista) * 1e6
+    return resultados
+
+
+def imprimir(titulo, resultados):
+    print(f"\n{titulo}")
+    for nome, us in resultados.items():
+        print(f"  {nome:<20} {us:>9.1f} µs CPU")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CPU por requisição de cada formato do /prever.")
+    parser.add_argument("--historico", type=int, default=30, help="Tamanho do histórico enviado.")
+    parser.add_argument("--repeticoes", type=int, default=20000)
+    parser.add_argument("--requisicoes", type=int, default=2000)
+    args = parser.parse_args()
+
+    historico = np.round(np.linspace(150, 160, args.historico), 2).tolist()
+    imprimir(f"Decodificação ({args.historico} preços)", medir_decodificacao(historico, args.repeticoes))
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        gerar_modelo_sintetico(diretorio)
+        # ambiente_servidor já desliga o cache de previsões (CACHE_PREVISOES_MAX=1)
+        os.environ.update(ambiente_servidor(diretorio))
+        imprimir("Serialização da resposta", medir_serializacao(args.repeticoes))
+        imprimir("Ponta a ponta in-process (inclui cliente httpx e modelo)",
+                 asyncio.run(medir_ponta_a_ponta(args.historico, args.requisicoes)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+Mede o tempo de inicialização (import de app.main) e o RSS de pico de um
+processo novo em cada SERVING_MODE.
+
+Uso (na raiz do projeto, com model/modelo_lstm.keras, scaler.gz e modelo_lstm.npz):
+    python -m benchmarks.startup
+"""
+import json
+import os
+import subprocess
+import sys
+
+CODIGO_FILHO = """
+import json, resource, time
+inicio = time.perf_counter()
+import app.main
+duracao = time.perf_counter() - inicio
+rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+print(json.dumps({"startup_s": duracao, "rss_pico_mb": rss_mb}))
+"""
+
+
+def medir(modo, repeticoes=3):
+    env = dict(os.environ, SERVING_MODE=modo)
+    env.setdefault("MODEL_DIR", os.path.abspath("model"))
+    resultados = []
+    for _ in range(repeticoes):
+        saida = subprocess.run([sys.executable, "-c", CODIGO_FILHO], env=env,
+                               capture_output=True, text=True, check=True).stdout
+        resultados.append(json.loads(saida.strip().splitlines()[-1]))
+    return min(resultados, key=lambda r: r["startup_s"])
+
+
+def main():
+    print(f"{'modo':<8} {'startup (s)':>12} {'RSS pico (MB)':>14}")
+    for modo in ("keras", "npz"):
+        r = medir(modo)
+        print(f"{modo:<8} {r['startup_s']:>12.2f} {r['rss_pico_mb']:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,23 @@
+import argparse
+import json
 import os
-import pandas as pd
-import yfinance as yf
-from alpha_vantage.timeseries import TimeSeries
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 from dotenv import load_dotenv
 
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+from data import dataset, features
+from data.provedores import ProvedorFixture, ProvedorMock, provedores_padrao
+
 # Carrega as variáveis do arquivo .env que deve estar na raiz do projeto
 load_dotenv()
 
-# Ativo a ser coletado
-ATIVO = "AAPL"
-ARQUIVO_LOCAL = f"data/{ATIVO}_fechamento.parquet"
-ARQUIVO_S3 = f"acoes/{ATIVO}_fechamento.parquet"
+# Ativos coletados por padrão (TICKERS="AAPL,MSFT,..." no .env)
+TICKERS = [t.strip().upper() for t in os.getenv("TICKERS", "AAPL").split(",") if t.strip()]
+MAX_WORKERS = int(os.getenv("COLETA_MAX_WORKERS", "4"))
 
 # Carrega variáveis de ambiente
 USE_S3 = os.getenv("USE_S3", "false").lower() == "true"
@@ -18,75 +25,79 @@ AWS_ACCESS_KEY_ID = os.getenv("AWS_ACCESS_KEY_ID")
 AWS_SECRET_ACCESS_KEY = os.getenv("AWS_SECRET_ACCESS_KEY")
 AWS_SESSION_TOKEN = os.getenv("AWS_SESSION_TOKEN")
 BUCKET = os.getenv("BUCKET_NAME", "bdadostchallengebruna")
-ALPHAVANTAGE_API_KEY = os.getenv("ALPHAVANTAGE_API_KEY")
-
-print(f"Chave Alpha Vantage carregada: {ALPHAVANTAGE_API_KEY}")
-if ALPHAVANTAGE_API_KEY:
-    print("Chave Alpha Vantage configurada.")
-else:
-    print("Chave Alpha Vantage NÃO está configurada.")
-
-df = None
-
-# 1️⃣ Primeiro tenta via yfinance
-try:
-    print(f"📥 Tentando coletar via yfinance para {ATIVO}...")
-    df = yf.download(ATIVO, period="1y", interval="1d")
-    if df.empty:
-        raise ValueError("Sem dados no yfinance.")
-    df.reset_index(inplace=True)
-    print("✅ Dados coletados via yfinance.")
-except Exception as e:
-    print(f"⚠ Erro no yfinance: {e}")
-    df = None
-
-# 2️⃣ Se falhar, tenta via Alpha Vantage, só se a chave estiver configurada
-if df is None:
-    if ALPHAVANTAGE_API_KEY:
-        print(f"📥 Tentando coletar via Alpha Vantage para {ATIVO} com chave API presente...")
+# Atualiza o feature store (data/features.py) com os pregões novos de cada coleta local
+FEATURES_ATUALIZAR = os.getenv("FEATURES_ATUALIZAR", "true").lower() == "true"
+# API que mantém o histórico em memória (ex.: http://localhost): recebe as barras novas após cada coleta.
+# Só um worker recebe o POST; os demais leem do dataset a cada HISTORICO_ATUALIZAR_S (app/main.py)
+HISTORICO_API_URL = os.getenv("HISTORICO_API_URL", "").rstrip("/")
+
+
+def notificar_api(ticker, df):
+    """Envia as barras novas ao POST /historico/{ticker} da API; falha apenas gera aviso."""
+    if not HISTORICO_API_URL or df is None or df.empty:
+        return
+    import urllib.request
+
+    corpo = json.dumps({
+        "precos": df["Close"].astype(float).tolist(),
+        "datas": df["Date"].dt.strftime("%Y-%m-%d").tolist(),
+    }).encode()
+    pedido = urllib.request.Request(f"{HISTORICO_API_URL}/historico/{ticker}", data=corpo, method="POST",
+                                    headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(pedido, timeout=5) as resp:
+            print(f"🔔 {ticker}: API atualizada ({json.loads(resp.read()).get('anexados', 0)} pregões novos).")
+    except Exception as e:
+        print(f"⚠ {ticker}: não foi possível atualizar o histórico da API: {e}")
+
+
+def coletar_ticker(ticker, provedores, s3=None):
+    """
+    Coleta incremental de um ticker:
+    1) Descobre a última 'Date' armazenada (local ou, com USE_S3, no S3)
+    2) Tenta cada provedor em ordem pedindo só datas posteriores
+    3) Se todos falharem e não houver histórico, usa mock (mesmo fallback do script original)
+    4) Anexa as linhas novas ao dataset particionado (no S3, direto via upload multipart)
+    Retorna (fonte, linhas_novas, arquivos_gravados).
+    """
+    inicio = dataset.ultima_data_s3(ticker, BUCKET) if s3 is not None else dataset.ultima_data(ticker)
+    if inicio is not None:
+        print(f"📅 {ticker}: última data armazenada {inicio:%Y-%m-%d}.")
+
+    df, fonte = None, None
+    for provedor in provedores:
         try:
-            ts = TimeSeries(key=ALPHAVANTAGE_API_KEY, output_format='pandas')
-            data, meta = ts.get_daily(symbol=ATIVO, outputsize='compact')
-            data.reset_index(inplace=True)
-            # Padroniza colunas para ficar igual yfinance
-            data.rename(columns={
-                "date": "Date",
-                "1. open": "Open",
-                "2. high": "High",
-                "3. low": "Low",
-                "4. close": "Close",
-                "5. volume": "Volume"
-            }, inplace=True)
-            df = data
-            print("✅ Dados coletados via Alpha Vantage.")
+            print(f"📥 Tentando coletar via {provedor.nome} para {ticker}...")
+            df = provedor.baixar(ticker, inicio)
+            fonte = provedor.nome
+            print(f"✅ {ticker}: {len(df)} linhas novas via {provedor.nome}.")
+            break
         except Exception as e:
-            print(f"⚠ Erro no Alpha Vantage: {e}")
-            df = None
+            print(f"⚠ Erro no {provedor.nome} para {ticker}: {e}")
+
+    if df is None:
+        if inicio is not None:
+            raise RuntimeError(f"❌ Nenhum provedor respondeu para {ticker}; histórico mantido.")
+        print(f"⚠ Utilizando MOCK como fallback para {ticker}...")
+        df, fonte = ProvedorMock().baixar(ticker), "mock"
+
+    if s3 is not None:
+        gravados = dataset.anexar_s3(ticker, df, BUCKET, cliente=s3)
+        for chave in gravados:
+            print(f"✅ Arquivo enviado com sucesso para s3://{BUCKET}/{chave}")
     else:
-        print("⚠ ALPHAVANTAGE_API_KEY não definida, pulando Alpha Vantage.")
-
-# 3️⃣ Se tudo falhar, usa mock
-if df is None:
-    print("⚠ Utilizando MOCK como fallback...")
-    df = pd.DataFrame({
-        'Date': pd.date_range(end=pd.Timestamp.today(), periods=10),
-        'Open': range(10),
-        'High': range(10),
-        'Low': range(10),
-        'Close': range(10),
-        'Volume': range(10)
-    })
-    print("🚩 Fonte final de dados utilizada: mock.")
-
-# Salva localmente
-os.makedirs("data", exist_ok=True)
-df.to_parquet(ARQUIVO_LOCAL, index=False)
-print(f"✅ Arquivo local salvo em {ARQUIVO_LOCAL}")
-
-# Upload ao S3 só se USE_S3=true
-if USE_S3:
+        gravados = dataset.anexar(ticker, df)
+        if FEATURES_ATUALIZAR and gravados:
+            try:
+                features.atualizar(ticker)
+            except Exception as e:
+                print(f"⚠ {ticker}: feature store não atualizado: {e}")
+    notificar_api(ticker, df)
+    return fonte, len(df), gravados
+
+
+def cliente_s3():
     import boto3
-    import botocore.exceptions
 
     if not AWS_ACCESS_KEY_ID or not AWS_SECRET_ACCESS_KEY:
         raise EnvironmentError("❌ Credenciais AWS ausentes ou mal definidas no .env.")
@@ -96,14 +107,44 @@ if USE_S3:
         aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
         aws_session_token=AWS_SESSION_TOKEN
     )
-    s3 = session.client("s3")
+    return session.client("s3", endpoint_url=os.getenv("S3_ENDPOINT_URL") or None)
+
+
+def coletar(tickers, provedores=None, max_workers=MAX_WORKERS):
+    """Coleta vários tickers em paralelo (pool de threads limitado). Devolve {ticker: resultado}."""
+    provedores = provedores if provedores is not None else provedores_padrao()
+    s3 = cliente_s3() if USE_S3 else None
+    resultados = {}
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        futuros = {pool.submit(coletar_ticker, t, provedores, s3): t for t in tickers}
+        for futuro in as_completed(futuros):
+            ticker = futuros[futuro]
+            try:
+                fonte, linhas, gravados = futuro.result()
+                resultados[ticker] = {"fonte": fonte, "linhas_novas": linhas, "arquivos": gravados}
+                print(f"🚩 {ticker}: fonte {fonte}, {linhas} linhas novas.")
+            except Exception as e:
+                resultados[ticker] = {"erro": str(e)}
+                print(f"❌ {ticker}: {e}")
+
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Coleta incremental de preços por ticker.")
+    parser.add_argument("--tickers", default=",".join(TICKERS), help="Lista separada por vírgula.")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    parser.add_argument("--fixture-dir", help="Lê <dir>/<TICKER>.parquet|csv em vez do yfinance.")
+    args = parser.parse_args()
+
+    tickers = [t.strip().upper() for t in args.tickers.split(",") if t.strip()]
+    provedores = [ProvedorFixture(args.fixture_dir)] if args.fixture_dir else None
+    resultados = coletar(tickers, provedores, args.workers)
+
+    if any("erro" in r for r in resultados.values()):
+        sys.exit(1)
 
-    try:
-        print("☁️ Enviando para o S3...")
-        s3.upload_file(ARQUIVO_LOCAL, BUCKET, ARQUIVO_S3)
-        print(f"✅ Arquivo enviado com sucesso para s3://{BUCKET}/{ARQUIVO_S3}")
-    except Exception as e:
-        raise RuntimeError(f"❌ Falha ao enviar para o S3: {e}")
 
-    os.remove(ARQUIVO_LOCAL)
-    print(f"🧹 Arquivo local {ARQUIVO_LOCAL} removido após upload.")
+if __name__ == "__main__":
+    main()
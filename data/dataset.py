@@ -0,0 +1,185 @@
+import glob
+import os
+import tempfile
+import time
+import uuid
+
+import pandas as pd
+
+# Dataset particionado por ticker/ano:
+#   <raiz>/ticker=AAPL/ano=2025/part-<timestamp>.parquet
+# Cada coleta grava apenas os pregões novos em um novo arquivo "part-*".
+# O mesmo layout é usado no S3 sob s3://<bucket>/<PREFIXO_S3>/.
+DIRETORIO_DATASET = os.getenv("DATASET_DIR", "data/precos")
+PREFIXO_S3 = os.getenv("DATASET_PREFIXO_S3", "acoes")
+
+# Upload multipart: tamanho de parte, threads por upload e memória máxima antes de ir para disco
+S3_PART_SIZE_MB = int(os.getenv("S3_PART_SIZE_MB", "8"))
+S3_MAX_CONCURRENCY = int(os.getenv("S3_MAX_CONCURRENCY", "4"))
+S3_SPOOL_MB = int(os.getenv("S3_SPOOL_MB", "16"))
+# Linhas por row group: define a granularidade do predicate pushdown na leitura
+ROW_GROUP_LINHAS = int(os.getenv("PARQUET_ROW_GROUP_LINHAS", "65536"))
+
+
+def diretorio_ticker(ticker, raiz=None):
+    return os.path.join(raiz or DIRETORIO_DATASET, f"ticker={ticker}")
+
+
+def arquivos_ticker(ticker, raiz=None, ano=None):
+    padrao_ano = f"ano={ano}" if ano is not None else "ano=*"
+    return sorted(glob.glob(os.path.join(diretorio_ticker(ticker, raiz), padrao_ano, "part-*.parquet")))
+
+
+def _nome_parte():
+    return f"part-{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}.parquet"
+
+
+def _por_ano(df):
+    return df.groupby(df["Date"].dt.year)
+
+
+# ───────────────────────────────────────────────────────
+# Leitura (local ou S3) via pyarrow.dataset
+# ───────────────────────────────────────────────────────
+def sistema_arquivos_s3():
+    """S3FileSystem do pyarrow; S3_ENDPOINT_URL aponta para um S3 local (moto_server, MinIO)."""
+    from pyarrow import fs
+
+    endpoint = os.getenv("S3_ENDPOINT_URL")
+    opcoes = {"region": os.getenv("AWS_DEFAULT_REGION", "us-east-1")}
+    if endpoint:
+        esquema, _, host = endpoint.partition("://")
+        opcoes.update(endpoint_override=host or esquema, scheme=esquema if host else "https")
+    return fs.S3FileSystem(**opcoes)
+
+
+def _ler_tabela(origem, filesystem, colunas, desde, particionado):
+    """
+    Lê só as colunas pedidas; com `desde`, o filtro em Date é empurrado para o
+    Parquet (row groups fora do intervalo são pulados pelas estatísticas) e,
+    no dataset particionado, também elimina partições de anos anteriores.
+    """
+    import pyarrow.dataset as ds
+
+    dataset_pa = ds.dataset(origem, filesystem=filesystem, format="parquet",
+                            partitioning="hive" if particionado else None)
+    filtro = None
+    if desde is not None:
+        desde = pd.Timestamp(desde)
+        filtro = ds.field("Date") >= desde.to_pydatetime()
+        if particionado:
+            filtro = (ds.field("ano") >= desde.year) & filtro
+    if colunas is not None and "Date" not in colunas:
+        colunas = ["Date"] + list(colunas)
+    df = dataset_pa.to_table(columns=colunas, filter=filtro).to_pandas()
+    if colunas is None:
+        df = df.drop(columns=[c for c in ("ticker", "ano") if c in df.columns])
+    return df.drop_duplicates(subset="Date", keep="last").sort_values("Date").reset_index(drop=True)
+
+
+def ler_precos(ticker, colunas=None, raiz=None, desde=None):
+    """Lê as partições locais do ticker, ordenado por Date e sem datas duplicadas."""
+    if not arquivos_ticker(ticker, raiz):
+        raise FileNotFoundError(f"Nenhum dado de {ticker} em {diretorio_ticker(ticker, raiz)}.")
+    return _ler_tabela(diretorio_ticker(ticker, raiz), None, colunas, desde, particionado=True)
+
+
+def ler_precos_s3(ticker, bucket, colunas=("Date", "Close"), desde=None, prefixo=PREFIXO_S3):
+    """Lê o dataset particionado direto do S3 (leituras por faixa, sem baixar o objeto inteiro)."""
+    colunas = list(colunas) if colunas is not None else None
+    return _ler_tabela(f"{bucket}/{prefixo}/ticker={ticker}", sistema_arquivos_s3(),
+                       colunas, desde, particionado=True)
+
+
+def ler_objeto_s3(bucket, chave, colunas=("Date", "Close")):
+    """Lê um único Parquet do S3 (ex.: o legado acoes/AAPL_fechamento.parquet) só com as colunas pedidas."""
+    colunas = list(colunas) if colunas is not None else None
+    return _ler_tabela(f"{bucket}/{chave}", sistema_arquivos_s3(), colunas, None, particionado=False)
+
+
+def ultima_data(ticker, raiz=None):
+    """Maior 'Date' armazenada do ticker (lendo só a partição do ano mais recente), ou None."""
+    anos = sorted(
+        int(os.path.basename(p).split("=", 1)[1])
+        for p in glob.glob(os.path.join(diretorio_ticker(ticker, raiz), "ano=*"))
+    )
+    for ano in reversed(anos):
+        arquivos = arquivos_ticker(ticker, raiz, ano)
+        if arquivos:
+            return pd.concat([pd.read_parquet(a, columns=["Date"]) for a in arquivos])["Date"].max()
+    return None
+
+
+def ultima_data_s3(ticker, bucket, prefixo=PREFIXO_S3):
+    """Como `ultima_data`, no S3: lista as partições e lê apenas a coluna Date do ano mais recente."""
+    from pyarrow import fs as pafs
+
+    s3fs = sistema_arquivos_s3()
+    base = f"{bucket}/{prefixo}/ticker={ticker}"
+    try:
+        anos = sorted(
+            int(info.base_name.split("=", 1)[1])
+            for info in s3fs.get_file_info(pafs.FileSelector(base, allow_not_found=True))
+            if info.type == pafs.FileType.Directory and info.base_name.startswith("ano=")
+        )
+    except FileNotFoundError:
+        return None
+    if not anos:
+        return None
+    df = _ler_tabela(f"{base}/ano={anos[-1]}", s3fs, ["Date"], None, particionado=False)
+    return df["Date"].max() if not df.empty else None
+
+
+# ───────────────────────────────────────────────────────
+# Escrita
+# ───────────────────────────────────────────────────────
+def anexar(ticker, df, raiz=None):
+    """
+    Grava as linhas novas de `df` (já filtradas após a última data) em
+    arquivos novos, um por ano. Devolve a lista de caminhos gravados.
+    """
+    if df is None or df.empty:
+        return []
+
+    gravados = []
+    for ano, parte in _por_ano(df):
+        pasta = os.path.join(diretorio_ticker(ticker, raiz), f"ano={ano}")
+        os.makedirs(pasta, exist_ok=True)
+        caminho = os.path.join(pasta, _nome_parte())
+        parte.to_parquet(caminho, index=False, row_group_size=ROW_GROUP_LINHAS)
+        gravados.append(caminho)
+    return gravados
+
+
+def gravar_parquet_s3(df, bucket, chave, cliente=None):
+    """
+    Serializa o Parquet num SpooledTemporaryFile (em memória até S3_SPOOL_MB, depois em disco)
+    e envia com upload multipart (S3_PART_SIZE_MB por parte, S3_MAX_CONCURRENCY threads).
+    Nenhum arquivo local permanente é criado.
+    """
+    import boto3
+    from boto3.s3.transfer import TransferConfig
+
+    cliente = cliente or boto3.client("s3", endpoint_url=os.getenv("S3_ENDPOINT_URL") or None)
+    config = TransferConfig(
+        multipart_threshold=S3_PART_SIZE_MB * 1024 * 1024,
+        multipart_chunksize=S3_PART_SIZE_MB * 1024 * 1024,
+        max_concurrency=S3_MAX_CONCURRENCY,
+    )
+    with tempfile.SpooledTemporaryFile(max_size=S3_SPOOL_MB * 1024 * 1024) as buffer:
+        df.to_parquet(buffer, index=False, row_group_size=ROW_GROUP_LINHAS)
+        buffer.seek(0)
+        cliente.upload_fileobj(buffer, bucket, chave, Config=config)
+
+
+def anexar_s3(ticker, df, bucket, prefixo=PREFIXO_S3, cliente=None):
+    """Versão S3 de `anexar`: uma parte nova por ano em <prefixo>/ticker=X/ano=Y/. Devolve as chaves."""
+    if df is None or df.empty:
+        return []
+
+    gravadas = []
+    for ano, parte in _por_ano(df):
+        chave = f"{prefixo}/ticker={ticker}/ano={ano}/{_nome_parte()}"
+        gravar_parquet_s3(parte, bucket, chave, cliente)
+        gravadas.append(chave)
+    return gravadas
@@ -0,0 +1,200 @@
+"""
+Feature store colunar por ticker: OHLCV + features de janela móvel calculadas uma única vez.
+
+Layout: <FEATURES_DIR>/<TICKER>.arrow (Arrow IPC "file", sem compressão), lido com mmap:
+as colunas numéricas viram arrays NumPy sem cópia, e quem lê só uma coluna só toca nas páginas dela.
+
+1) `construir(ticker)` lê o dataset particionado (data/dataset.py) e calcula todas as features
+2) `atualizar(ticker)` lê só os pregões após a última data do store e calcula as features apenas
+   das linhas novas (com as últimas max(JANELAS) + 1 linhas como contexto das janelas móveis)
+3) `ler_features` / `ler_colunas` servem treino, avaliação e API; `ler_colunas` atualiza o store
+   antes se o dataset tiver pregões mais novos
+
+Features (n em JANELAS_FEATURES, padrão 5,10,20,30):
+- retorno_1, log_retorno_1, retorno_n: variação do fechamento em 1 e n pregões
+- media_n, dist_media_n: média móvel do fechamento e distância relativa a ela
+- volatilidade_n: desvio padrão dos retornos diários na janela
+- cv_n: coeficiente de variação do fechamento na janela, em % (o mesmo de detectar_tendencia_historico)
+- amplitude: (High - Low) / Close
+- volume_media_n, volume_relativo_n: média móvel do volume e volume do dia em relação a ela
+Primeiras linhas sem janela completa ficam NaN.
+
+Uso (na raiz do projeto):
+    python data/features.py --tickers AAPL MSFT [--reconstruir]
+"""
+import argparse
+import os
+import sys
+from typing import List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+from data import dataset
+
+DIRETORIO_FEATURES = os.getenv("FEATURES_DIR", "data/features")
+JANELAS_FEATURES = tuple(int(n) for n in os.getenv("JANELAS_FEATURES", "5,10,20,30").split(",") if n.strip())
+COLUNAS_OHLCV = ("Date", "Open", "High", "Low", "Close", "Volume")
+
+
+def caminho_features(ticker, raiz=None):
+    return os.path.join(raiz or DIRETORIO_FEATURES, f"{ticker}.arrow")
+
+
+def existe(ticker, raiz=None) -> bool:
+    return os.path.isfile(caminho_features(ticker, raiz))
+
+
+# ───────────────────────────────────────────────────────
+# Cálculo (vetorizado, pandas rolling)
+# ───────────────────────────────────────────────────────
+def calcular_features(df: pd.DataFrame, janelas: Sequence[int] = JANELAS_FEATURES) -> pd.DataFrame:
+    """`df` ordenado por Date com as colunas de COLUNAS_OHLCV; devolve OHLCV + features (float64)."""
+    saida = pd.DataFrame({"Date": pd.to_datetime(df["Date"]).to_numpy()})
+    for coluna in COLUNAS_OHLCV[1:]:
+        saida[coluna] = pd.to_numeric(df[coluna], errors="coerce").to_numpy(dtype=np.float64) \
+            if coluna in df.columns else np.nan
+    close, volume = saida["Close"], saida["Volume"]
+
+    retorno = close.pct_change()
+    saida["retorno_1"] = retorno
+    saida["log_retorno_1"] = np.log(close / close.shift(1))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        saida["amplitude"] = (saida["High"] - saida["Low"]) / close
+    for n in janelas:
+        media = close.rolling(n).mean()
+        # ddof=0: mesmo desvio (np.std) usado em tendencias_historico
+        desvio = close.rolling(n).std(ddof=0)
+        volume_media = volume.rolling(n).mean()
+        saida[f"retorno_{n}"] = close / close.shift(n) - 1
+        saida[f"media_{n}"] = media
+        saida[f"dist_media_{n}"] = close / media - 1
+        saida[f"volatilidade_{n}"] = retorno.rolling(n).std()
+        saida[f"cv_{n}"] = desvio / media * 100
+        saida[f"volume_media_{n}"] = volume_media
+        saida[f"volume_relativo_{n}"] = volume / volume_media
+    return saida
+
+
+# ───────────────────────────────────────────────────────
+# Persistência (Arrow IPC com mmap)
+# ───────────────────────────────────────────────────────
+def _para_tabela(df: pd.DataFrame):
+    import pyarrow as pa
+
+    # pa.array sobre o ndarray (sem from_pandas): NaN continua NaN, sem bitmap de nulos,
+    # e a leitura com to_numpy() fica sem cópia
+    return pa.table({coluna: pa.array(df[coluna].to_numpy()) for coluna in df.columns})
+
+
+def _gravar(tabela, caminho: str):
+    """Grava num temporário no mesmo diretório e troca com os.replace: leitores nunca veem arquivo parcial."""
+    import pyarrow as pa
+
+    os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+    temporario = f"{caminho}.tmp-{os.getpid()}"
+    with pa.OSFile(temporario, "wb") as destino:
+        with pa.ipc.new_file(destino, tabela.schema) as escritor:
+            escritor.write_table(tabela)
+    os.replace(temporario, caminho)
+
+
+def ler_tabela(ticker, colunas: Optional[List[str]] = None, raiz=None, desde=None):
+    """
+    pyarrow.Table mapeada do arquivo (sem copiar para a memória do processo).
+    Com `desde`, só as linhas com Date posterior (fatia do mmap: as anteriores não são lidas).
+    """
+    import pyarrow as pa
+
+    caminho = caminho_features(ticker, raiz)
+    if not os.path.isfile(caminho):
+        raise FileNotFoundError(f"Nenhuma feature de {ticker} em {caminho}; rode data/features.py.")
+    tabela = pa.ipc.open_file(pa.memory_map(caminho, "r")).read_all()
+    if desde is not None:
+        # Linhas ordenadas por Date: busca binária na coluna mapeada
+        datas = tabela.column("Date").to_numpy()
+        tabela = tabela.slice(int(np.searchsorted(datas, np.datetime64(pd.Timestamp(desde)), side="right")))
+    return tabela.select(colunas) if colunas is not None else tabela
+
+
+def ler_features(ticker, colunas: Optional[List[str]] = None, raiz=None, desde=None) -> pd.DataFrame:
+    return ler_tabela(ticker, colunas, raiz, desde).to_pandas()
+
+
+def coluna(ticker, nome: str, raiz=None) -> np.ndarray:
+    """Uma coluna como ndarray somente leitura, direto do mmap."""
+    return ler_tabela(ticker, [nome], raiz).column(0).to_numpy()
+
+
+# ───────────────────────────────────────────────────────
+# Construção e atualização incremental
+# ───────────────────────────────────────────────────────
+def construir(ticker, raiz=None, raiz_dataset=None) -> int:
+    """Recalcula o store do ticker a partir do dataset inteiro. Devolve o número de linhas."""
+    df = dataset.ler_precos(ticker, colunas=list(COLUNAS_OHLCV[1:]), raiz=raiz_dataset)
+    _gravar(_para_tabela(calcular_features(df)), caminho_features(ticker, raiz))
+    print(f"🧮 Features de {ticker} calculadas ({len(df)} pregões).")
+    return len(df)
+
+
+def atualizar(ticker, raiz=None, raiz_dataset=None) -> int:
+    """
+    Anexa as features dos pregões posteriores à última data do store, calculadas com as últimas
+    max(JANELAS_FEATURES) + 1 linhas como contexto. Sem store, constrói do zero. Devolve as linhas novas.
+    """
+    import pyarrow as pa
+
+    if not existe(ticker, raiz):
+        return construir(ticker, raiz, raiz_dataset)
+    atual = ler_tabela(ticker, raiz=raiz)
+    ultima = pd.Timestamp(atual.column("Date")[-1].as_py()) if atual.num_rows else None
+    novos = dataset.ler_precos(ticker, colunas=list(COLUNAS_OHLCV[1:]), raiz=raiz_dataset, desde=ultima)
+    if ultima is not None:
+        novos = novos[novos["Date"] > ultima]
+    if novos.empty:
+        return 0
+
+    # n linhas de contexto para as médias e n+1 para a volatilidade dos retornos
+    contexto = max(JANELAS_FEATURES, default=1) + 1
+    cauda = atual.slice(max(0, atual.num_rows - contexto)).select(list(COLUNAS_OHLCV)).to_pandas()
+    calculado = calcular_features(pd.concat([cauda, novos[list(COLUNAS_OHLCV)]], ignore_index=True))
+    novas = _para_tabela(calculado.iloc[len(cauda):].reset_index(drop=True)).cast(atual.schema)
+    _gravar(pa.concat_tables([atual, novas]), caminho_features(ticker, raiz))
+    print(f"🧮 Features de {ticker}: {len(novos)} pregões novos.")
+    return len(novos)
+
+
+def ler_colunas(ticker, colunas: Sequence[str] = ("Date", "Close"), raiz=None, raiz_dataset=None,
+                desde=None) -> pd.DataFrame:
+    """
+    Colunas do store para treino/avaliação/API (com `desde`, só os pregões posteriores),
+    atualizando-o antes se o dataset local tiver pregões mais novos (a checagem lê só a
+    coluna Date do ano mais recente).
+    """
+    colunas = list(colunas)
+    if "Date" not in colunas:
+        colunas = ["Date"] + colunas
+    ultima_dataset = dataset.ultima_data(ticker, raiz_dataset)
+    if not existe(ticker, raiz):
+        construir(ticker, raiz, raiz_dataset)
+    elif ultima_dataset is not None:
+        datas = ler_tabela(ticker, ["Date"], raiz).column(0)
+        if not len(datas) or pd.Timestamp(datas[-1].as_py()) < ultima_dataset:
+            atualizar(ticker, raiz, raiz_dataset)
+    return ler_features(ticker, colunas, raiz, desde)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calcula/atualiza o feature store por ticker.")
+    parser.add_argument("--tickers", nargs="+", default=[os.getenv("TICKER_PADRAO", "AAPL")])
+    parser.add_argument("--reconstruir", action="store_true", help="Recalcula tudo em vez de só os pregões novos.")
+    args = parser.parse_args()
+    for ticker in args.tickers:
+        (construir if args.reconstruir else atualizar)(ticker)
+
+
+if __name__ == "__main__":
+    main()
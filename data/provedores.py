@@ -0,0 +1,164 @@
+import os
+import random
+import threading
+import time
+
+import pandas as pd
+
+COLUNAS = ["Date", "Open", "High", "Low", "Close", "Volume"]
+
+
+def padronizar(df):
+    """Deixa o DataFrame no formato do yfinance: colunas COLUNAS, Date sem fuso, ordenado."""
+    if isinstance(df.columns, pd.MultiIndex):
+        # yfinance recente devolve (campo, ticker) mesmo para um único ticker
+        df.columns = df.columns.get_level_values(0)
+    if "Date" not in df.columns and "date" not in df.columns:
+        df = df.reset_index()
+    df = df.rename(columns={"date": "Date", "index": "Date"})
+    df["Date"] = pd.to_datetime(df["Date"]).dt.tz_localize(None)
+    faltando = [c for c in COLUNAS if c not in df.columns]
+    if faltando:
+        raise KeyError(f"Colunas ausentes nos dados coletados: {faltando}")
+    return df[COLUNAS].sort_values("Date").reset_index(drop=True)
+
+
+def _filtrar_apos(df, inicio):
+    if inicio is None:
+        return df
+    return df[df["Date"] > pd.Timestamp(inicio)].reset_index(drop=True)
+
+
+class ProvedorYFinance:
+    nome = "yfinance"
+
+    def baixar(self, ticker, inicio=None):
+        import yfinance as yf
+
+        if inicio is None:
+            df = yf.download(ticker, period="1y", interval="1d", progress=False)
+        else:
+            # start é inclusivo: pede a partir do dia seguinte ao último armazenado
+            df = yf.download(ticker, start=pd.Timestamp(inicio) + pd.Timedelta(days=1),
+                             interval="1d", progress=False)
+        if df.empty:
+            if inicio is not None:
+                # Nenhum pregão novo desde a última coleta
+                return pd.DataFrame(columns=COLUNAS)
+            raise ValueError("Sem dados no yfinance.")
+        return _filtrar_apos(padronizar(df), inicio)
+
+
+class LimiteRequisicoes(Exception):
+    """Resposta de limite de chamadas da Alpha Vantage."""
+
+
+class ProvedorAlphaVantage:
+    """
+    Alpha Vantage com controle de taxa compartilhado entre threads:
+    - no máximo uma chamada a cada `intervalo_s` segundos (plano gratuito: 5/min)
+    - em resposta de limite, espera com backoff exponencial + jitter e tenta de novo
+    """
+    nome = "alpha_vantage"
+
+    def __init__(self, api_key, intervalo_s=None, tentativas=4, backoff_s=15.0):
+        self.api_key = api_key
+        self.intervalo_s = float(intervalo_s if intervalo_s is not None
+                                 else os.getenv("ALPHAVANTAGE_INTERVALO_S", "12"))
+        self.tentativas = tentativas
+        self.backoff_s = backoff_s
+        self._lock = threading.Lock()
+        self._ultima_chamada = 0.0
+
+    def _aguardar_vez(self):
+        with self._lock:
+            espera = self._ultima_chamada + self.intervalo_s - time.monotonic()
+            if espera > 0:
+                time.sleep(espera)
+            self._ultima_chamada = time.monotonic()
+
+    def _chamar(self, ticker, outputsize):
+        from alpha_vantage.timeseries import TimeSeries
+
+        self._aguardar_vez()
+        try:
+            ts = TimeSeries(key=self.api_key, output_format='pandas')
+            data, _ = ts.get_daily(symbol=ticker, outputsize=outputsize)
+            return data
+        except ValueError as e:
+            texto = str(e).lower()
+            if "frequency" in texto or "rate limit" in texto or "premium" in texto:
+                raise LimiteRequisicoes(str(e))
+            raise
+
+    def baixar(self, ticker, inicio=None):
+        if not self.api_key:
+            raise ValueError("ALPHAVANTAGE_API_KEY não definida.")
+
+        # compact = últimos 100 pregões; suficiente para atualizações incrementais
+        outputsize = "compact"
+        if inicio is None or pd.Timestamp(inicio) < pd.Timestamp.today() - pd.Timedelta(days=140):
+            outputsize = "full"
+
+        for tentativa in range(self.tentativas):
+            try:
+                data = self._chamar(ticker, outputsize)
+                break
+            except LimiteRequisicoes:
+                if tentativa == self.tentativas - 1:
+                    raise
+                espera = self.backoff_s * (2 ** tentativa) + random.uniform(0, 1)
+                print(f"⏳ Limite da Alpha Vantage para {ticker}; nova tentativa em {espera:.0f}s...")
+                time.sleep(espera)
+
+        data = data.rename(columns={
+            "1. open": "Open",
+            "2. high": "High",
+            "3. low": "Low",
+            "4. close": "Close",
+            "5. volume": "Volume"
+        })
+        return _filtrar_apos(padronizar(data.reset_index()), inicio)
+
+
+class ProvedorMock:
+    nome = "mock"
+
+    def baixar(self, ticker, inicio=None):
+        return pd.DataFrame({
+            'Date': pd.date_range(end=pd.Timestamp.today().normalize(), periods=10),
+            'Open': range(10),
+            'High': range(10),
+            'Low': range(10),
+            'Close': range(10),
+            'Volume': range(10)
+        })
+
+
+class ProvedorFixture:
+    """Lê <diretorio>/<TICKER>.parquet ou .csv; substitui o yfinance em testes e execuções offline."""
+    nome = "fixture"
+
+    def __init__(self, diretorio):
+        self.diretorio = diretorio
+
+    def baixar(self, ticker, inicio=None):
+        base = os.path.join(self.diretorio, ticker)
+        if os.path.exists(base + ".parquet"):
+            df = pd.read_parquet(base + ".parquet")
+        elif os.path.exists(base + ".csv"):
+            df = pd.read_csv(base + ".csv")
+        else:
+            raise FileNotFoundError(f"Fixture de {ticker} não encontrada em {self.diretorio}.")
+        return _filtrar_apos(padronizar(df), inicio)
+
+
+def provedores_padrao():
+    """yfinance e, se houver chave, Alpha Vantage como fallback (mesma ordem do script original)."""
+    provedores = [ProvedorYFinance()]
+    api_key = os.getenv("ALPHAVANTAGE_API_KEY")
+    if api_key:
+        provedores.append(ProvedorAlphaVantage(api_key))
+    else:
+        print("⚠ ALPHAVANTAGE_API_KEY não definida, pulando Alpha Vantage.")
+    return provedores
@@ -232,7 +232,12 @@ echo "🐳 Construindo nova imagem Docker (tag: lstm-app)…"
 docker build -t lstm-app .
 
 echo "🐳 Rodando container Docker (lstm-app-container na porta 80)…"
-docker run -d --name lstm-app-container -p 80:80 lstm-app
+# A API envia a latência por rota ao agente de métricas do host (push_metrics.py) via UDP na bridge do Docker
+METRICAS_UDP_HOST="${METRICAS_UDP_HOST:-172.17.0.1}"
+METRICAS_UDP_PORTA="${METRICAS_UDP_PORTA:-8125}"
+docker run -d --name lstm-app-container -p 80:80 \
+  -e METRICAS_UDP_DESTINO="$METRICAS_UDP_HOST:$METRICAS_UDP_PORTA" \
+  lstm-app
 
 echo "✅ FULL DEPLOY da aplicação concluído com sucesso."
 
@@ -241,43 +246,43 @@ echo "✅ FULL DEPLOY da aplicação concluído com sucesso."
 # ----------------------------------------------------
 echo "🚀 Configurando envio automático de métricas customizadas para o CloudWatch..."
 
-# 20.1) Instalar AWS CLI (caso ainda não esteja)
-if ! command -v aws &>/dev/null; then
-  echo "📦 Instalando awscli via yum..."
-  sudo yum install -y awscli
-else
-  echo "✅ awscli já instalado."
-fi
-
-# 20.2) Instalar cronie (para suportar crontab)
-if ! command -v crontab &>/dev/null; then
-  echo "📦 Instalando cronie (para suportar crontab)..."
-  sudo yum install -y cronie
-else
-  echo "✅ cronie (crontab) já instalado."
-fi
-
-# 20.3) Garantir que o script push_metrics.py está executável
+# 20.1) Garantir que o script push_metrics.py existe
 METRICS_SCRIPT="$PROJECT_DIR/push_metrics.py"
-if [ -f "$METRICS_SCRIPT" ]; then
-  echo "🔧 Garantindo permissão de execução para $METRICS_SCRIPT..."
-  sudo chmod +x "$METRICS_SCRIPT"
-else
+if [ ! -f "$METRICS_SCRIPT" ]; then
   echo "❌ ERRO: $METRICS_SCRIPT não encontrado. Verifique o caminho."
   deactivate
   exit 1
 fi
 
-# 20.4) Executa uma vez para enviar métricas imediatamente
-echo "🚀 Executando push_metrics.py pela primeira vez..."
-python3 "$METRICS_SCRIPT" || echo "⚠️ Aviso: falha ao executar $METRICS_SCRIPT agora."
+# 20.2) Remover o agendamento antigo via cron (o agente agora roda continuamente)
+if command -v crontab &>/dev/null && crontab -l -u ec2-user 2>/dev/null | grep -qF "$METRICS_SCRIPT"; then
+  echo "🧹 Removendo agendamento antigo do push_metrics.py no cron..."
+  crontab -l -u ec2-user 2>/dev/null | grep -vF "$METRICS_SCRIPT" | crontab -u ec2-user -
+fi
+
+# 20.3) Service unit do agente de métricas (amostra a cada 10 s, envia a cada 60 s)
+echo "🛠️  Configurando o service unit do agente de métricas em systemd…"
+sudo tee /etc/systemd/system/push-metrics.service > /dev/null << EOF
+[Unit]
+Description=Agente de metricas customizadas (CloudWatch)
+After=network.target docker.service
+
+[Service]
+Type=simple
+Environment=AWS_DEFAULT_REGION=${AWS_DEFAULT_REGION:-us-east-1}
+ExecStart=$VENV_DIR/bin/python $METRICS_SCRIPT --udp-host $METRICAS_UDP_HOST --udp-porta $METRICAS_UDP_PORTA
+Restart=on-failure
+RestartSec=5
+
+[Install]
+WantedBy=multi-user.target
+EOF
 
-# 20.5) Agendar no cron para rodar a cada 5 minutos (se ainda não estiver agendado)
-CRON_ENTRY="*/5 * * * * $METRICS_SCRIPT >> $PROJECT_DIR/push_metrics.log 2>&1"
-( crontab -l -u ec2-user 2>/dev/null | grep -F "$METRICS_SCRIPT" ) \
-  || ( crontab -l -u ec2-user 2>/dev/null; echo "$CRON_ENTRY" ) | crontab -u ec2-user -
+sudo systemctl daemon-reload
+sudo systemctl enable push-metrics.service
+sudo systemctl restart push-metrics.service
 
-echo "✅ push_metrics.py agendado via cron (a cada 5 minutos)."
+echo "✅ Agente de métricas (push-metrics.service) habilitado e iniciado."
 
 # ----------------------------------------------------
 # 21) Desativar o venv
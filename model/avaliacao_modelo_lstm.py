@@ -1,21 +1,29 @@
 import numpy as np
-import pandas as pd
 from sklearn.preprocessing import MinMaxScaler
 from tensorflow.keras.models import load_model
 import boto3
 import os
+import sys
 from dotenv import load_dotenv
-import io
-from sklearn.metrics import mean_absolute_error, mean_squared_error
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+from data import dataset
+from model.backtest import ConfigBacktest, avaliar_serie, backtest_walk_forward
 
 # Carrega variáveis do .env
 load_dotenv()
 
 # Parâmetros
+ATIVO = "AAPL"
 BUCKET = "bdadostchallengebruna"
 ARQUIVO_S3 = "acoes/AAPL_fechamento.parquet"
 MODELO_LOCAL = "model/modelo_lstm.keras"
 MODELO_S3 = "modelos/modelo_lstm.keras"
+# Janelas previstas por vez: a memória de pico não cresce com o tamanho do histórico
+TAMANHO_BLOCO = int(os.getenv("AVALIACAO_BLOCO", "4096"))
+FOLDS = int(os.getenv("AVALIACAO_FOLDS", "5"))
 
 try:
     aws_access_key = os.getenv("AWS_ACCESS_KEY_ID")
@@ -34,9 +42,12 @@ try:
         region_name=aws_region
     )
 
+    # Lê só Date/Close direto do S3, sem carregar o objeto inteiro em memória
     print("☁️ Lendo dados do S3...")
-    obj = s3.get_object(Bucket=BUCKET, Key=ARQUIVO_S3)
-    df = pd.read_parquet(io.BytesIO(obj['Body'].read()))
+    if dataset.ultima_data_s3(ATIVO, BUCKET) is not None:
+        df = dataset.ler_precos_s3(ATIVO, BUCKET, colunas=["Date", "Close"])
+    else:
+        df = dataset.ler_objeto_s3(BUCKET, ARQUIVO_S3, colunas=["Date", "Close"])
 
     if df.empty:
         raise ValueError("❌ O DataFrame lido do S3 está vazio.")
@@ -48,17 +59,7 @@ try:
     print("🔄 Normalizando dados...")
     df = df[['Close']].dropna()
     scaler = MinMaxScaler()
-    scaled_data = scaler.fit_transform(df)
-
-    def criar_dataset(dataset, look_back=60):
-        X, y = [], []
-        for i in range(look_back, len(dataset)):
-            X.append(dataset[i-look_back:i, 0])
-            y.append(dataset[i, 0])
-        return np.array(X), np.array(y)
-
-    X, y = criar_dataset(scaled_data)
-    X = np.reshape(X, (X.shape[0], X.shape[1], 1))
+    scaled_data = scaler.fit_transform(df).astype(np.float32)
 
 except Exception as e:
     raise RuntimeError(f"Erro no pré-processamento dos dados: {e}")
@@ -75,18 +76,26 @@ try:
 
     print("📊 Avaliando modelo com dados do S3...")
     model = load_model(MODELO_LOCAL)
-    previsoes = model.predict(X)
-    previsoes = scaler.inverse_transform(previsoes)
-    y_true = scaler.inverse_transform(y.reshape(-1, 1))
+    # A janela vem do próprio modelo (o treino usa 30; a avaliação antiga montava janelas de 60)
+    janela = int(model.input_shape[1])
+
+    def prever(X):
+        return model.predict(X, verbose=0).reshape(-1)
 
-    mae = mean_absolute_error(y_true, previsoes)
-    rmse = np.sqrt(mean_squared_error(y_true, previsoes))
-    mape = np.mean(np.abs((y_true - previsoes) / y_true)) * 100
+    metricas = avaliar_serie(prever, scaled_data, scaler, janela, tamanho_bloco=TAMANHO_BLOCO).resultado()
 
     print("\n📈 Avaliação do Modelo:")
-    print(f"MAE : {mae:.4f}")
-    print(f"RMSE: {rmse:.4f}")
-    print(f"MAPE: {mape:.2f}%")
+    print(f"MAE : {metricas['mae']:.4f}")
+    print(f"RMSE: {metricas['rmse']:.4f}")
+    print(f"MAPE: {metricas['mape']:.2f}%")
+    print(f"Acurácia direcional (alta/queda/estável): {metricas['acuracia_direcional'] * 100:.1f}%")
+
+    config = ConfigBacktest(janela=janela, folds=FOLDS, tamanho_bloco=TAMANHO_BLOCO)
+    walk_forward = backtest_walk_forward(scaled_data, scaler, prever, config)
+    print(f"\n🔁 Walk-forward ({FOLDS} folds nos últimos {config.fracao_teste:.0%} da série):")
+    for fold in walk_forward["folds"]:
+        print(f"  fold {fold['fold']}: n={fold['n']} MAE={fold['mae']:.4f} RMSE={fold['rmse']:.4f} "
+              f"direção={fold['acuracia_direcional'] * 100:.1f}%")
 
 except FileNotFoundError as e:
     raise RuntimeError(f"Erro durante a avaliação do modelo: {e}")
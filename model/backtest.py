@@ -0,0 +1,258 @@
+"""
+Backtest do modelo LSTM em blocos, com métricas acumuladas incrementalmente.
+
+1) As janelas são geradas em blocos de tamanho fixo (utils.janelas.gerar_lotes): só um
+   bloco (tamanho_bloco, janela, 1) existe em memória por vez, qualquer que seja o histórico
+2) MAE/RMSE/MAPE e acurácia direcional são somas acumuladas (MetricasIncrementais),
+   combináveis entre blocos, folds e tickers
+3) Walk-forward / rolling-origin: o período de teste é dividido em folds consecutivos;
+   com `treinar`, o modelo é reajustado só com os dados anteriores à origem de cada fold
+4) Vários tickers em paralelo com ProcessPoolExecutor (um modelo por processo)
+
+Uso (na raiz do projeto):
+    python model/backtest.py --tickers AAPL MSFT --folds 5 --workers 4
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+from app.preprocessamento import tendencias_previstas
+from utils.janelas import gerar_lotes
+
+ROTULOS = ("alta", "queda", "estável")
+_INDICE_ROTULO = {rotulo: i for i, rotulo in enumerate(ROTULOS)}
+
+
+class MetricasIncrementais:
+    """
+    Somas acumuladas para MAE, RMSE, MAPE e acurácia direcional (em preço).
+    A direção usa os mesmos rótulos do /prever (`tendencias_previstas`): previsão x último
+    preço da janela contra valor real x último preço.
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.soma_abs = 0.0
+        self.soma_quad = 0.0
+        self.soma_pct = 0.0
+        self.n_pct = 0
+        self.confusao = np.zeros((len(ROTULOS), len(ROTULOS)), dtype=np.int64)
+
+    def atualizar(self, previsto, real, ultimo):
+        previsto = np.asarray(previsto, dtype=np.float64).ravel()
+        real = np.asarray(real, dtype=np.float64).ravel()
+        ultimo = np.asarray(ultimo, dtype=np.float64).ravel()
+        erro = previsto - real
+        self.n += len(erro)
+        self.soma_abs += float(np.abs(erro).sum())
+        self.soma_quad += float(np.square(erro).sum())
+        nao_zero = real != 0
+        self.soma_pct += float(np.abs(erro[nao_zero] / real[nao_zero]).sum())
+        self.n_pct += int(nao_zero.sum())
+
+        idx_prev = np.fromiter((_INDICE_ROTULO[r] for r in tendencias_previstas(previsto, ultimo)),
+                               dtype=np.intp, count=len(previsto))
+        idx_real = np.fromiter((_INDICE_ROTULO[r] for r in tendencias_previstas(real, ultimo)),
+                               dtype=np.intp, count=len(real))
+        np.add.at(self.confusao, (idx_real, idx_prev), 1)
+
+    def combinar(self, outra: "MetricasIncrementais") -> "MetricasIncrementais":
+        self.n += outra.n
+        self.soma_abs += outra.soma_abs
+        self.soma_quad += outra.soma_quad
+        self.soma_pct += outra.soma_pct
+        self.n_pct += outra.n_pct
+        self.confusao += outra.confusao
+        return self
+
+    def resultado(self) -> dict:
+        if self.n == 0:
+            return {"n": 0}
+        acertos = np.diag(self.confusao)
+        por_rotulo = {}
+        for i, rotulo in enumerate(ROTULOS):
+            reais = int(self.confusao[i].sum())
+            previstos = int(self.confusao[:, i].sum())
+            por_rotulo[rotulo] = {
+                "reais": reais,
+                "previstos": previstos,
+                "recall": float(acertos[i] / reais) if reais else None,
+                "precisao": float(acertos[i] / previstos) if previstos else None,
+            }
+        return {
+            "n": self.n,
+            "mae": self.soma_abs / self.n,
+            "rmse": float(np.sqrt(self.soma_quad / self.n)),
+            "mape": self.soma_pct / self.n_pct * 100 if self.n_pct else None,
+            "acuracia_direcional": float(acertos.sum() / self.n),
+            "por_rotulo": por_rotulo,
+            "confusao": self.confusao.tolist(),
+        }
+
+
+def avaliar_serie(prever: Callable[[np.ndarray], np.ndarray], serie_escalada, scaler, janela: int,
+                  tamanho_bloco: int = 4096, metricas: Optional[MetricasIncrementais] = None):
+    """
+    Avalia previsões de um passo sobre toda a série escalada, bloco a bloco.
+    `prever` recebe (n, janela, 1) float32 e devolve n previsões normalizadas.
+    """
+    metricas = metricas or MetricasIncrementais()
+    for X, y in gerar_lotes(serie_escalada, janela, tamanho_lote=tamanho_bloco):
+        pred = np.asarray(prever(X)).reshape(-1, 1)
+        metricas.atualizar(
+            scaler.inverse_transform(pred),
+            scaler.inverse_transform(y.reshape(-1, 1)),
+            scaler.inverse_transform(X[:, -1, :]),
+        )
+    return metricas
+
+
+@dataclass
+class ConfigBacktest:
+    janela: int = 30
+    folds: int = 5
+    # Fração final da série usada como período de teste (dividido em `folds`)
+    fracao_teste: float = 0.2
+    tamanho_bloco: int = 4096
+
+
+def origens_walk_forward(n_pontos: int, config: ConfigBacktest) -> List[tuple]:
+    """Intervalos [inicio, fim) de alvos de cada fold, consecutivos no período de teste."""
+    inicio_teste = max(config.janela, int(n_pontos * (1 - config.fracao_teste)))
+    limites = np.linspace(inicio_teste, n_pontos, config.folds + 1).astype(int)
+    return [(int(a), int(b)) for a, b in zip(limites[:-1], limites[1:]) if b > a]
+
+
+def backtest_walk_forward(serie_escalada, scaler, prever, config: ConfigBacktest,
+                          treinar: Optional[Callable[[np.ndarray], Callable]] = None) -> dict:
+    """
+    Rolling-origin: cada fold avalia os alvos [inicio, fim) usando só janelas que
+    terminam antes de cada alvo. Com `treinar(serie_ate_origem) -> prever`, o modelo
+    é reajustado na origem de cada fold; sem ele, o mesmo modelo avalia todos os folds.
+    """
+    serie = np.asarray(serie_escalada, dtype=np.float32).reshape(-1)
+    total = MetricasIncrementais()
+    folds = []
+    for k, (inicio, fim) in enumerate(origens_walk_forward(len(serie), config)):
+        preditor = treinar(serie[:inicio]) if treinar is not None else prever
+        t0 = time.perf_counter()
+        # serie[inicio - janela:fim] gera exatamente os alvos inicio..fim-1
+        metricas = avaliar_serie(preditor, serie[inicio - config.janela:fim], scaler,
+                                 config.janela, config.tamanho_bloco)
+        total.combinar(metricas)
+        folds.append({"fold": k, "inicio": inicio, "fim": fim,
+                      "tempo_s": time.perf_counter() - t0, **metricas.resultado()})
+    return {"folds": folds, "total": total.resultado()}
+
+
+# ───────────────────────────────────────────────────────
+# Backtest por ticker (um processo por ticker)
+# ───────────────────────────────────────────────────────
+def carregar_preditor(diretorio: str):
+    """
+    (prever, scaler, janela) a partir dos artefatos de `diretorio`: usa modelo_lstm.npz
+    (NumPy, sem TensorFlow) quando existir; senão modelo_lstm.keras + scaler.gz.
+    """
+    caminho_npz = os.path.join(diretorio, "modelo_lstm.npz")
+    if os.path.isfile(caminho_npz):
+        from app.lstm_numpy import carregar_npz
+
+        lstm, scaler, janela = carregar_npz(caminho_npz)
+        return lstm.prever, scaler, janela
+
+    import joblib
+    from tensorflow.keras.models import load_model
+
+    modelo = load_model(os.path.join(diretorio, "modelo_lstm.keras"))
+    scaler = joblib.load(os.path.join(diretorio, "scaler.gz"))
+    return (lambda X: modelo.predict(X, verbose=0).reshape(-1)), scaler, int(modelo.input_shape[1])
+
+
+def _diretorio_ticker(dir_modelos: str, ticker: str, ticker_padrao: str) -> str:
+    return dir_modelos if ticker == ticker_padrao else os.path.join(dir_modelos, ticker)
+
+
+def backtest_ticker(ticker: str, dir_modelos: str, config: ConfigBacktest,
+                    ticker_padrao: str = "AAPL", bucket: Optional[str] = None) -> dict:
+    """Carrega preços e artefatos do ticker e roda o walk-forward. Executa dentro de um worker."""
+    from data import dataset, features
+
+    inicio = time.perf_counter()
+    prever, scaler, janela = carregar_preditor(_diretorio_ticker(dir_modelos, ticker, ticker_padrao))
+    config = ConfigBacktest(**{**asdict(config), "janela": janela})
+    if bucket:
+        df = dataset.ler_precos_s3(ticker, bucket, colunas=["Date", "Close"])
+    else:
+        df = features.ler_colunas(ticker, ["Close"])
+    # Mesmo scaler do treino/serviço: as métricas refletem o que a API devolveria
+    serie = scaler.transform(df[["Close"]].dropna()).astype(np.float32)
+    resultado = backtest_walk_forward(serie, scaler, prever, config)
+    resultado.update(ticker=ticker, pontos=len(serie), tempo_s=time.perf_counter() - inicio)
+    return resultado
+
+
+def backtest_tickers(tickers: List[str], dir_modelos: str, config: ConfigBacktest,
+                     max_workers: Optional[int] = None, **kwargs) -> Dict[str, dict]:
+    resultados = {}
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futuros = {executor.submit(backtest_ticker, t, dir_modelos, config, **kwargs): t for t in tickers}
+        for futuro in as_completed(futuros):
+            ticker = futuros[futuro]
+            try:
+                resultados[ticker] = futuro.result()
+                print(f"✅ {ticker}: backtest concluído em {resultados[ticker]['tempo_s']:.1f}s")
+            except Exception as e:
+                print(f"❌ {ticker}: erro no backtest: {e}")
+                resultados[ticker] = {"ticker": ticker, "erro": str(e)}
+    return resultados
+
+
+def imprimir_resultados(resultados: Dict[str, dict]):
+    print(f"\n{'ticker':<8} {'n':>7} {'MAE':>9} {'RMSE':>9} {'MAPE %':>8} {'direção':>8}")
+    for ticker, r in sorted(resultados.items()):
+        if "erro" in r:
+            print(f"{ticker:<8} erro: {r['erro']}")
+            continue
+        t = r["total"]
+        mape = f"{t['mape']:.2f}" if t.get("mape") is not None else "-"
+        print(f"{ticker:<8} {t['n']:>7} {t['mae']:>9.4f} {t['rmse']:>9.4f} {mape:>8} "
+              f"{t['acuracia_direcional'] * 100:>7.1f}%")
+
+
+def main():
+    import json
+
+    parser = argparse.ArgumentParser(description="Backtest walk-forward do modelo LSTM.")
+    parser.add_argument("--tickers", nargs="+", default=[os.getenv("TICKER_PADRAO", "AAPL")])
+    parser.add_argument("--ticker-padrao", default=os.getenv("TICKER_PADRAO", "AAPL"),
+                        help="Ticker cujos artefatos ficam direto em --modelos (demais em <modelos>/<TICKER>/).")
+    parser.add_argument("--modelos", default="model", help="Diretório dos artefatos.")
+    parser.add_argument("--bucket", default=None, help="Lê os preços do dataset no S3 em vez do local.")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--fracao-teste", type=float, default=0.2)
+    parser.add_argument("--bloco", type=int, default=4096, help="Janelas por bloco de previsão.")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--saida", help="Grava os resultados completos (por fold) em JSON.")
+    args = parser.parse_args()
+
+    config = ConfigBacktest(folds=args.folds, fracao_teste=args.fracao_teste, tamanho_bloco=args.bloco)
+    resultados = backtest_tickers(args.tickers, args.modelos, config, args.workers,
+                                  ticker_padrao=args.ticker_padrao, bucket=args.bucket)
+    imprimir_resultados(resultados)
+    if args.saida:
+        with open(args.saida, "w") as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+        print(f"💾 Resultados gravados em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+"""
+Busca de hiperparâmetros do LSTM em paralelo (CPU), com poda de trials ruins.
+
+1) O processo pai lê os fechamentos uma única vez, ajusta o MinMaxScaler (como o treino completo)
+   e grava a série escalada em float32 num .npy; cada worker a abre com mmap (sem reler Parquet)
+2) Trials = grade (ou amostra aleatória da grade) de janela x unidades x batch x taxa de aprendizado,
+   distribuídos num ProcessPoolExecutor (spawn: TensorFlow não sobrevive a fork); as threads
+   intra-op do TF são divididas entre os workers
+3) Split por trial: últimos 20% das janelas = teste (só reportado); dos demais, os últimos 20% =
+   validação, usada para early stopping e poda
+4) Poda pela mediana: a partir de --poda-apos épocas, um trial cuja val_loss está acima da mediana
+   dos demais trials na mesma época é interrompido (histórico compartilhado via Manager)
+5) Grava <saida>/resultados.csv e .json (config, val_loss, MAE de teste, épocas, tempo por trial) e os
+   artefatos do melhor trial (modelo_lstm.keras, modelo_lstm.npz, scaler.gz) em <saida>/melhor/
+
+Uso (na raiz do projeto):
+    python model/busca_hiperparametros.py --janelas 20 30 60 --unidades 32 50 64 \\
+        --batch 16 32 64 --lr 1e-3 5e-4 --workers 4 [--amostras 12] [--epocas 20]
+"""
+import argparse
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import random
+import shutil
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+SERIE_NPY = "serie_escalada.npy"
+
+
+@dataclass
+class Trial:
+    id: int
+    janela: int
+    unidades: int
+    batch_size: int
+    taxa_aprendizado: float
+
+
+def gerar_trials(janelas, unidades, batches, taxas, amostras: Optional[int] = None, seed: int = 0) -> List[Trial]:
+    grade = list(itertools.product(janelas, unidades, batches, taxas))
+    if amostras and amostras < len(grade):
+        grade = random.Random(seed).sample(grade, amostras)
+    return [Trial(k, *combinacao) for k, combinacao in enumerate(grade)]
+
+
+def preparar_serie(df, diretorio: str):
+    """Ajusta o scaler nos fechamentos e grava a série escalada (float32) para os workers mapearem."""
+    from sklearn.preprocessing import MinMaxScaler
+
+    scaler = MinMaxScaler()
+    serie = scaler.fit_transform(df[["Close"]].dropna())[:, 0].astype(np.float32)
+    np.save(os.path.join(diretorio, SERIE_NPY), serie)
+    return scaler, len(serie)
+
+
+# ───────────────────────────────────────────────────────
+# Worker (um processo por trial em andamento)
+# ───────────────────────────────────────────────────────
+_contexto: Dict = {}
+
+
+def iniciar_worker(diretorio: str, scaler, threads: int, historico_poda):
+    """Roda uma vez por processo: mapeia a série e ajusta as threads do TensorFlow."""
+    from model.treino_modelo import ConfigTreino, configurar_runtime
+
+    configurar_runtime(ConfigTreino(intra_op_threads=threads, inter_op_threads=1))
+    _contexto.update(
+        serie=np.load(os.path.join(diretorio, SERIE_NPY), mmap_mode="r"),
+        diretorio=diretorio,
+        scaler=scaler,
+        historico_poda=historico_poda,
+    )
+
+
+def criar_poda(trial_id: int, historico_poda, apos_epocas: int, min_trials: int):
+    from tensorflow import keras
+
+    class PodaMediana(keras.callbacks.Callback):
+        """Interrompe o treino se a val_loss da época estiver acima da mediana dos outros trials."""
+
+        def __init__(self):
+            super().__init__()
+            self.podado = False
+
+        def on_epoch_end(self, epoch, logs=None):
+            perda = float(logs["val_loss"])
+            historico_poda[(trial_id, epoch)] = perda
+            if epoch + 1 < apos_epocas:
+                return
+            outros = [v for (t, e), v in historico_poda.items() if e == epoch and t != trial_id]
+            if len(outros) >= min_trials and perda > statistics.median(outros):
+                self.podado = True
+                self.model.stop_training = True
+
+    return PodaMediana()
+
+
+def executar_trial(trial: Trial, epocas: int, paciencia: int, poda_apos: int, poda_min_trials: int) -> dict:
+    from tensorflow import keras
+
+    from model.treino_modelo import ConfigTreino, MedidorThroughput, avaliar, criar_datasets, criar_modelo
+    from utils.janelas import dataset_tf
+
+    inicio = time.perf_counter()
+    serie, scaler = _contexto["serie"], _contexto["scaler"]
+
+    # Teste = últimos 20% das janelas; a busca só enxerga o trecho anterior
+    n_janelas = len(serie) - trial.janela
+    n_treino = n_janelas - math.ceil(0.2 * n_janelas)
+    config = ConfigTreino(janela=trial.janela, unidades=trial.unidades, taxa_aprendizado=trial.taxa_aprendizado,
+                          epocas=epocas, batch_size=trial.batch_size)
+    ds_treino, ds_val, n_fit, _ = criar_datasets(serie[:n_treino + trial.janela], config)
+    ds_teste = dataset_tf(serie[n_treino:], trial.janela, tamanho_lote=config.batch_size)
+    y_teste = np.asarray(serie[n_treino + trial.janela:])
+
+    modelo = criar_modelo(config.janela, config.unidades, config.taxa_aprendizado)
+    poda = criar_poda(trial.id, _contexto["historico_poda"], poda_apos, poda_min_trials)
+    medidor = MedidorThroughput(n_fit)
+    parada = keras.callbacks.EarlyStopping(monitor="val_loss", patience=paciencia, restore_best_weights=True)
+    historico = modelo.fit(ds_treino, validation_data=ds_val, epochs=epocas,
+                           callbacks=[parada, poda, medidor], verbose=0)
+
+    resultado = {
+        **asdict(trial),
+        "val_loss": float(min(historico.history["val_loss"])),
+        "epocas": len(historico.history["val_loss"]),
+        "podado": poda.podado,
+        "parada_antecipada": parada.stopped_epoch > 0,
+        "tempo_epoca_s": float(np.mean([h["tempo_s"] for h in medidor.historico])),
+    }
+    if not poda.podado:
+        metricas = avaliar(modelo, scaler, ds_teste, y_teste)
+        resultado.update(mae_teste=metricas["mae_preco"], rmse_teste=metricas["rmse_preco"])
+        destino = os.path.join(_contexto["diretorio"], "trials", str(trial.id))
+        os.makedirs(destino, exist_ok=True)
+        modelo.save(os.path.join(destino, "modelo_lstm.keras"))
+    resultado["tempo_s"] = time.perf_counter() - inicio
+    return resultado
+
+
+# ───────────────────────────────────────────────────────
+# Driver
+# ───────────────────────────────────────────────────────
+def buscar(df, trials: List[Trial], saida: str, workers: int, epocas: int = 20, paciencia: int = 3,
+           poda_apos: int = 3, poda_min_trials: int = 3) -> List[dict]:
+    import joblib
+
+    os.makedirs(saida, exist_ok=True)
+    scaler, n_pontos = preparar_serie(df, saida)
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    print(f"🔎 {len(trials)} trials em {workers} processos ({threads} threads TF cada), série de {n_pontos} pontos.")
+
+    contexto_mp = multiprocessing.get_context("spawn")
+    resultados = []
+    with contexto_mp.Manager() as gerente:
+        historico_poda = gerente.dict()
+        with ProcessPoolExecutor(max_workers=workers, mp_context=contexto_mp, initializer=iniciar_worker,
+                                 initargs=(saida, scaler, threads, historico_poda)) as executor:
+            futuros = {executor.submit(executar_trial, t, epocas, paciencia, poda_apos, poda_min_trials): t
+                       for t in trials}
+            for futuro in as_completed(futuros):
+                trial = futuros[futuro]
+                try:
+                    r = futuro.result()
+                except Exception as e:
+                    print(f"❌ Trial {trial.id} falhou: {e}")
+                    resultados.append({**asdict(trial), "erro": str(e)})
+                    continue
+                resultados.append(r)
+                estado = "✂️ podado" if r["podado"] else f"MAE US$ {r['mae_teste']:.4f}"
+                print(f"✅ Trial {r['id']} ({r['janela']}/{r['unidades']}/{r['batch_size']}/{r['taxa_aprendizado']:g}): "
+                      f"val_loss {r['val_loss']:.5f}, {r['epocas']} épocas, {r['tempo_s']:.1f}s, {estado}")
+
+    completos = [r for r in resultados if "erro" not in r and not r["podado"]]
+    if completos:
+        melhor = min(completos, key=lambda r: r["val_loss"])
+        salvar_melhor(melhor, scaler, saida)
+    joblib.dump(scaler, os.path.join(saida, "scaler.gz"))
+    shutil.rmtree(os.path.join(saida, "trials"), ignore_errors=True)
+    os.remove(os.path.join(saida, SERIE_NPY))
+    return resultados
+
+
+def salvar_melhor(melhor: dict, scaler, saida: str):
+    """Copia o modelo do melhor trial (menor val_loss) e exporta scaler e pesos NumPy ao lado."""
+    import joblib
+    from tensorflow.keras.models import load_model
+
+    from app.lstm_numpy import LSTMNumpy, exportar_npz
+
+    destino = os.path.join(saida, "melhor")
+    os.makedirs(destino, exist_ok=True)
+    caminho = os.path.join(destino, "modelo_lstm.keras")
+    shutil.copyfile(os.path.join(saida, "trials", str(melhor["id"]), "modelo_lstm.keras"), caminho)
+    joblib.dump(scaler, os.path.join(destino, "scaler.gz"))
+    exportar_npz(os.path.join(destino, "modelo_lstm.npz"), LSTMNumpy.de_modelo_keras(load_model(caminho)),
+                 scaler, melhor["janela"])
+    with open(os.path.join(destino, "metadados.json"), "w") as f:
+        json.dump({"versao": time.strftime("%Y%m%dT%H%M%S"), "modo": "busca", "trial": melhor},
+                  f, indent=2, ensure_ascii=False)
+    print(f"🏆 Melhor trial {melhor['id']} salvo em {destino} (MAE de teste US$ {melhor['mae_teste']:.4f}).")
+
+
+def gravar_resultados(resultados: List[dict], saida: str):
+    import pandas as pd
+
+    tabela = pd.DataFrame(resultados)
+    falhas = [r for r in resultados if "erro" in r]
+    if "val_loss" in tabela.columns:
+        tabela = tabela.sort_values("val_loss", na_position="last")
+    tabela.to_csv(os.path.join(saida, "resultados.csv"), index=False)
+    with open(os.path.join(saida, "resultados.json"), "w") as f:
+        json.dump(resultados, f, indent=2, ensure_ascii=False)
+    if falhas and len(falhas) == len(resultados):
+        detalhes = "; ".join(f"trial {r['id']}: {r['erro']}" for r in falhas)
+        raise RuntimeError(f"❌ Todos os {len(falhas)} trials falharam ({detalhes}). Detalhes em {saida}/resultados.json")
+    colunas = [c for c in ("id", "janela", "unidades", "batch_size", "taxa_aprendizado", "val_loss",
+                           "mae_teste", "epocas", "podado", "tempo_s") if c in tabela.columns]
+    print("\n" + tabela[colunas].to_string(index=False))
+    print(f"💾 Resultados gravados em {saida}/resultados.csv")
+
+
+def main():
+    from data import dataset, features
+
+    parser = argparse.ArgumentParser(description="Busca de hiperparâmetros do LSTM em paralelo.")
+    parser.add_argument("--ticker", default=os.getenv("TICKER_PADRAO", "AAPL"))
+    parser.add_argument("--bucket", default=None, help="Lê os preços do dataset no S3 em vez do local.")
+    parser.add_argument("--janelas", type=int, nargs="+", default=[20, 30, 60])
+    parser.add_argument("--unidades", type=int, nargs="+", default=[32, 50, 64])
+    parser.add_argument("--batch", type=int, nargs="+", default=[16, 32, 64])
+    parser.add_argument("--lr", type=float, nargs="+", default=[1e-3, 5e-4])
+    parser.add_argument("--amostras", type=int, default=None, help="Amostra aleatória da grade (busca aleatória).")
+    parser.add_argument("--epocas", type=int, default=20)
+    parser.add_argument("--paciencia", type=int, default=3, help="Épocas sem melhora na validação (early stopping).")
+    parser.add_argument("--poda-apos", type=int, default=3, help="Época a partir da qual a poda pela mediana atua.")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument("--saida", default=os.path.join("model", "busca"))
+    args = parser.parse_args()
+
+    if args.bucket:
+        df = dataset.ler_precos_s3(args.ticker, args.bucket, colunas=["Date", "Close"])
+    else:
+        df = features.ler_colunas(args.ticker, ["Close"])
+    trials = gerar_trials(args.janelas, args.unidades, args.batch, args.lr, args.amostras)
+    inicio = time.perf_counter()
+    resultados = buscar(df, trials, args.saida, args.workers, args.epocas, args.paciencia, args.poda_apos)
+    gravar_resultados(resultados, args.saida)
+    print(f"⏱️ Busca concluída em {time.perf_counter() - inicio:.1f}s.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Exporta variantes de precisão do modelo servido e só aceita as que mantêm a qualidade.
+
+1) Referência de precisão total: os pesos de modelo_lstm.npz (float32 do Keras) executados
+   em float64 pelo LSTMNumpy
+2) Variantes: float32 (o próprio modelo_lstm.npz servido hoje) e int8 (matrizes quantizadas
+   por coluna, desquantizadas na carga), gravadas como modelo_lstm_<precisao>.npz
+3) Guarda de qualidade: MAE em preço no split de teste do treino (últimos 20% das janelas)
+   não pode passar de MAE_referência x (1 + tolerância); variante reprovada não é gravada, e a
+   gravada por um treino anterior é apagada (não corresponde mais ao modelo e ao scaler atuais)
+4) Relatório: tamanho do artefato, MAE e latência p50/p95 (lotes de 1 e 32) por variante,
+   também gravado em <modelos>/quantizacao.json
+
+model/treino_modelo.py roda a exportação a cada treino. Servir a variante int8: NPZ_PRECISAO=int8
+(app/model_loader.py).
+
+Uso (na raiz do projeto):
+    python model/quantizacao.py [--ticker AAPL] [--modelos model] [--tolerancia 0.01]
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+from app.lstm_numpy import PRECISOES, LSTMNumpy, carregar_npz, exportar_npz
+from model.backtest import avaliar_serie
+
+TOLERANCIA_MAE = float(os.getenv("QUANTIZACAO_TOL_MAE", "0.01"))
+
+
+def serie_teste(serie_escalada, janela: int) -> np.ndarray:
+    """
+    Trecho da série com as janelas de teste do treino: mesmo split de
+    train_test_split(test_size=0.2, shuffle=False) sobre as janelas.
+    """
+    n_janelas = len(serie_escalada) - janela
+    n_treino = n_janelas - math.ceil(0.2 * n_janelas)
+    return np.asarray(serie_escalada[n_treino:], dtype=np.float32)
+
+
+def medir_latencia(prever, janela: int, lote: int, repeticoes: int = 300):
+    X = np.random.default_rng(0).random((lote, janela, 1), dtype=np.float32)
+    prever(X)
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        prever(X)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return float(np.percentile(tempos, 50)), float(np.percentile(tempos, 95))
+
+
+def avaliar_variante(lstm: LSTMNumpy, scaler, serie, janela: int) -> dict:
+    metricas = avaliar_serie(lstm.prever, serie, scaler, janela).resultado()
+    resultado = {"mae": metricas["mae"], "rmse": metricas["rmse"]}
+    for lote in (1, 32):
+        resultado[f"p50_ms_lote{lote}"], resultado[f"p95_ms_lote{lote}"] = medir_latencia(lstm.prever, janela, lote)
+    return resultado
+
+
+def exportar_variantes(caminho_npz: str, serie_precos, tolerancia: float = TOLERANCIA_MAE) -> dict:
+    """
+    Avalia cada precisão contra a referência float64 e grava as aprovadas ao lado de `caminho_npz`.
+    `serie_precos` são os fechamentos do ticker (em preço). Devolve o relatório por variante.
+    """
+    base, scaler, janela = carregar_npz(caminho_npz)
+    serie = serie_teste(scaler.transform(np.asarray(serie_precos, dtype=np.float64).reshape(-1, 1)), janela)
+    pesos = (base.kernel, base.recurrent_kernel, base.bias, base.dense_kernel, base.dense_bias)
+
+    referencia = avaliar_variante(LSTMNumpy(*pesos, dtype=np.float64), scaler, serie, janela)
+    referencia["bytes"] = os.path.getsize(caminho_npz)
+    relatorio = {"referencia_float64": referencia, "tolerancia": tolerancia, "variantes": {}}
+    limite = referencia["mae"] * (1 + tolerancia)
+
+    diretorio = os.path.dirname(os.path.abspath(caminho_npz))
+    for precisao in PRECISOES:
+        destino = caminho_npz if precisao == "float32" else os.path.join(diretorio, f"modelo_lstm_{precisao}.npz")
+        # Grava num temporário: o artefato só é publicado se passar na guarda de qualidade
+        with tempfile.TemporaryDirectory(dir=diretorio) as tmp:
+            candidato = os.path.join(tmp, os.path.basename(destino))
+            exportar_npz(candidato, base, scaler, janela, precisao=precisao)
+            lstm, _, _ = carregar_npz(candidato)
+            resultado = avaliar_variante(lstm, scaler, serie, janela)
+            resultado["bytes"] = os.path.getsize(candidato)
+            resultado["aprovada"] = bool(resultado["mae"] <= limite)
+            if precisao != "float32":
+                if resultado["aprovada"]:
+                    os.replace(candidato, destino)
+                elif os.path.exists(destino):
+                    os.remove(destino)
+        resultado["arquivo"] = destino if resultado["aprovada"] else None
+        relatorio["variantes"][precisao] = resultado
+        if not resultado["aprovada"]:
+            print(f"⚠ Variante {precisao} reprovada: MAE US$ {resultado['mae']:.4f} > limite US$ {limite:.4f}.")
+    return relatorio
+
+
+def gravar_relatorio(relatorio: dict, diretorio: str) -> str:
+    caminho = os.path.join(diretorio, "quantizacao.json")
+    with open(caminho, "w") as f:
+        json.dump(relatorio, f, indent=2, ensure_ascii=False)
+    return caminho
+
+
+def imprimir_relatorio(relatorio: dict):
+    print(f"\n{'variante':<18} {'KiB':>8} {'MAE US$':>10} {'Δ MAE':>8} {'p50 lote1':>10} {'p50 lote32':>11}  status")
+    ref = relatorio["referencia_float64"]
+    linhas = [("referencia_float64", ref)] + list(relatorio["variantes"].items())
+    for nome, r in linhas:
+        delta = (r["mae"] / ref["mae"] - 1) * 100 if ref["mae"] else 0.0
+        status = "" if nome == "referencia_float64" else ("✅" if r["aprovada"] else "❌")
+        print(f"{nome:<18} {r['bytes'] / 1024:>8.1f} {r['mae']:>10.4f} {delta:>+7.2f}% "
+              f"{r['p50_ms_lote1']:>9.3f}ms {r['p50_ms_lote32']:>10.3f}ms  {status}")
+
+
+def main():
+    from data import dataset, features
+
+    parser = argparse.ArgumentParser(description="Exporta variantes float32/int8 com guarda de MAE.")
+    parser.add_argument("--ticker", default=os.getenv("TICKER_PADRAO", "AAPL"))
+    parser.add_argument("--modelos", default="model", help="Diretório com modelo_lstm.npz do ticker.")
+    parser.add_argument("--bucket", default=None, help="Lê os preços do dataset no S3 em vez do local.")
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA_MAE,
+                        help="Aumento relativo máximo do MAE em relação à referência (0.01 = 1%%).")
+    args = parser.parse_args()
+
+    if args.bucket:
+        df = dataset.ler_precos_s3(args.ticker, args.bucket, colunas=["Date", "Close"])
+    else:
+        df = features.ler_colunas(args.ticker, ["Close"])
+    relatorio = exportar_variantes(os.path.join(args.modelos, "modelo_lstm.npz"),
+                                   df["Close"].dropna().to_numpy(), args.tolerancia)
+    imprimir_relatorio(relatorio)
+
+    caminho = gravar_relatorio(relatorio, args.modelos)
+    print(f"💾 Relatório gravado em {caminho}")
+    if not all(r["aprovada"] for r in relatorio["variantes"].values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
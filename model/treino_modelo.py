@@ -1,12 +1,27 @@
+import argparse
+import json
+import math
 import os
+import shutil
+import sys
+import time
+from dataclasses import asdict, dataclass
 import pandas as pd
 import joblib
 import numpy as np
 from sklearn.preprocessing import MinMaxScaler
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_squared_error, mean_absolute_error
+import tensorflow as tf
 from tensorflow import keras
 
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+from app.lstm_numpy import LSTMNumpy, exportar_npz
+from utils.janelas import criar_janelas, dataset_tf
+from data import dataset, features
+
 ATIVO = "AAPL"
 ARQUIVO_LOCAL = f"data/{ATIVO}_fechamento.parquet"
 ARQUIVO_S3 = f"acoes/{ATIVO}_fechamento.parquet"
@@ -14,94 +29,428 @@ BUCKET = os.getenv("BUCKET_NAME", "bdadostchallengebruna")
 
 USE_S3 = os.getenv("USE_S3", "false").lower() == "true"
 
-if USE_S3:
-    import boto3
-
-    AWS_ACCESS_KEY_ID = os.getenv("AWS_ACCESS_KEY_ID")
-    AWS_SECRET_ACCESS_KEY = os.getenv("AWS_SECRET_ACCESS_KEY")
-    AWS_SESSION_TOKEN = os.getenv("AWS_SESSION_TOKEN")
-
-    if not AWS_ACCESS_KEY_ID or not AWS_SECRET_ACCESS_KEY:
-        raise EnvironmentError("❌ Credenciais AWS ausentes ou mal definidas no .env.")
-
-    session = boto3.Session(
-        aws_access_key_id=AWS_ACCESS_KEY_ID,
-        aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
-        aws_session_token=AWS_SESSION_TOKEN
-    )
-    s3 = session.client("s3")
-
-    print("☁️ Lendo dados do S3...")
-    try:
-        obj = s3.get_object(Bucket=BUCKET, Key=ARQUIVO_S3)
-        df = pd.read_parquet(obj['Body'])
-    except Exception as e:
-        raise RuntimeError(f"Erro ao acessar dados do S3: {e}")
-
-else:
-    print("📄 Lendo dados localmente...")
-    if not os.path.exists(ARQUIVO_LOCAL):
-        raise FileNotFoundError(f"Arquivo {ARQUIVO_LOCAL} não encontrado para treinamento.")
-    df = pd.read_parquet(ARQUIVO_LOCAL)
-
-# Verificação básica do dataframe e correções
-if "Date" not in df.columns:
-    raise KeyError("Coluna 'Date' não encontrada no dataframe para treino.")
-
-print(f"✅ Dataframe carregado com {len(df)} linhas.")
-
-df.sort_values(by="Date", inplace=True)
-
-# Garantir que 'Close' é numérico
-df['Close'] = pd.to_numeric(df['Close'], errors='coerce')
-
-# Remover linhas com NaN
-df.dropna(subset=['Close'], inplace=True)
-
-if df.empty:
-    raise ValueError("Dataframe está vazio após remoção de NaNs na coluna 'Close'.")
-
-print(f"✅ Dataframe após limpeza tem {len(df)} linhas.")
-
-# Escalar valores de 'Close'
-scaler = MinMaxScaler()
-df['Close_Scaled'] = scaler.fit_transform(df[['Close']])
-
-# Função para criar sequências para LSTM
-def criar_sequencias(series, janela):
-    X, y = [], []
-    for i in range(len(series) - janela):
-        X.append(series[i:i+janela])
-        y.append(series[i+janela])
-    return np.array(X), np.array(y)
-
-janela = 30
-serie = df['Close_Scaled'].values
-X, y = criar_sequencias(serie, janela)
-X = X.reshape((X.shape[0], X.shape[1], 1))
-
-# Separar dados treino/teste
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, shuffle=False)
-
-# Criar modelo LSTM simples
-model = keras.Sequential([
-    keras.layers.Input(shape=(X_train.shape[1], 1)),
-    keras.layers.LSTM(50, return_sequences=False),
-    keras.layers.Dense(1)
-])
-model.compile(optimizer='adam', loss='mse')
-
-print("🚀 Iniciando treino do modelo...")
-model.fit(X_train, y_train, epochs=10, batch_size=16, verbose=1)
-
-# Avaliar modelo
-pred = model.predict(X_test)
-rmse = np.sqrt(mean_squared_error(y_test, pred))
-mae = mean_absolute_error(y_test, pred)
-print(f"📊 RMSE: {rmse:.4f} | MAE: {mae:.4f}")
-
-# Salvar modelo e scaler
-os.makedirs("model", exist_ok=True)
-model.save("model/modelo_lstm.keras")
-joblib.dump(scaler, "model/scaler.gz")
-print("✅ Modelo e scaler salvos com sucesso.")
+# Artefatos: cópia "atual" em model/ e uma pasta por versão em model/versoes/<versao>/
+DIR_MODELO = "model"
+DIR_VERSOES = os.path.join(DIR_MODELO, "versoes")
+ARQUIVO_METADADOS = "metadados.json"
+
+# Treino incremental
+EPOCAS_INCREMENTAL = int(os.getenv("EPOCAS_INCREMENTAL", "3"))
+LR_INCREMENTAL = float(os.getenv("LR_INCREMENTAL", "1e-4"))
+# Janelas antigas reamostradas por janela nova (evita esquecer o histórico)
+REPLAY_FATOR = float(os.getenv("REPLAY_FATOR", "4"))
+REPLAY_MIN = int(os.getenv("REPLAY_MIN", "256"))
+# expandir: amplia data_min_/data_max_ com os preços novos | manter: mantém o scaler (valores fora de [0, 1])
+ESTRATEGIA_ESCALA = os.getenv("ESTRATEGIA_ESCALA", "expandir").lower()
+# --comparar: fração dos pregões novos fora do ajuste fino, usada para avaliar os dois modos
+RESERVA_COMPARACAO = float(os.getenv("RESERVA_COMPARACAO", "0.2"))
+
+
+@dataclass
+class ConfigTreino:
+    """
+    Parâmetros do pipeline de treino (todos sobrescrevíveis por variável de ambiente TREINO_<CAMPO>).
+    - intra_op_threads/inter_op_threads: 0 deixa o TensorFlow decidir
+    - precisao: float32 ou mixed_bfloat16 (só compensa em CPUs com AVX512-BF16/AMX)
+    - prefetch: -1 = tf.data.AUTOTUNE
+    """
+    janela: int = 30
+    unidades: int = 50
+    taxa_aprendizado: float = 1e-3
+    epocas: int = 10
+    batch_size: int = 64
+    shuffle_buffer: int = 10000
+    cache: bool = True
+    prefetch: int = -1
+    intra_op_threads: int = 0
+    inter_op_threads: int = 0
+    precisao: str = "float32"
+
+    @classmethod
+    def do_ambiente(cls):
+        valores = {}
+        for campo, padrao in asdict(cls()).items():
+            bruto = os.getenv(f"TREINO_{campo.upper()}")
+            if bruto is None:
+                continue
+            if isinstance(padrao, bool):
+                valores[campo] = bruto.lower() in ("1", "true", "sim")
+            else:
+                valores[campo] = type(padrao)(bruto)
+        return cls(**valores)
+
+
+def configurar_runtime(config):
+    """Threads e política de precisão; precisa rodar antes de qualquer operação do TensorFlow."""
+    if config.intra_op_threads:
+        tf.config.threading.set_intra_op_parallelism_threads(config.intra_op_threads)
+    if config.inter_op_threads:
+        tf.config.threading.set_inter_op_parallelism_threads(config.inter_op_threads)
+    keras.mixed_precision.set_global_policy(config.precisao)
+    print(f"⚙️ Config de treino: {asdict(config)}")
+
+
+def criar_datasets(serie, config):
+    """
+    tf.data com o janelamento dentro do pipeline (o tensor (n, janela, 1) nunca é materializado).
+    O split reproduz train_test_split(test_size=0.2, shuffle=False) sobre as janelas;
+    só o treino é embaralhado. Retorna (ds_treino, ds_teste, n_treino, y_teste).
+    """
+    serie = np.asarray(serie, dtype=np.float32)
+    n_janelas = len(serie) - config.janela
+    n_teste = math.ceil(0.2 * n_janelas)
+    n_treino = n_janelas - n_teste
+
+    ds_treino = dataset_tf(serie[:n_treino + config.janela], config.janela)
+    if config.cache:
+        ds_treino = ds_treino.cache()
+    ds_treino = ds_treino.shuffle(config.shuffle_buffer, reshuffle_each_iteration=True)
+    ds_treino = ds_treino.batch(config.batch_size).prefetch(config.prefetch)
+
+    ds_teste = dataset_tf(serie[n_treino:], config.janela, tamanho_lote=config.batch_size)
+    if config.cache:
+        ds_teste = ds_teste.cache()
+    ds_teste = ds_teste.prefetch(config.prefetch)
+
+    return ds_treino, ds_teste, n_treino, serie[n_treino + config.janela:]
+
+
+class MedidorThroughput(keras.callbacks.Callback):
+    """Registra tempo por época e amostras/s para comparar configurações."""
+
+    def __init__(self, n_amostras):
+        super().__init__()
+        self.n_amostras = n_amostras
+        self.historico = []
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._inicio = time.perf_counter()
+
+    def on_epoch_end(self, epoch, logs=None):
+        duracao = time.perf_counter() - self._inicio
+        taxa = self.n_amostras / duracao if duracao > 0 else float("inf")
+        self.historico.append({"epoca": epoch + 1, "tempo_s": duracao, "amostras_s": taxa})
+        print(f"⏱️ Época {epoch + 1}: {duracao:.2f}s | {taxa:,.0f} amostras/s")
+
+
+def carregar_dados():
+    if USE_S3:
+        AWS_ACCESS_KEY_ID = os.getenv("AWS_ACCESS_KEY_ID")
+        AWS_SECRET_ACCESS_KEY = os.getenv("AWS_SECRET_ACCESS_KEY")
+
+        if not AWS_ACCESS_KEY_ID or not AWS_SECRET_ACCESS_KEY:
+            raise EnvironmentError("❌ Credenciais AWS ausentes ou mal definidas no .env.")
+
+        # Lê só Date/Close direto do S3 (dataset particionado; senão, o arquivo legado)
+        print("☁️ Lendo dados do S3...")
+        try:
+            if dataset.ultima_data_s3(ATIVO, BUCKET) is not None:
+                df = dataset.ler_precos_s3(ATIVO, BUCKET, colunas=["Date", "Close"])
+            else:
+                df = dataset.ler_objeto_s3(BUCKET, ARQUIVO_S3, colunas=["Date", "Close"])
+        except Exception as e:
+            raise RuntimeError(f"Erro ao acessar dados do S3: {e}")
+
+    else:
+        print("📄 Lendo dados localmente...")
+        if dataset.arquivos_ticker(ATIVO):
+            # Dataset particionado gerado por data/coleta.py, lido do feature store (mmap)
+            df = features.ler_colunas(ATIVO, ["Date", "Close"])
+        elif os.path.exists(ARQUIVO_LOCAL):
+            df = pd.read_parquet(ARQUIVO_LOCAL)
+        else:
+            raise FileNotFoundError(f"Nenhum dado de {ATIVO} em {dataset.diretorio_ticker(ATIVO)} "
+                                    f"ou {ARQUIVO_LOCAL} para treinamento.")
+
+    # Verificação básica do dataframe e correções
+    if "Date" not in df.columns:
+        raise KeyError("Coluna 'Date' não encontrada no dataframe para treino.")
+
+    print(f"✅ Dataframe carregado com {len(df)} linhas.")
+
+    df = df.sort_values(by="Date").reset_index(drop=True)
+
+    # Garantir que 'Close' é numérico
+    df['Close'] = pd.to_numeric(df['Close'], errors='coerce')
+
+    # Remover linhas com NaN
+    df = df.dropna(subset=['Close']).reset_index(drop=True)
+
+    if df.empty:
+        raise ValueError("Dataframe está vazio após remoção de NaNs na coluna 'Close'.")
+
+    print(f"✅ Dataframe após limpeza tem {len(df)} linhas.")
+    return df
+
+
+def criar_modelo(janela, unidades=50, taxa_aprendizado=1e-3):
+    # Criar modelo LSTM simples (saída em float32 mesmo com política mista)
+    model = keras.Sequential([
+        keras.layers.Input(shape=(janela, 1)),
+        keras.layers.LSTM(unidades, return_sequences=False),
+        keras.layers.Dense(1, dtype="float32")
+    ])
+    model.compile(optimizer=keras.optimizers.Adam(learning_rate=taxa_aprendizado), loss='mse')
+    return model
+
+
+def avaliar(model, scaler, X_test, y_test):
+    """RMSE/MAE na escala normalizada (como antes) e em preço (comparável entre scalers)."""
+    pred = model.predict(X_test, verbose=0)
+    rmse = np.sqrt(mean_squared_error(y_test, pred))
+    mae = mean_absolute_error(y_test, pred)
+    pred_preco = scaler.inverse_transform(pred.reshape(-1, 1))
+    y_preco = scaler.inverse_transform(np.asarray(y_test).reshape(-1, 1))
+    return {
+        "rmse": float(rmse),
+        "mae": float(mae),
+        "rmse_preco": float(np.sqrt(mean_squared_error(y_preco, pred_preco))),
+        "mae_preco": float(mean_absolute_error(y_preco, pred_preco)),
+    }
+
+
+def imprimir_metricas(metricas):
+    print(f"📊 RMSE: {metricas['rmse']:.4f} | MAE: {metricas['mae']:.4f} "
+          f"(US$ RMSE {metricas['rmse_preco']:.4f} | MAE {metricas['mae_preco']:.4f})")
+
+
+def treinar_completo(df, config):
+    """Treino do zero: novo scaler e pipeline tf.data sobre todas as janelas."""
+    # Escalar valores de 'Close'
+    scaler = MinMaxScaler()
+    serie = scaler.fit_transform(df[['Close']])[:, 0]
+
+    ds_treino, ds_teste, n_treino, y_test = criar_datasets(serie, config)
+
+    model = criar_modelo(config.janela, config.unidades, config.taxa_aprendizado)
+    medidor = MedidorThroughput(n_treino)
+
+    print("🚀 Iniciando treino do modelo...")
+    model.fit(ds_treino, epochs=config.epocas, callbacks=[medidor], verbose=2)
+
+    # Avaliar modelo (predição em lotes pelo mesmo pipeline)
+    metricas = avaliar(model, scaler, ds_teste, y_test)
+    metricas["throughput"] = medidor.historico
+    imprimir_metricas(metricas)
+    return model, scaler, metricas
+
+
+def ler_metadados(diretorio=DIR_MODELO):
+    caminho = os.path.join(diretorio, ARQUIVO_METADADOS)
+    if not os.path.exists(caminho):
+        return None
+    with open(caminho) as f:
+        return json.load(f)
+
+
+def estender_scaler(scaler, precos_novos, estrategia=ESTRATEGIA_ESCALA):
+    """
+    Preços novos fora de [data_min_, data_max_]:
+    - expandir: partial_fit amplia o intervalo (o fine-tuning reaprende a nova escala
+      com as janelas de replay reescaladas); a validação da API passa a aceitar os novos preços
+    - manter: o scaler não muda; os valores normalizados saem de [0, 1]
+    """
+    precos_novos = np.asarray(precos_novos, dtype=float).reshape(-1, 1)
+    fora = (precos_novos < scaler.data_min_[0]) | (precos_novos > scaler.data_max_[0])
+    if not fora.any():
+        return scaler, False
+    if estrategia == "manter":
+        print(f"⚠ {int(fora.sum())} preços novos fora do range do scaler; estratégia 'manter'.")
+        return scaler, False
+    if estrategia != "expandir":
+        raise ValueError(f"ESTRATEGIA_ESCALA '{estrategia}' inválida. Opções: expandir, manter.")
+
+    antigo = (scaler.data_min_[0], scaler.data_max_[0])
+    scaler.partial_fit(precos_novos)
+    print(f"📐 Scaler expandido de [{antigo[0]:.2f}, {antigo[1]:.2f}] "
+          f"para [{scaler.data_min_[0]:.2f}, {scaler.data_max_[0]:.2f}].")
+    return scaler, True
+
+
+def treinar_incremental(df, metadados, config):
+    """
+    Ajuste fino do modelo atual:
+    1) Carrega modelo_lstm.keras e scaler.gz atuais
+    2) Seleciona as janelas cujo alvo é posterior a `ultima_data` do treino anterior
+    3) Soma uma amostra de replay das janelas antigas (REPLAY_FATOR por janela nova)
+    4) Treina EPOCAS_INCREMENTAL épocas com taxa de aprendizado LR_INCREMENTAL
+    Retorna (model, scaler, metricas) ou None se não houver dados novos.
+    """
+    model = keras.models.load_model(os.path.join(DIR_MODELO, "modelo_lstm.keras"))
+    scaler = joblib.load(os.path.join(DIR_MODELO, "scaler.gz"))
+
+    ultima = pd.Timestamp(metadados["ultima_data"])
+    idx_novo = int((df["Date"] <= ultima).sum())
+    n_novas = len(df) - idx_novo
+    if n_novas <= 0:
+        print(f"✅ Nenhum pregão após {ultima:%Y-%m-%d}; modelo atual mantido.")
+        return None
+    print(f"📅 {n_novas} pregões novos desde {ultima:%Y-%m-%d}.")
+
+    scaler, _ = estender_scaler(scaler, df['Close'].values[idx_novo:])
+    serie = scaler.transform(df[['Close']])[:, 0]
+    janela = model.input_shape[1]
+    X, y = criar_janelas(serie, janela, dtype=np.float32)
+
+    # Janela i tem alvo serie[i + janela]: é "nova" se o alvo é posterior à última data
+    primeira_nova = max(0, idx_novo - janela)
+    novas = np.arange(primeira_nova, len(y))
+    antigas = np.arange(0, primeira_nova)
+    n_replay = min(len(antigas), max(REPLAY_MIN, int(REPLAY_FATOR * len(novas))))
+    replay = np.random.default_rng(0).choice(antigas, size=n_replay, replace=False) if n_replay else antigas
+    indices = np.sort(np.concatenate([novas, replay]))
+    print(f"🔁 Ajuste fino com {len(novas)} janelas novas + {len(replay)} de replay.")
+
+    model.compile(optimizer=keras.optimizers.Adam(learning_rate=LR_INCREMENTAL), loss='mse')
+    model.fit(X[indices], y[indices], epochs=EPOCAS_INCREMENTAL, batch_size=config.batch_size,
+              shuffle=True, verbose=1)
+
+    # Mesmo split de avaliação do treino completo (últimos 20% das janelas)
+    _, X_test, _, y_test = train_test_split(X, y, test_size=0.2, shuffle=False)
+    metricas = avaliar(model, scaler, X_test, y_test)
+    imprimir_metricas(metricas)
+    return model, scaler, metricas
+
+
+def pregoes_reservados(df, metadados_base, fracao=RESERVA_COMPARACAO, janela=30):
+    """
+    Quantos dos últimos pregões ficam fora do ajuste fino no --comparar: RESERVA_COMPARACAO
+    dos pregões novos, sem passar do split de teste do treino completo (últimos 20% das
+    janelas), para nenhum dos dois modos ter treinado nesses alvos. 0 se não houver ao
+    menos 2 pregões novos (o ajuste fino precisa de pelo menos um).
+    """
+    n_novas = int((df["Date"] > pd.Timestamp(metadados_base["ultima_data"])).sum())
+    if n_novas < 2:
+        return 0
+    limite_teste = math.ceil(0.2 * (len(df) - janela))
+    return max(1, min(int(fracao * n_novas), n_novas - 1, limite_teste))
+
+
+def avaliar_ultimas(model, scaler, df, n):
+    """Métricas nas `n` últimas janelas de `df` (alvos reservados no --comparar)."""
+    serie = scaler.transform(df[['Close']])[:, 0]
+    X, y = criar_janelas(serie, model.input_shape[1], dtype=np.float32)
+    return avaliar(model, scaler, X[-n:], y[-n:])
+
+
+def _publicar(origem, destino):
+    """Cópia via temporário + os.replace: a API (recarga a quente) nunca lê um arquivo pela metade."""
+    temporario = f"{destino}.tmp-{os.getpid()}"
+    shutil.copyfile(origem, temporario)
+    os.replace(temporario, destino)
+
+
+def salvar_artefatos(model, scaler, metadados, precos):
+    """
+    Grava a versão em model/versoes/<versao>/ e copia os arquivos para a cópia atual em model/.
+    `precos` (fechamentos do treino) alimentam a guarda de MAE das variantes de precisão,
+    executada uma vez na pasta da versão: a int8 é regravada para o modelo novo, ou apagada
+    (também em model/) se reprovada.
+    """
+    from app.lstm_numpy import PRECISOES
+    from model.quantizacao import exportar_variantes, gravar_relatorio
+
+    versao = metadados["versao"]
+    janela = model.input_shape[1]
+    dir_versao = os.path.join(DIR_VERSOES, versao)
+    os.makedirs(dir_versao, exist_ok=True)
+    model.save(os.path.join(dir_versao, "modelo_lstm.keras"))
+    joblib.dump(scaler, os.path.join(dir_versao, "scaler.gz"))
+    # Exporta pesos + parâmetros do scaler para servir sem TensorFlow (SERVING_MODE=npz)
+    caminho_npz = os.path.join(dir_versao, "modelo_lstm.npz")
+    exportar_npz(caminho_npz, LSTMNumpy.de_modelo_keras(model), scaler, janela)
+    relatorio = exportar_variantes(caminho_npz, precos)
+    gravar_relatorio(relatorio, dir_versao)
+    metadados["variantes"] = {p: r["aprovada"] for p, r in relatorio["variantes"].items()}
+    with open(os.path.join(dir_versao, ARQUIVO_METADADOS), "w") as f:
+        json.dump(metadados, f, indent=2, ensure_ascii=False)
+
+    os.makedirs(DIR_MODELO, exist_ok=True)
+    arquivos = ["modelo_lstm.keras", "scaler.gz", "modelo_lstm.npz", "quantizacao.json", ARQUIVO_METADADOS]
+    for precisao in PRECISOES:
+        if precisao == "float32":
+            continue
+        nome = f"modelo_lstm_{precisao}.npz"
+        if metadados["variantes"].get(precisao):
+            arquivos.append(nome)
+        elif os.path.exists(os.path.join(DIR_MODELO, nome)):
+            os.remove(os.path.join(DIR_MODELO, nome))
+    for nome in arquivos:
+        _publicar(os.path.join(dir_versao, nome), os.path.join(DIR_MODELO, nome))
+    print(f"✅ Modelo, scaler e pesos NumPy salvos (versão {versao}).")
+
+
+def executar(df, modo, config, metadados_base=None):
+    inicio = time.perf_counter()
+    if modo == "incremental":
+        resultado = treinar_incremental(df, metadados_base, config)
+        if resultado is None:
+            return None
+    else:
+        resultado = treinar_completo(df, config)
+    model, scaler, metricas = resultado
+    duracao = time.perf_counter() - inicio
+
+    metadados = {
+        "versao": time.strftime("%Y%m%dT%H%M%S"),
+        "modo": modo,
+        "versao_base": metadados_base["versao"] if (modo == "incremental" and metadados_base) else None,
+        "ultima_data": pd.Timestamp(df["Date"].iloc[-1]).isoformat(),
+        "linhas": int(len(df)),
+        "tempo_treino_s": round(duracao, 2),
+        "config": asdict(config),
+        "metricas": metricas,
+    }
+    print(f"⏱️ Treino {modo} em {duracao:.1f}s.")
+    return model, scaler, metadados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Treino do modelo LSTM.")
+    parser.add_argument("--modo", choices=["completo", "incremental"],
+                        default=os.getenv("MODO_TREINO", "completo"))
+    parser.add_argument("--comparar", action="store_true",
+                        help="No modo incremental, também roda o treino completo e compara tempo e métricas.")
+    args = parser.parse_args()
+
+    config = ConfigTreino.do_ambiente()
+    configurar_runtime(config)
+
+    df = carregar_dados()
+    modo = args.modo
+    metadados_base = ler_metadados()
+    if modo == "incremental" and (metadados_base is None
+                                  or not os.path.exists(os.path.join(DIR_MODELO, "modelo_lstm.keras"))):
+        print("⚠ Sem modelo/metadados anteriores; executando treino completo.")
+        modo = "completo"
+
+    comparar = args.comparar and modo == "incremental"
+    # Comparação justa: os últimos pregões ficam fora do ajuste fino e são avaliados nos dois modos.
+    # metadados["ultima_data"] fica antes deles, então o próximo incremental os inclui.
+    reserva = pregoes_reservados(df, metadados_base, janela=config.janela) if comparar else 0
+    resultado = executar(df.iloc[:len(df) - reserva], modo, config, metadados_base)
+    if resultado is None:
+        return
+    model, scaler, metadados = resultado
+
+    if comparar:
+        model_completo, scaler_completo, completo = executar(df, "completo", config)
+        if reserva:
+            metadados["metricas_reserva"] = avaliar_ultimas(model, scaler, df, reserva)
+            completo["metricas_reserva"] = avaliar_ultimas(model_completo, scaler_completo, df, reserva)
+            chave = "metricas_reserva"
+            print(f"\n📋 Incremental x completo nas {reserva} últimas janelas (nenhum dos dois treinou nelas):")
+        else:
+            chave = "metricas"
+            print("\n⚠ Menos de 2 pregões novos: comparação no split de teste, que o incremental já viu.")
+        print(f"{'modo':<12} {'tempo (s)':>10} {'MAE US$':>10} {'RMSE US$':>10}")
+        for m in (metadados, completo):
+            print(f"{m['modo']:<12} {m['tempo_treino_s']:>10.1f} "
+                  f"{m[chave]['mae_preco']:>10.4f} {m[chave]['rmse_preco']:>10.4f}")
+        metadados["comparacao_completo"] = {k: completo[k] for k in ("tempo_treino_s", "metricas", chave)}
+
+    salvar_artefatos(model, scaler, metadados, df["Close"].iloc[:len(df) - reserva].to_numpy())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,125 +1,336 @@
 #!/usr/bin/env python3
+"""
+Agente de métricas customizadas para o CloudWatch (processo de longa duração).
 
-import boto3
+1) A cada INTERVALO_S amostra CPU (/proc/stat), memória (/proc/meminfo) e disco
+   (os.statvfs) — sem subprocessos e sem dormir dentro da coleta
+2) Recebe métricas da API por UDP local (ex.: latência por rota), no formato
+   "Nome:valor|unidade|#Dim=valor,Dim2=valor2"
+3) Agrega tudo em StatisticSets (SampleCount/Sum/Minimum/Maximum) por métrica+dimensões
+4) A cada FLUSH_S envia tudo em chamadas put_metric_data de até 1000 datums,
+   com retry e backoff exponencial
+
+Uso:
+    python3 push_metrics.py                 # agente contínuo
+    python3 push_metrics.py --uma-vez       # uma amostra + um envio (compatível com cron)
+"""
+
+import argparse
+import asyncio
 import os
+import random
+import signal
 import time
-import subprocess
+import urllib.request
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
 
 # Configurações
 AWS_REGION = os.getenv("AWS_DEFAULT_REGION", "us-east-1")
-NAMESPACE = "Custom/System"
-DIMENSION_NAME = "InstanceId"  # Ainda tentamos usar, mas caímos no fallback
+NAMESPACE = os.getenv("METRICAS_NAMESPACE", "Custom/System")
+DIMENSION_NAME = "InstanceId"
+INTERVALO_S = float(os.getenv("METRICAS_INTERVALO_S", "10"))
+FLUSH_S = float(os.getenv("METRICAS_FLUSH_S", "60"))
+UDP_HOST = os.getenv("METRICAS_UDP_HOST", "127.0.0.1")
+UDP_PORTA = int(os.getenv("METRICAS_UDP_PORTA", "8125"))
+MAX_TENTATIVAS = int(os.getenv("METRICAS_MAX_TENTATIVAS", "5"))
+
+# Limite do put_metric_data por chamada
+MAX_DATUMS_POR_CHAMADA = 1000
+
+IMDS_URL = "http://169.254.169.254/latest"
 
-# Cria cliente CloudWatch
-cw_client = boto3.client("cloudwatch", region_name=AWS_REGION)
+UNIDADES = {"ms": "Milliseconds", "s": "Seconds", "pct": "Percent", "c": "Count", "b": "Bytes"}
 
-def get_instance_id():
-    """Recupera o ID da instância via metadata. Se falhar, retorna 'unknown'."""
+
+def get_instance_id(timeout: float = 1.0) -> str:
+    """Recupera o ID da instância via IMDSv2 (com fallback para IMDSv1). Se falhar, retorna 'unknown'."""
+    cabecalhos = {}
     try:
-        instance_id = subprocess.check_output(
-            ["curl", "-s", "http://169.254.169.254/latest/meta-data/instance-id"]
-        ).decode().strip()
-        return instance_id if instance_id else "unknown"
+        pedido = urllib.request.Request(
+            f"{IMDS_URL}/api/token", method="PUT",
+            headers={"X-aws-ec2-metadata-token-ttl-seconds": "60"},
+        )
+        with urllib.request.urlopen(pedido, timeout=timeout) as resp:
+            cabecalhos["X-aws-ec2-metadata-token"] = resp.read().decode()
+    except Exception:
+        pass
+    try:
+        pedido = urllib.request.Request(f"{IMDS_URL}/meta-data/instance-id", headers=cabecalhos)
+        with urllib.request.urlopen(pedido, timeout=timeout) as resp:
+            instance_id = resp.read().decode().strip()
+        return instance_id or "unknown"
     except Exception:
         return "unknown"
 
-INSTANCE_ID = get_instance_id()
 
-def collect_cpu_usage():
-    """
-    Coleta uso de CPU (percentual) em 1 segundo, via /proc/stat.
-    Retorna (cpu_used_percent, cpu_idle_percent).
-    """
-    with open("/proc/stat", "r") as f:
-        fields_prev = f.readline().split()[1:]
-        cpu_prev = list(map(int, fields_prev))
-    time.sleep(1)
-    with open("/proc/stat", "r") as f:
-        fields_cur = f.readline().split()[1:]
-        cpu_cur = list(map(int, fields_cur))
-
-    total_prev = sum(cpu_prev[:8])
-    total_cur = sum(cpu_cur[:8])
-    idle_prev = cpu_prev[3]
-    idle_cur = cpu_cur[3]
-
-    delta_total = total_cur - total_prev
-    delta_idle = idle_cur - idle_prev
-
-    if delta_total == 0:
-        return 0.0, 0.0
-
-    cpu_idle_pct = (delta_idle / delta_total) * 100.0
-    cpu_used_pct = 100.0 - cpu_idle_pct
-    return round(cpu_used_pct, 2), round(cpu_idle_pct, 2)
-
-def collect_memory_usage():
+# ───────────────────────────────────────────────────────
+# Coleta do sistema
+# ───────────────────────────────────────────────────────
+class AmostradorCPU:
     """
-    Coleta percentual de memória usada via /proc/meminfo.
-    Retorna mem_used_percent.
+    Uso de CPU entre duas chamadas consecutivas (a leitura anterior fica guardada,
+    então não é preciso dormir 1 s entre duas leituras do /proc/stat).
     """
+
+    def __init__(self, caminho: str = "/proc/stat"):
+        self.caminho = caminho
+        self._anterior = self._ler()
+
+    def _ler(self) -> Tuple[int, int]:
+        with open(self.caminho, "r") as f:
+            campos = list(map(int, f.readline().split()[1:]))
+        return sum(campos[:8]), campos[3]
+
+    def amostrar(self) -> Optional[Tuple[float, float]]:
+        """Retorna (cpu_used_percent, cpu_idle_percent) desde a última chamada, ou None se não houve ticks."""
+        total, idle = self._ler()
+        total_prev, idle_prev = self._anterior
+        self._anterior = (total, idle)
+        delta_total = total - total_prev
+        if delta_total <= 0:
+            return None
+        cpu_idle_pct = (idle - idle_prev) / delta_total * 100.0
+        return 100.0 - cpu_idle_pct, cpu_idle_pct
+
+
+def collect_memory_usage(caminho: str = "/proc/meminfo") -> float:
+    """Percentual de memória usada (MemTotal - MemAvailable) via /proc/meminfo."""
     meminfo = {}
-    with open("/proc/meminfo", "r") as f:
+    with open(caminho, "r") as f:
         for line in f:
             key, value = line.split(":", 1)
             meminfo[key.strip()] = int(value.split()[0])
+            if "MemTotal" in meminfo and "MemAvailable" in meminfo:
+                break
 
     total_kb = meminfo.get("MemTotal", 0)
-    avail_kb = meminfo.get("MemAvailable", 0)
     if total_kb == 0:
         return 0.0
+    return (total_kb - meminfo.get("MemAvailable", 0)) / total_kb * 100.0
+
+
+def collect_disk_usage(caminho: str = "/") -> float:
+    """Percentual de disco usado na partição (mesmo cálculo do `df`: used / (used + avail))."""
+    st = os.statvfs(caminho)
+    usado = (st.f_blocks - st.f_bfree) * st.f_frsize
+    disponivel = st.f_bavail * st.f_frsize
+    if usado + disponivel == 0:
+        return 0.0
+    return usado / (usado + disponivel) * 100.0
+
 
-    used_kb = total_kb - avail_kb
-    used_pct = (used_kb / total_kb) * 100.0
-    return round(used_pct, 2)
+# ───────────────────────────────────────────────────────
+# Agregação e envio
+# ───────────────────────────────────────────────────────
+class Agregador:
+    """Acumula observações em StatisticSets por (métrica, unidade, dimensões) até o próximo envio."""
 
-def collect_disk_usage():
+    def __init__(self, dimensoes_base: Sequence[Tuple[str, str]] = ()):
+        self.dimensoes_base = tuple(dimensoes_base)
+        self._series: Dict[tuple, List[float]] = {}
+
+    def registrar(self, nome: str, valor: float, unidade: str = "None",
+                  dimensoes: Sequence[Tuple[str, str]] = ()):
+        chave = (nome, unidade, self.dimensoes_base + tuple(dimensoes))
+        serie = self._series.get(chave)
+        if serie is None:
+            self._series[chave] = [1, valor, valor, valor]
+        else:
+            serie[0] += 1
+            serie[1] += valor
+            serie[2] = min(serie[2], valor)
+            serie[3] = max(serie[3], valor)
+
+    def __len__(self):
+        return len(self._series)
+
+    def drenar(self) -> List[dict]:
+        """Devolve os datums acumulados (formato MetricData) e zera o agregador."""
+        series, self._series = self._series, {}
+        agora = datetime.now(timezone.utc)
+        datums = []
+        for (nome, unidade, dimensoes), (contagem, soma, minimo, maximo) in series.items():
+            datum = {
+                "MetricName": nome,
+                "Timestamp": agora,
+                "Unit": unidade,
+                "StatisticValues": {
+                    "SampleCount": float(contagem), "Sum": soma, "Minimum": minimo, "Maximum": maximo,
+                },
+            }
+            if dimensoes:
+                datum["Dimensions"] = [{"Name": n, "Value": v} for n, v in dimensoes]
+            datums.append(datum)
+        return datums
+
+
+class EnviadorCloudWatch:
     """
-    Coleta percentual de disco usado na partição root (/) via df.
-    Retorna disk_used_percent.
+    Envia datums em lotes de até 1000 por put_metric_data, com retry e backoff
+    exponencial com jitter. `cliente` pode ser qualquer objeto com put_metric_data
+    (ex.: um stub em testes).
     """
-    try:
-        output = subprocess.check_output(["df", "--output=pcent", "/"]).decode().splitlines()
-        usage_str = output[1].strip().strip("%")
-        return float(usage_str)
-    except Exception:
-        return 0.0
 
-def put_metric(metric_name, value):
+    def __init__(self, cliente, namespace: str = NAMESPACE, max_tentativas: int = MAX_TENTATIVAS,
+                 backoff_base_s: float = 0.5, tamanho_lote: int = MAX_DATUMS_POR_CHAMADA,
+                 dormir=time.sleep):
+        self.cliente = cliente
+        self.namespace = namespace
+        self.max_tentativas = max(1, int(max_tentativas))
+        self.backoff_base_s = backoff_base_s
+        self.tamanho_lote = min(MAX_DATUMS_POR_CHAMADA, max(1, int(tamanho_lote)))
+        self.dormir = dormir
+        self.chamadas = 0
+        self.descartados = 0
+
+    def enviar(self, datums: List[dict]) -> int:
+        """Envia todos os datums; devolve quantos foram aceitos."""
+        enviados = 0
+        for i in range(0, len(datums), self.tamanho_lote):
+            lote = datums[i:i + self.tamanho_lote]
+            if self._enviar_lote(lote):
+                enviados += len(lote)
+            else:
+                self.descartados += len(lote)
+        return enviados
+
+    def _enviar_lote(self, lote: List[dict]) -> bool:
+        for tentativa in range(1, self.max_tentativas + 1):
+            try:
+                self.chamadas += 1
+                self.cliente.put_metric_data(Namespace=self.namespace, MetricData=lote)
+                return True
+            except Exception as e:
+                if tentativa == self.max_tentativas:
+                    print(f"❌ Erro ao enviar {len(lote)} métricas após {tentativa} tentativas: {e}")
+                    return False
+                espera = self.backoff_base_s * (2 ** (tentativa - 1)) * (1 + random.random())
+                print(f"⚠️ Falha ao enviar métricas (tentativa {tentativa}): {e}. Nova tentativa em {espera:.1f}s.")
+                self.dormir(espera)
+        return False
+
+
+def interpretar_datagrama(dados: bytes):
     """
-    Envia um datapoint para o CloudWatch usando boto3.
-    Se INSTANCE_ID == "unknown", envia sem dimensão; caso contrário, envia com dimensão.
+    "LatenciaRequisicao:12.3|ms|#Rota=/prever" → ("LatenciaRequisicao", 12.3, "Milliseconds", (("Rota", "/prever"),)).
+    Aceita várias linhas por datagrama; linhas inválidas são ignoradas.
     """
-    metric_data = {
-        "MetricName": metric_name,
-        "Value": value,
-        "Unit": "Percent",
-    }
-
-    # Se tiver um ID válido (> 0 chars), envia como dimensão; senão envia sem dimensão
-    if INSTANCE_ID and INSTANCE_ID != "unknown":
-        metric_data["Dimensions"] = [
-            {"Name": DIMENSION_NAME, "Value": INSTANCE_ID}
-        ]
+    for linha in dados.decode("utf-8", "replace").splitlines():
+        try:
+            partes = linha.strip().split("|")
+            nome, valor = partes[0].rsplit(":", 1)
+            unidade = UNIDADES.get(partes[1], "None") if len(partes) > 1 else "None"
+            dimensoes = ()
+            if len(partes) > 2 and partes[2].startswith("#"):
+                dimensoes = tuple(tuple(par.split("=", 1)) for par in partes[2][1:].split(",") if "=" in par)
+            yield nome, float(valor), unidade, dimensoes
+        except ValueError:
+            continue
+
+
+class ReceptorUDP(asyncio.DatagramProtocol):
+    def __init__(self, agregador: Agregador):
+        self.agregador = agregador
+
+    def datagram_received(self, dados, endereco):
+        for nome, valor, unidade, dimensoes in interpretar_datagrama(dados):
+            self.agregador.registrar(nome, valor, unidade, dimensoes)
+
+
+# ───────────────────────────────────────────────────────
+# Agente
+# ───────────────────────────────────────────────────────
+class AgenteMetricas:
+    def __init__(self, enviador: EnviadorCloudWatch, agregador: Agregador, cpu: Optional[AmostradorCPU] = None,
+                 caminho_disco: str = "/"):
+        self.enviador = enviador
+        self.agregador = agregador
+        self.cpu = cpu or AmostradorCPU()
+        self.caminho_disco = caminho_disco
+
+    def amostrar(self):
+        cpu = self.cpu.amostrar()
+        if cpu is not None:
+            self.agregador.registrar("CPU_Utilization", cpu[0], "Percent")
+            self.agregador.registrar("CPU_Idle", cpu[1], "Percent")
+        self.agregador.registrar("Memory_Used_Percent", collect_memory_usage(), "Percent")
+        self.agregador.registrar("Disk_Used_Percent", collect_disk_usage(self.caminho_disco), "Percent")
+
+    def enviar(self, datums: Optional[List[dict]] = None) -> int:
+        datums = self.agregador.drenar() if datums is None else datums
+        if not datums:
+            return 0
+        enviados = self.enviador.enviar(datums)
+        print(f"✅ {enviados}/{len(datums)} métricas enviadas em {self.enviador.namespace}.")
+        return enviados
+
+    async def executar(self, intervalo_s: float = INTERVALO_S, flush_s: float = FLUSH_S,
+                       udp: Optional[Tuple[str, int]] = (UDP_HOST, UDP_PORTA)):
+        loop = asyncio.get_running_loop()
+        transporte = None
+        if udp is not None:
+            transporte, _ = await loop.create_datagram_endpoint(
+                lambda: ReceptorUDP(self.agregador), local_addr=udp)
+            print(f"📡 Recebendo métricas da API em udp://{udp[0]}:{udp[1]}")
+
+        # systemd para o serviço com SIGTERM: cancela o loop para ainda enviar o que estiver agregado
+        try:
+            loop.add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+        except NotImplementedError:
+            pass
+
+        proximo_flush = loop.time() + flush_s
+        try:
+            while True:
+                await asyncio.sleep(intervalo_s)
+                self.amostrar()
+                if loop.time() >= proximo_flush:
+                    proximo_flush = loop.time() + flush_s
+                    # Drena no loop (o receptor UDP escreve no agregador pelo loop) e envia
+                    # fora dele: put_metric_data bloqueia e não pode atrasar os datagramas
+                    await loop.run_in_executor(None, self.enviar, self.agregador.drenar())
+        finally:
+            if transporte is not None:
+                transporte.close()
+            self.enviar()
+
+
+def criar_agente(cliente=None) -> AgenteMetricas:
+    if cliente is None:
+        import boto3
+
+        cliente = boto3.client("cloudwatch", region_name=AWS_REGION)
+    instance_id = get_instance_id()
+    # Sem ID válido envia sem dimensão (mesmo comportamento do script anterior)
+    dimensoes = [(DIMENSION_NAME, instance_id)] if instance_id != "unknown" else []
+    print(f"🖥️ InstanceId={instance_id}")
+    return AgenteMetricas(EnviadorCloudWatch(cliente), Agregador(dimensoes))
 
-    try:
-        cw_client.put_metric_data(
-            Namespace=NAMESPACE,
-            MetricData=[metric_data]
-        )
-        print(f"✅ {metric_name} = {value}% enviado com sucesso (InstanceId={INSTANCE_ID}).")
-    except Exception as e:
-        print(f"❌ Erro ao enviar {metric_name}: {e}")
 
 def main():
-    cpu_used, cpu_idle = collect_cpu_usage()
-    mem_used = collect_memory_usage()
-    disk_used = collect_disk_usage()
-
-    put_metric("CPU_Utilization", cpu_used)
-    put_metric("CPU_Idle", cpu_idle)
-    put_metric("Memory_Used_Percent", mem_used)
-    put_metric("Disk_Used_Percent", disk_used)
+    parser = argparse.ArgumentParser(description="Agente de métricas customizadas para o CloudWatch.")
+    parser.add_argument("--uma-vez", action="store_true", help="Uma amostra e um envio, depois sai.")
+    parser.add_argument("--intervalo", type=float, default=INTERVALO_S, help="Segundos entre amostras.")
+    parser.add_argument("--flush", type=float, default=FLUSH_S, help="Segundos entre envios ao CloudWatch.")
+    parser.add_argument("--udp-host", default=UDP_HOST, help="Endereço do receptor UDP.")
+    parser.add_argument("--udp-porta", type=int, default=UDP_PORTA, help="Porta do receptor UDP (0 desativa).")
+    args = parser.parse_args()
+
+    agente = criar_agente()
+    if args.uma_vez:
+        # CPU precisa de duas leituras: a primeira foi feita na criação do amostrador
+        time.sleep(min(1.0, args.intervalo))
+        agente.amostrar()
+        agente.enviar()
+        return
+
+    udp = (args.udp_host, args.udp_porta) if args.udp_porta else None
+    try:
+        asyncio.run(agente.executar(args.intervalo, args.flush, udp))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        print("🛑 Agente de métricas encerrado.")
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,71 @@
+# tests/test_artifact_cache.py
+"""
+CacheArtefatos contra um S3 simulado (moto): hit pela ETag e novo download quando ela muda.
+
+Uso (na raiz do projeto; pip install -r requirements-dev.txt):
+    python -m pytest -q tests
+"""
+import os
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from app.artifact_cache import CacheArtefatos
+
+BUCKET = "bucket-teste"
+CHAVE = "modelos/AAPL/modelo_lstm.npz"
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "teste")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "teste")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    with mock_aws():
+        cliente = boto3.client("s3", region_name="us-east-1")
+        cliente.create_bucket(Bucket=BUCKET)
+        yield cliente
+
+
+def _ler(caminho):
+    with open(caminho, "rb") as f:
+        return f.read()
+
+
+def test_hit_pela_etag_sem_novo_download(s3, tmp_path):
+    s3.put_object(Bucket=BUCKET, Key=CHAVE, Body=b"pesos-v1")
+    cache = CacheArtefatos(diretorio=str(tmp_path), cliente=s3)
+
+    primeiro = cache.obter(BUCKET, CHAVE)
+    segundo = cache.obter(BUCKET, CHAVE)
+
+    assert primeiro == segundo
+    assert _ler(segundo) == b"pesos-v1"
+    assert os.path.basename(segundo) == "modelo_lstm.npz"
+    assert (cache.downloads, cache.hits) == (1, 1)
+
+
+def test_etag_nova_baixa_de_novo(s3, tmp_path):
+    s3.put_object(Bucket=BUCKET, Key=CHAVE, Body=b"pesos-v1")
+    cache = CacheArtefatos(diretorio=str(tmp_path), cliente=s3)
+    antigo = cache.obter(BUCKET, CHAVE)
+
+    s3.put_object(Bucket=BUCKET, Key=CHAVE, Body=b"pesos-v2")
+    novo = cache.obter(BUCKET, CHAVE)
+
+    assert novo != antigo
+    assert _ler(novo) == b"pesos-v2"
+    assert (cache.downloads, cache.hits) == (2, 0)
+
+
+def test_bucket_versionado_usa_version_id(s3, tmp_path):
+    s3.put_bucket_versioning(Bucket=BUCKET, VersioningConfiguration={"Status": "Enabled"})
+    s3.put_object(Bucket=BUCKET, Key=CHAVE, Body=b"pesos-v1")
+    cache = CacheArtefatos(diretorio=str(tmp_path), cliente=s3)
+
+    assert _ler(cache.obter(BUCKET, CHAVE)) == b"pesos-v1"
+    s3.put_object(Bucket=BUCKET, Key=CHAVE, Body=b"pesos-v2")
+    assert _ler(cache.obter(BUCKET, CHAVE)) == b"pesos-v2"
+    assert _ler(cache.obter(BUCKET, CHAVE)) == b"pesos-v2"
+    assert (cache.downloads, cache.hits) == (2, 1)
@@ -0,0 +1,60 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def _como_serie(serie, dtype=None):
+    """Aceita (n,) ou (n, 1) e devolve um vetor 1-D (sem cópia quando possível)."""
+    serie = np.asarray(serie)
+    if serie.ndim == 2 and serie.shape[1] == 1:
+        serie = serie[:, 0]
+    if serie.ndim != 1:
+        raise ValueError(f"Série deve ter formato (n,) ou (n, 1); recebido {serie.shape}.")
+    if dtype is not None:
+        serie = serie.astype(dtype, copy=False)
+    return serie
+
+
+def criar_janelas(serie, janela, dtype=None, copiar=False):
+    """
+    Janelas deslizantes para LSTM sem loop Python:
+    X[i] = serie[i:i+janela] e y[i] = serie[i+janela], para i em range(len(serie) - janela).
+
+    - X tem formato (n, janela, 1) e é uma view (somente leitura) sobre a série, sem cópia
+    - dtype=np.float32 converte a série uma única vez antes de montar as janelas
+    - copiar=True devolve um array próprio e gravável
+    """
+    serie = _como_serie(serie, dtype)
+    n = len(serie) - janela
+    if n <= 0:
+        raise ValueError(f"Série com {len(serie)} pontos é curta demais para janela de {janela}.")
+
+    X = sliding_window_view(serie[:-1], janela)[:, :, np.newaxis]
+    y = serie[janela:]
+    if copiar:
+        X, y = X.copy(), y.copy()
+    return X, y
+
+
+def gerar_lotes(serie, janela, tamanho_lote=1024, dtype=np.float32):
+    """Gerador de (X, y) em lotes: só um lote (tamanho_lote, janela, 1) existe em memória por vez."""
+    X, y = criar_janelas(serie, janela, dtype=dtype)
+    for inicio in range(0, len(y), tamanho_lote):
+        fim = inicio + tamanho_lote
+        yield np.ascontiguousarray(X[inicio:fim]), np.ascontiguousarray(y[inicio:fim])
+
+
+def dataset_tf(serie, janela, tamanho_lote=None, dtype=np.float32):
+    """
+    tf.data.Dataset de (janela, 1) -> alvo montado dentro do pipeline: o tensor completo
+    (n, janela, 1) nunca é materializado. TensorFlow é importado sob demanda.
+    """
+    import tensorflow as tf
+
+    serie = _como_serie(serie, dtype)
+    ds = tf.data.Dataset.from_tensor_slices(serie)
+    ds = ds.window(janela + 1, shift=1, drop_remainder=True)
+    ds = ds.flat_map(lambda w: w.batch(janela + 1, drop_remainder=True))
+    ds = ds.map(lambda w: (tf.expand_dims(w[:-1], -1), w[-1]), num_parallel_calls=tf.data.AUTOTUNE)
+    if tamanho_lote:
+        ds = ds.batch(tamanho_lote)
+    return ds
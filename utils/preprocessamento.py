@@ -1,13 +1,12 @@
 from sklearn.preprocessing import MinMaxScaler
-import numpy as np
+
+from utils.janelas import criar_janelas as _criar_janelas
 
 def normalizar_dados(dados):
     scaler = MinMaxScaler()
     return scaler.fit_transform(dados), scaler
 
 def criar_janelas(dados, look_back=60):
-    X, y = [], []
-    for i in range(look_back, len(dados)):
-        X.append(dados[i-look_back:i, 0])
-        y.append(dados[i, 0])
-    return np.array(X), np.array(y)
+    # copiar=True: arrays próprios e graváveis, como antes (utils.janelas devolve views somente leitura)
+    X, y = _criar_janelas(dados, look_back, copiar=True)
+    return X[:, :, 0], y